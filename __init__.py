@@ -14,35 +14,45 @@ import bpy
 import importlib
 import sys
 import os
-from itertools import groupby
+import time
+
+from .module_manifest import MODULES
 
 # get folder name
 __folder_name__ = __name__
 __dict__ = {}
 addon_dir = os.path.dirname(__file__)
 
-# get all .py file path
-py_paths = [os.path.join(root, f) for root, dirs, files in os.walk(addon_dir) for f in files if
-            f.endswith('.py') and f != '__init__.py']
-
-for path in py_paths:
-    name = os.path.basename(path)[:-3]
-    correct_path = path.replace('\\', '/')
-    # split path with folder name
-    dir_list = [list(g) for k, g in groupby(correct_path.split('/'), lambda x: x == __folder_name__) if
-                not k]
-    # combine path and make dict like this: 'name:folder.name'
-    if 'preset' not in dir_list[-1]:
-        r_name_raw = __folder_name__ + '.' + '.'.join(dir_list[-1])
-        __dict__[name] = r_name_raw[:-3]
+# make dict like this: 'name:folder.name'
+for module in MODULES:
+    __dict__[module.split('.')[-1]] = f'{__folder_name__}.{module}'
+
+# import time of each module in ms
+import_times = {}
 
 # auto reload
 for name in __dict__.values():
+    t1 = time.perf_counter()
     if name in sys.modules:
         importlib.reload(sys.modules[name])
     else:
         globals()[name] = importlib.import_module(name)
         setattr(globals()[name], 'modules', __dict__)
+    import_times[name] = (time.perf_counter() - t1) * 1000
+
+
+def report_import_times(limit=None):
+    """import time of each module, slowest first
+    set the environment variable RSN_IMPORT_REPORT=1 to print it when the add-on loads
+    """
+    items = sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:limit]
+    lines = [f'{ms:8.2f} ms  {name}' for name, ms in items]
+    lines.append(f'{sum(import_times.values()):8.2f} ms  total ({len(import_times)} modules)')
+    return '\n'.join(lines)
+
+
+if os.environ.get('RSN_IMPORT_REPORT'):
+    print(f'RSN import time:\n{report_import_times()}')
 
 
 def register():
@@ -0,0 +1,309 @@
+"""RenderStack Node benchmark
+
+Build a synthetic RenderStackNodeTree and time the tree engine.
+Run it with blender in background mode, arguments go after '--':
+
+    blender -b --python benchmark/rsn_benchmark.py -- --tasks 100 --output result.json
+
+    --tasks            number of task nodes
+    --shared           number of shared subtrees (merge nodes linked into every task)
+    --variants         number of Variants nodes (each with two branches)
+    --fan-in           number of settings nodes merged into each task
+    --objects          number of object nodes in each task
+    --repeat           how many times each stage runs
+    --output           write the json result to this file (print to stdout if not set)
+    --baseline         compare the result with a baseline json file
+    --threshold        allowed ratio to the baseline median before a stage counts as a regression
+    --save-baseline    write the result as a new baseline file
+    --fail-on-regression  exit with code 1 if any stage regressed
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import bpy
+import addon_utils
+
+# the add-on folder is the parent of this benchmark folder
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+addon_name = os.path.basename(addon_dir)
+
+DEFAULT_THRESHOLD = 1.25
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog='rsn_benchmark')
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--shared', type=int, default=4)
+    parser.add_argument('--variants', type=int, default=4)
+    parser.add_argument('--fan-in', type=int, default=6)
+    parser.add_argument('--objects', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='')
+    parser.add_argument('--baseline', default='')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--save-baseline', default='')
+    parser.add_argument('--fail-on-regression', action='store_true')
+
+    return parser.parse_args(argv)
+
+
+def enable_addon():
+    """enable the add-on from this folder, so get_pref() works as in a user session"""
+    parent_dir = os.path.dirname(addon_dir)
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+    mod = addon_utils.enable(addon_name, default_set=True)
+    if mod is None:
+        raise RuntimeError(f'Can not enable add-on "{addon_name}"')
+    return mod
+
+
+class TreeGenerator:
+    """Generate a synthetic RenderStackNodeTree
+
+    Render List <- Task * tasks
+    Task <- Merge (fan-in settings nodes + object nodes + shared subtrees + variants)
+    """
+
+    def __init__(self, tasks, shared, variants, fan_in, objects):
+        self.tasks = tasks
+        self.shared = shared
+        self.variants = variants
+        self.fan_in = fan_in
+        self.objects = objects
+
+        self.nt = None
+        self.render_list = None
+        self.task_nodes = []
+
+    def link(self, from_node, to_node):
+        """link to the first free input, add a new input if all of them are linked"""
+        for input in to_node.inputs:
+            if not input.is_linked:
+                break
+        else:
+            input = to_node.inputs.new(to_node.inputs[0].bl_idname, to_node.inputs[0].name)
+        self.nt.links.new(from_node.outputs[0], input)
+
+    def new_node(self, bl_idname, name):
+        node = self.nt.nodes.new(bl_idname)
+        node.name = name
+        node.label = name
+        return node
+
+    def settings_node(self, name, index):
+        """settings nodes that are cheap to create and have real data"""
+        kind = index % 3
+        if kind == 0:
+            node = self.new_node('RSNodeResolutionInputNode', name)
+            node.res_x = 1920 + index
+        elif kind == 1:
+            node = self.new_node('RSNodeFilePathInputNode', name)
+            node.version = index % 5 + 1
+        else:
+            node = self.new_node('RSNodeFrameRangeInputNode', name)
+            node.frame_start = 1
+            node.frame_end = 1 + index % 10
+        return node
+
+    def object_node(self, name, index):
+        ob = bpy.data.objects.get(f'RSN Bench Object {index}')
+        if ob is None:
+            ob = bpy.data.objects.new(f'RSN Bench Object {index}', None)
+
+        if index % 2 == 0:
+            node = self.new_node('RSNodeObjectDisplayNode', name)
+            node.object = ob
+            node.hide_render = bool(index % 4)
+        else:
+            node = self.new_node('RSNodeObjectPSRNode', name)
+            node.object = ob
+        return node
+
+    def build(self):
+        self.nt = bpy.data.node_groups.new('RSN Benchmark', 'RenderStackNodeTree')
+        self.render_list = self.new_node('RSNodeRenderListNode', 'Render List')
+
+        shared_nodes = []
+        for i in range(self.shared):
+            merge = self.new_node('RSNodeSettingsMergeNode', f'Shared {i}')
+            for j in range(2):
+                self.link(self.settings_node(f'Shared {i} Settings {j}', j), merge)
+            shared_nodes.append(merge)
+
+        variants_nodes = []
+        for i in range(self.variants):
+            var = self.new_node('RSNodeVariantsNode', f'Variants {i}')
+            for j in range(2):
+                self.link(self.settings_node(f'Variants {i} Branch {j}', j), var)
+            variants_nodes.append(var)
+
+        for t in range(self.tasks):
+            task = self.new_node('RSNodeTaskNode', f'Task {t}')
+            merge = self.new_node('RSNodeSettingsMergeNode', f'Task {t} Merge')
+
+            for i in range(self.fan_in):
+                self.link(self.settings_node(f'Task {t} Settings {i}', i), merge)
+            for i in range(self.objects):
+                self.link(self.object_node(f'Task {t} Object {i}', i), merge)
+            for node in shared_nodes:
+                self.link(node, merge)
+            for node in variants_nodes:
+                self.link(node, merge)
+
+            if variants_nodes:
+                set_var = self.new_node('RSNodeSetVariantsNode', f'Task {t} Set Variants')
+                for i, node in enumerate(variants_nodes):
+                    item = set_var.node_collect.add()
+                    item.name = node.name
+                    item.active = (t + i) % 2
+                self.link(merge, set_var)
+                self.link(set_var, task)
+            else:
+                self.link(merge, task)
+
+            self.link(task, self.render_list)
+            self.task_nodes.append(task)
+
+        return self.nt
+
+    def node_count(self):
+        return len(self.nt.nodes)
+
+
+def measure(fn, repeat):
+    """run fn several times, return timing in ms"""
+    times = []
+    error = None
+    for i in range(repeat):
+        t1 = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            break
+        times.append((time.perf_counter() - t1) * 1000)
+
+    if error:
+        return {'error': error}
+
+    return {'runs'     : len(times),
+            'min_ms'   : min(times),
+            'median_ms': statistics.median(times),
+            'mean_ms'  : statistics.mean(times)}
+
+
+def run_stages(gen, repeat):
+    utility = sys.modules[f'{addon_name}.utility']
+
+    nt = gen.nt
+    root = gen.render_list.name
+    first_task = gen.task_nodes[0].name if gen.task_nodes else ''
+
+    bpy.context.window_manager.rsn_cur_tree_name = nt.name
+
+    rsn = utility.RSN_Nodes(node_tree=nt, root_node_name=root)
+    task_dict = rsn.get_children_from_render_list(return_dict=True)
+
+    def traversal():
+        utility.RSN_Nodes(node_tree=nt, root_node_name=root).get_children_from_render_list(return_dict=True)
+
+    def queue():
+        utility.RSN_Queue(nodetree=nt, render_list_node=root)
+
+    def task_data():
+        for task in task_dict:
+            rsn.get_task_data(task_name=task, task_dict=task_dict)
+
+    def parms():
+        bpy.ops.rsn.update_parms(view_mode_handler=first_task, use_render_mode=True)
+
+    all_data = [rsn.get_task_data(task_name=task, task_dict=task_dict) for task in task_dict]
+
+    def path_format():
+        for data in all_data:
+            if 'path_format' in data:
+                utility.get_output_path(data, data['frame_start'])
+
+    stages = {
+        'traversal'    : traversal,
+        'queue'        : queue,
+        'get_task_data': task_data,
+        'update_parms' : parms,
+        'path_format'  : path_format,
+    }
+
+    return {name: measure(fn, repeat) for name, fn in stages.items()}
+
+
+def compare_baseline(results, baseline, threshold):
+    """return a list of stages that are slower than the baseline allows"""
+    regressions = []
+    for name, base in baseline.get('results', {}).items():
+        curr = results.get(name)
+        if not curr or 'median_ms' not in curr or 'median_ms' not in base:
+            continue
+
+        limit = base['median_ms'] * baseline.get('thresholds', {}).get(name, threshold)
+        if curr['median_ms'] > limit:
+            regressions.append({'stage'      : name,
+                                'median_ms'  : curr['median_ms'],
+                                'baseline_ms': base['median_ms'],
+                                'limit_ms'   : limit})
+    return regressions
+
+
+def main():
+    args = parse_args()
+    mod = enable_addon()
+
+    gen = TreeGenerator(tasks=args.tasks, shared=args.shared, variants=args.variants,
+                        fan_in=args.fan_in, objects=args.objects)
+    gen.build()
+
+    result = {
+        'blender': bpy.app.version_string,
+        'rsn'    : '.'.join(str(v) for v in mod.bl_info['version']),
+        'config' : {'tasks'   : args.tasks,
+                    'shared'  : args.shared,
+                    'variants': args.variants,
+                    'fan_in'  : args.fan_in,
+                    'objects' : args.objects,
+                    'repeat'  : args.repeat,
+                    'nodes'   : gen.node_count()},
+        'results': run_stages(gen, args.repeat),
+    }
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        result['baseline'] = args.baseline
+        result['regressions'] = compare_baseline(result['results'], baseline, args.threshold)
+
+    if args.save_baseline:
+        baseline = dict(result, thresholds={name: args.threshold for name in result['results']})
+        baseline.pop('regressions', None)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.fail_on_regression and result.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
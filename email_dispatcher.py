@@ -0,0 +1,218 @@
+"""Send the emails of the SMTP Email node on a background thread
+
+Nothing in this module imports bpy.
+"""
+
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger('mylogger')
+
+# sentinels for the worker
+FLUSH = 'FLUSH'
+STOP = 'STOP'
+
+
+class RSN_EmailDispatcher:
+    """Send emails on a background thread so rendering is never blocked
+    Mails are batched into one digest per batch_size mails or per batch_interval seconds,
+    the smtp connection is reused and failed sends are retried with backoff.
+    Only python objects are passed to the worker, it never touch bpy.
+    """
+
+    def __init__(self, maxsize=100, max_retries=3, backoff=1.0):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = None
+        self.flush_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.batch_size = 1
+        self.batch_interval = 0
+
+        self.smtp = None
+        self.smtp_config = None
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """a stopping worker is kept until it ends, the mails put meanwhile wait for the next start"""
+        if not self.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='RSN Email', daemon=True)
+            self.thread.start()
+
+    def put(self, mail, config):
+        """queue a mail, never wait for the worker
+        :parm mail: dict with 'subject', 'content', 'sender_name', 'email'
+        :parm config: tuple (server, port, use_ssl, password, sender)
+        :return: False if the queue is full and the mail is dropped
+        """
+        self.start()
+        try:
+            self.queue.put_nowait((mail, config))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning('RSN Email queue is full, mail dropped')
+            return False
+
+    def flush(self):
+        """send the pending digest now (at the end of the render queue)"""
+        if self.is_alive():
+            try:
+                self.queue.put_nowait(FLUSH)
+            except queue.Full:
+                # the worker is busy with a full queue, it flush after the next mail
+                self.flush_event.set()
+
+    def stop(self, timeout=2):
+        """stop the worker, wait for it no longer than timeout (seconds)
+        the worker send the mails of the queue before it ends
+        """
+        if self.is_alive():
+            self.stop_event.set()
+            try:
+                # wake up a worker waiting for a mail, a busy one see the event after its mail
+                self.queue.put_nowait(STOP)
+            except queue.Full:
+                pass
+            self.thread.join(timeout)
+        if self.is_alive():
+            logger.warning('RSN Email worker is still sending, it stops after that')
+        else:
+            self.thread = None
+
+    ## WORKER
+    #########################################
+
+    def run(self):
+        pending = []
+        first_time = 0
+
+        while True:
+            if self.stop_event.is_set():
+                pending.extend(self.drain())
+                self.send_digest(pending)
+                self.close()
+                return
+
+            timeout = None
+            if pending and self.batch_interval > 0:
+                timeout = max(first_time + self.batch_interval - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = FLUSH  # end of the time window
+
+            if item == STOP:
+                # only wakes the worker up, stop_event says if it stops
+                continue
+            elif item == FLUSH:
+                self.flush_event.clear()
+                self.send_digest(pending)
+                pending = []
+                continue
+
+            if not pending: first_time = time.monotonic()
+            pending.append(item)
+
+            # batch_size 0 means only the time window is used
+            if self.flush_event.is_set() or (self.batch_size > 0 and len(pending) >= self.batch_size) or \
+                    (self.batch_size == 0 and self.batch_interval <= 0):
+                self.flush_event.clear()
+                self.send_digest(pending)
+                pending = []
+
+    def drain(self):
+        """the mails left in the queue, without waiting"""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item not in (STOP, FLUSH):
+                yield item
+
+    def send_digest(self, pending):
+        """one mail for each receiver and server"""
+        # only import when sending, the worker thread is the only user
+        from email.mime.text import MIMEText
+        from email.header import Header
+
+        groups = {}
+        for mail, config in pending:
+            groups.setdefault((config, mail['email']), []).append(mail)
+
+        for (config, email), mails in groups.items():
+            if len(mails) == 1:
+                subject = mails[0]['subject']
+                content = mails[0]['content']
+            else:
+                subject = f'RSN: {len(mails)} notifications'
+                content = '\n\n'.join(f"{mail['subject']}\n{mail['content']}" for mail in mails)
+
+            message = MIMEText(content, 'plain', 'utf-8')
+            message['From'] = Header(f"{mails[0]['sender_name']}<{email}>", 'utf-8')
+            message['To'] = Header(f"{mails[0]['sender_name']}<{email}>", 'utf-8')
+            message['Subject'] = Header(subject, 'utf-8')
+
+            if self.deliver(config, email, message.as_string()):
+                self.sent += len(mails)
+            else:
+                self.failed += len(mails)
+
+    def connect(self, config):
+        """reuse the connection if it is still alive"""
+        import smtplib
+
+        if self.smtp and self.smtp_config == config:
+            try:
+                if self.smtp.noop()[0] == 250:
+                    return self.smtp
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+        self.close()
+
+        server, port, use_ssl, password, sender = config
+        smtp = smtplib.SMTP_SSL(server, port, timeout=30) if use_ssl else smtplib.SMTP(server, port, timeout=30)
+        if password != '':
+            smtp.login(sender, password)
+
+        self.smtp = smtp
+        self.smtp_config = config
+        return smtp
+
+    def close(self):
+        if self.smtp:
+            try:
+                self.smtp.quit()
+            except Exception:
+                pass
+        self.smtp = None
+        self.smtp_config = None
+
+    def deliver(self, config, email, message):
+        import smtplib
+
+        for i in range(self.max_retries + 1):
+            try:
+                smtp = self.connect(config)
+                smtp.sendmail(email, [email], message)
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                logger.warning(f'RSN Mail sent failed ({i + 1}/{self.max_retries + 1}): {e}')
+                self.close()
+                if i < self.max_retries:
+                    time.sleep(self.backoff * 2 ** i)
+        return False
@@ -0,0 +1,129 @@
+"""Static list of the add-on modules, imported and registered in this order by __init__.py
+Generated, run this file with python after adding or removing a module:
+
+    python module_manifest.py
+"""
+
+import os
+
+MODULES = (
+    'email_dispatcher',
+    'node_graph',
+    'param_curves',
+    'preferences',
+    'preset_manifest',
+    'render_plan',
+    'render_stats',
+    'task_matrix',
+    'task_table',
+    'update_check',
+    'utility',
+    'worker_protocol',
+    'nodes.BASE.node_category',
+    'nodes.BASE.node_tree',
+    'nodes.BASE.socket_type',
+    'nodes.inputs.CameraInputNode',
+    'nodes.inputs.ColorManagementNode',
+    'nodes.inputs.CommonSettings',
+    'nodes.inputs.PropertyInputNode',
+    'nodes.inputs.TaskInfoInputNode',
+    'nodes.inputs.TaskMatrixNode',
+    'nodes.inputs.TaskTableNode',
+    'nodes.inputs.ValueCurveNode',
+    'nodes.inputs.ViewLayerNode',
+    'nodes.inputs.WorldInputNode',
+    'nodes.layout.MergeNode',
+    'nodes.layout.NullNode',
+    'nodes.object_data.ObjectDataNode',
+    'nodes.object_data.ObjectDisplayNode',
+    'nodes.object_data.ObjectMaterialNode',
+    'nodes.object_data.ObjectModifierNode',
+    'nodes.object_data.ObjectPSRNode',
+    'nodes.old_nodes.TaskListNode',
+    'nodes.output_settings.ActiveRenderSlotNode',
+    'nodes.output_settings.FilePathInputNode',
+    'nodes.output_settings.FrameRangeInputNode',
+    'nodes.output_settings.ImageFormatInputNode',
+    'nodes.output_settings.RenderRegionNode',
+    'nodes.output_settings.ResolutionInputNode',
+    'nodes.output_settings.TileRenderNode',
+    'nodes.output_settings.ViewLayerPassesNodes',
+    'nodes.render_settings.CyclesLightPathNode',
+    'nodes.render_settings.CyclesRenderSettingsNode',
+    'nodes.render_settings.EeveeRenderSettingsNode',
+    'nodes.render_settings.LuxcoreRenderSettingsNode',
+    'nodes.render_settings.OctaneRenderSettingsNode',
+    'nodes.render_settings.WorkBenchRenderSettingsNode',
+    'nodes.scripts.ScriptsNode',
+    'nodes.scripts.SmtpEmailNode',
+    'nodes.scripts.SocketNode',
+    'nodes.scripts.ssm_LightStudio',
+    'nodes.task.ProcessorNode',
+    'nodes.task.RenderListNode',
+    'nodes.task.TaskNode',
+    'nodes.task.Viewer',
+    'nodes.variants.SetVariantsNode',
+    'nodes.variants.VariantsNode',
+    'operators.compositor_nodetree',
+    'operators.memory_hygiene',
+    'operators.mute_nodes',
+    'operators.preflight',
+    'operators.region_patch',
+    'operators.render_comfirm_sheet',
+    'operators.render_plan',
+    'operators.render_worker',
+    'operators.renderstack',
+    'operators.static_frames',
+    'operators.tile_render',
+    'operators.update_parms',
+    'operators.draw_nodes.draw_nodes_outlines',
+    'operators.draw_nodes.utils',
+    'operators.rsn_helper.edit_input',
+    'operators.rsn_helper.link_muti_task',
+    'operators.rsn_helper.merge_task',
+    'operators.rsn_helper.search_nodes',
+    'operators.rsn_helper.select_node_obj',
+    'operators.rsn_helper.simple_task_set_up',
+    'operators.rsn_helper.switch_setting',
+    'operators.rsn_helper.version_check',
+    'ui.helper_panel',
+    'ui.icon_utils',
+    'ui.pie_menu',
+)
+
+# not part of the add-on
+EXCLUDE_DIRS = {'preset', 'benchmark', 'docs', 'tests', '__pycache__'}
+EXCLUDE_FILES = {'__init__.py', 'module_manifest.py'}
+
+
+def find_modules(addon_dir):
+    modules = []
+    for root, dirs, files in os.walk(addon_dir):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDE_DIRS and not d.startswith('.'))
+        rel = os.path.relpath(root, addon_dir)
+        package = '' if rel == '.' else rel.replace(os.sep, '.') + '.'
+        for f in sorted(files):
+            if f.endswith('.py') and f not in EXCLUDE_FILES:
+                modules.append(package + f[:-3])
+    return modules
+
+
+def write_manifest():
+    path = os.path.abspath(__file__)
+    modules = find_modules(os.path.dirname(path))
+
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    start = text.index('MODULES = (')
+    end = text.index(')', start) + 1
+    lines = ''.join(f"    '{name}',\n" for name in modules)
+    text = text[:start] + 'MODULES = (\n' + lines + ')' + text[end:]
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    print(f'{len(modules)} modules written to {path}')
+
+
+if __name__ == '__main__':
+    write_manifest()
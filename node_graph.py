@@ -0,0 +1,234 @@
+"""bpy-free snapshot of a RenderStackNodeTree
+
+The tree is read once into plain python objects, after that the traversal,
+variants pruning and task grouping never touch the blender nodes again.
+Nothing in this module imports bpy, so it can also be built from json and
+used outside of blender.
+
+json format:
+    {"nodes": [
+        {"name": "Task", "bl_idname": "RSNodeTaskNode", "mute": false,
+         "inputs": ["Merge", null],
+         "variants": [["Variants", 1, true]]},
+        ...
+    ]}
+
+"inputs" holds the name of the node linked to each input (null if not linked),
+"variants" is only used by the Set Variants node: [variants node name, active input, use].
+"""
+
+import json
+from itertools import groupby
+
+UNLINKED = -1
+
+REROUTE = 'NodeReroute'
+VARIANTS = 'RSNodeVariantsNode'
+SET_VARIANTS = 'RSNodeSetVariantsNode'
+TASK = 'RSNodeTaskNode'
+BLACK_LIST = ('RSNodeTaskListNode', 'RSNodeRenderListNode')
+
+
+class RSN_GraphNode:
+    """A node in the graph
+    :parm id: index in RSN_Graph.nodes
+    :parm inputs: tuple of node id linked to each input, UNLINKED if there is no link
+    :parm variants: tuple of (variants node name, active, use), only for Set Variants node
+    """
+    __slots__ = ('id', 'name', 'bl_idname', 'mute', 'inputs', 'variants')
+
+    def __init__(self, id, name, bl_idname, mute=False, inputs=(), variants=()):
+        self.id = id
+        self.name = name
+        self.bl_idname = bl_idname
+        self.mute = mute
+        self.inputs = inputs
+        self.variants = variants
+
+    def __repr__(self):
+        return f'<RSN_GraphNode {self.id} "{self.name}" {self.bl_idname}>'
+
+
+class RSN_Graph:
+    """Snapshot of a node tree with integer ids and adjacency arrays"""
+
+    def __init__(self):
+        self.nodes = []
+        self.index = {}  # name: id
+
+    ## BUILD
+    #########################################
+
+    def add_node(self, name, bl_idname, mute=False, variants=()):
+        node = RSN_GraphNode(len(self.nodes), name, bl_idname, mute, (), tuple(variants))
+        self.nodes.append(node)
+        self.index[name] = node.id
+        return node
+
+    @classmethod
+    def from_node_tree(cls, node_tree):
+        """one pass over a blender node tree"""
+        graph = cls()
+        links = []
+
+        for node in node_tree.nodes:
+            variants = ()
+            if node.bl_idname == SET_VARIANTS:
+                variants = [(item.name, item.active, item.use) for item in node.node_collect]
+            graph.add_node(node.name, node.bl_idname, node.mute, variants)
+
+            inputs = []
+            for input in node.inputs:
+                from_name = None
+                if input.is_linked:
+                    # links may be empty when dragging the link off a node
+                    try:
+                        from_name = input.links[0].from_node.name
+                    except IndexError:
+                        pass
+                inputs.append(from_name)
+            links.append(inputs)
+
+        graph.resolve_inputs(links)
+        return graph
+
+    @classmethod
+    def from_dict(cls, data):
+        graph = cls()
+        links = []
+        for d in data['nodes']:
+            graph.add_node(d['name'], d['bl_idname'], d.get('mute', False),
+                           [tuple(v) for v in d.get('variants', ())])
+            links.append(d.get('inputs', ()))
+
+        graph.resolve_inputs(links)
+        return graph
+
+    @classmethod
+    def from_json(cls, string):
+        return cls.from_dict(json.loads(string))
+
+    def resolve_inputs(self, links):
+        """turn node names of the inputs into ids"""
+        for node, inputs in zip(self.nodes, links):
+            node.inputs = tuple(self.index.get(name, UNLINKED) if name is not None else UNLINKED
+                                for name in inputs)
+
+    def to_dict(self):
+        nodes = []
+        for node in self.nodes:
+            d = {'name'     : node.name,
+                 'bl_idname': node.bl_idname,
+                 'mute'     : node.mute,
+                 'inputs'   : [self.nodes[i].name if i != UNLINKED else None for i in node.inputs]}
+            if node.variants:
+                d['variants'] = [list(v) for v in node.variants]
+            nodes.append(d)
+        return {'nodes': nodes}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    ## QUERY
+    #########################################
+
+    def get_id(self, name):
+        return self.index[name]
+
+    def get_name(self, id):
+        return self.nodes[id].name
+
+    def names(self, ids):
+        return [self.nodes[i].name for i in ids]
+
+    def get_children(self, root_id, pass_mute=True):
+        """Depth first search
+        nodes append from left to right, from top to bottom
+        :parm root_id: id of the root node
+        :return: list of node id, the root node is the last one
+        """
+        nodes = self.nodes
+        node_list = []
+
+        def get_sub_node(id):
+            for sub_id in nodes[id].inputs:
+                if sub_id == UNLINKED: continue
+                if nodes[sub_id].mute and pass_mute: continue
+                get_sub_node(sub_id)
+            # Skip the reroute node
+            if nodes[id].bl_idname != REROUTE:
+                if len(node_list) == 0 or id != node_list[-1]:
+                    node_list.append(id)
+
+        get_sub_node(root_id)
+        return node_list
+
+    def get_var_black_list(self, var_id, active, pass_mute=True):
+        """Depth first search for the Variants children that are not active
+        :parm var_id: id of the Variants node
+        :parm active: the active input of the Variants node
+        :return: list of node id to remove from the task
+        """
+        nodes = self.nodes
+        black_list = []
+
+        def get_sub_node(id):
+            node = nodes[id]
+            for i, sub_id in enumerate(node.inputs):
+                if sub_id == UNLINKED: continue
+                if i == active and node.bl_idname == VARIANTS: continue
+                if nodes[sub_id].mute and pass_mute: continue
+                get_sub_node(sub_id)
+
+            if node.bl_idname != REROUTE:
+                if len(black_list) == 0 or id != black_list[-1]:
+                    if node.bl_idname != VARIANTS: black_list.append(id)
+
+        get_sub_node(var_id)
+        return black_list
+
+    def get_var_collect(self, node_list):
+        """only the first Set Variants node in the list will be active
+        :return: dict {variants node name: active input}
+        """
+        for id in node_list:
+            node = self.nodes[id]
+            if node.bl_idname == SET_VARIANTS:
+                return {name: active for name, active, use in node.variants if use}
+        return {}
+
+    def prune_variants(self, node_list, var_collect=None):
+        """remove the inactive Variants branches
+        :parm var_collect: dict {variants node name: active input}, read from the Set Variants node if None
+        """
+        if var_collect is None:
+            var_collect = self.get_var_collect(node_list)
+
+        for name, active in var_collect.items():
+            var_id = self.index.get(name)
+            if var_id is None: continue
+            black_list = set(self.get_var_black_list(var_id, active))
+            node_list = [i for i in node_list if i not in black_list]
+
+        return node_list
+
+    def get_task_children(self, root_id, var_collect=None):
+        """children of a task (or viewer) node with the Variants applied"""
+        return self.prune_variants(self.get_children(root_id), var_collect)
+
+    def group_by_type(self, node_list, parent_node_type=TASK, black_list=BLACK_LIST):
+        """Use Task node as separator to get sub nodes in this task
+        :return: dict {parent name: [children name list]}
+        """
+        nodes = self.nodes
+        node_list = [i for i in node_list if nodes[i].bl_idname not in black_list]
+
+        children_node_list = [list(g) for k, g in
+                              groupby(node_list, lambda i: nodes[i].bl_idname == parent_node_type) if not k]
+        parent_node_list = [i for i in node_list if nodes[i].bl_idname == parent_node_type]
+
+        node_list_dict = {}
+        # release the node behind the last parent
+        for parent, children in zip(parent_node_list, children_node_list):
+            node_list_dict[nodes[parent].name] = self.names(children)
+        return node_list_dict
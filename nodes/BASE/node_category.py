@@ -33,6 +33,9 @@ node_categorys = [
         nodeitems_utils.NodeItem('RSNodeViewLayerInputNode'),
         nodeitems_utils.NodeItem('RSNodeColorManagementNode'),
         nodeitems_utils.NodeItem("RSNodeTaskInfoInputsNode"),
+        nodeitems_utils.NodeItem("RSNodeTaskTableNode"),
+        nodeitems_utils.NodeItem("RSNodeTaskMatrixNode"),
+        nodeitems_utils.NodeItem("RSNodeValueCurveNode"),
     ]),
 
     RSNCategory("OBJECT", "Object", items=[
@@ -50,6 +53,8 @@ node_categorys = [
         nodeitems_utils.NodeItem("RSNodeFilePathInputNode"),
         nodeitems_utils.NodeItem("RSNodeActiveRenderSlotNode"),
         nodeitems_utils.NodeItem("RSNodeViewLayerPassesNode"),
+        nodeitems_utils.NodeItem("RSNodeTileRenderNode"),
+        nodeitems_utils.NodeItem("RSNodeRenderRegionNode"),
     ]),
 
     RSNCategory("RENDER_SETTINGS", "Render Settings", items=[
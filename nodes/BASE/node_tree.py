@@ -6,12 +6,22 @@ from ...utility import *
 from ...preferences import get_pref
 
 import logging
+from functools import partial
 
 LOG_FORMAT = "%(asctime)s - RSN-%(levelname)s - %(message)s"
 logging.basicConfig(format=LOG_FORMAT)
 logger = logging.getLogger('mylogger')
 
 
+def update_viewer_task(tree_name):
+    """update the task that linked to the viewer node, the task is read when the update run"""
+    pref = get_pref()
+    bpy.ops.rsn.update_parms(view_mode_handler=bpy.context.window_manager.rsn_viewer_node,
+                             tree_name=tree_name,
+                             update_scripts=pref.node_viewer.update_scripts,
+                             use_render_mode=False)
+
+
 class RenderStackNodeTree(bpy.types.NodeTree):
     """RenderStackNodeTree Node Tree"""
     bl_idname = 'RenderStackNodeTree'
@@ -95,9 +105,8 @@ class RenderStackNode(bpy.types.Node):
             node_list = bpy.context.window_manager.rsn_node_list.split(',')
             if self.name in node_list:
                 pref = get_pref()
-                bpy.ops.rsn.update_parms(view_mode_handler=bpy.context.window_manager.rsn_viewer_node,
-                                         update_scripts=pref.node_viewer.update_scripts,
-                                         use_render_mode=False)
+                rsn_debouncer.push('update_parms', partial(update_viewer_task, self.id_data.name),
+                                   delay=pref.node_viewer.update_delay)
 
     def get_data(self):
         """For get self date into rsn tree method"""
@@ -130,5 +139,7 @@ def register():
 
 
 def unregister():
+    rsn_debouncer.cancel()
+
     for cls in classes:
         bpy.utils.unregister_class(cls)
@@ -0,0 +1,161 @@
+import bpy
+from bpy.props import *
+
+from ...nodes.BASE.node_tree import RenderStackNode
+from ...task_matrix import sweep_range, sweep_list
+
+
+def update_axis(self, context):
+    # id_data of the axis is the node tree
+    node = self.id_data.nodes.get(self.node_name)
+    if node: node.update_parms()
+
+
+class RSN_MatrixAxis(bpy.types.PropertyGroup):
+    node_name: StringProperty(name='Matrix node')
+
+    type: EnumProperty(name='Type', items=[
+        ('VARIANTS', 'Variants', 'Every linked input of a Variants node'),
+        ('SWEEP', 'Sweep', 'Values of a task data key')],
+                       default='SWEEP', update=update_axis)
+    variants: StringProperty(name='Variants Node', update=update_axis)
+
+    key: StringProperty(name='Key', description='Task data key, dots for nested keys, eg. "ev", "samples"',
+                        default='ev', update=update_axis)
+    mode: EnumProperty(name='Mode', items=[
+        ('RANGE', 'Range', 'From start to end by step'),
+        ('LIST', 'List', 'Comma separated values')],
+                       default='RANGE', update=update_axis)
+    start: FloatProperty(name='Start', default=-2, update=update_axis)
+    end: FloatProperty(name='End', default=2, update=update_axis)
+    step: FloatProperty(name='Step', default=0.5, update=update_axis)
+    values: StringProperty(name='Values', default='64, 128, 256', update=update_axis)
+
+    use: BoolProperty(name='Use', default=True, update=update_axis)
+
+
+class RSN_UL_MatrixAxisList(bpy.types.UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=1)
+        if item.type == 'VARIANTS':
+            row.label(text=item.variants or 'Variants', icon='RADIOBUT_OFF')
+        else:
+            row.label(text=item.key, icon='DRIVER_DISTANCE')
+        row.label(text=f'{len(data.get_axis_values(item))}')
+        row.prop(item, 'use', text='', icon='CHECKMARK')
+
+
+class RSN_OT_EditMatrixAxis(bpy.types.Operator):
+    """ADD/REMOVE List item"""
+    bl_idname = 'rsn.edit_matrix_axis'
+    bl_label = 'Edit Axis'
+
+    action: EnumProperty(name='Edit', items=[('ADD', 'Add', ''), ('REMOVE', 'Remove', '')])
+    node_name: StringProperty(default='')
+
+    def execute(self, context):
+        node = context.space_data.edit_tree.nodes[self.node_name]
+        if self.action == 'ADD':
+            item = node.axes.add()
+            item.node_name = node.name
+            node.axes_index = len(node.axes) - 1
+        elif node.axes:
+            node.axes.remove(node.axes_index)
+            node.axes_index = max(0, node.axes_index - 1)
+
+        node.update_parms()
+        return {'FINISHED'}
+
+
+class RSNodeTaskMatrixNode(RenderStackNode):
+    """Expand the task into every combination of Variants inputs and value sweeps"""
+    bl_idname = 'RSNodeTaskMatrixNode'
+    bl_label = 'Task Matrix'
+
+    axes: CollectionProperty(name='Axes', type=RSN_MatrixAxis)
+    axes_index: IntProperty(default=0)
+
+    def init(self, context):
+        self.outputs.new('RSNodeSocketTaskSettings', "Settings")
+        self.width = 240
+
+    def draw_buttons(self, context, layout):
+        row = layout.row()
+        row.template_list('RSN_UL_MatrixAxisList', '', self, 'axes', self, 'axes_index', rows=3)
+        col = row.column(align=1)
+        add = col.operator('rsn.edit_matrix_axis', text='', icon='ADD')
+        add.action = 'ADD'
+        add.node_name = self.name
+        remove = col.operator('rsn.edit_matrix_axis', text='', icon='REMOVE')
+        remove.action = 'REMOVE'
+        remove.node_name = self.name
+
+        if 0 <= self.axes_index < len(self.axes):
+            item = self.axes[self.axes_index]
+            col = layout.column(align=1)
+            col.prop(item, 'type', expand=1)
+            if item.type == 'VARIANTS':
+                col.prop_search(item, 'variants', self.id_data, 'nodes', text='', icon='NODE')
+            else:
+                col.prop(item, 'key')
+                col.prop(item, 'mode', expand=1)
+                if item.mode == 'RANGE':
+                    row = col.row(align=1)
+                    row.prop(item, 'start')
+                    row.prop(item, 'end')
+                    row.prop(item, 'step')
+                else:
+                    col.prop(item, 'values', text='')
+
+        layout.label(text=f'{self.get_count()} combinations', icon='MOD_ARRAY')
+
+    def get_axis_values(self, item):
+        if item.type == 'VARIANTS':
+            node = self.id_data.nodes.get(item.variants)
+            if not node or node.bl_idname != 'RSNodeVariantsNode': return []
+            return [i for i, input in enumerate(node.inputs) if input.is_linked]
+        if item.mode == 'RANGE':
+            return sweep_range(item.start, item.end, item.step)
+        return sweep_list(item.values)
+
+    def get_count(self):
+        count = 1
+        for item in self.axes:
+            if item.use: count *= len(self.get_axis_values(item))
+        return count
+
+    def get_data(self):
+        task_data = {}
+        axes = []
+        for item in self.axes:
+            if not item.use: continue
+            values = self.get_axis_values(item)
+            if not values:
+                self.set_warning(msg=f'Axis "{item.variants or item.key}" has no value')
+                continue
+            if item.type == 'VARIANTS':
+                axes.append({'type': 'VARIANTS', 'node': item.variants, 'values': values})
+            else:
+                axes.append({'type': 'SWEEP', 'key': item.key, 'values': values})
+
+        if axes:
+            task_data['task_matrix'] = {'axes': axes}
+        return task_data
+
+
+classes = (
+    RSN_MatrixAxis,
+    RSN_UL_MatrixAxisList,
+    RSN_OT_EditMatrixAxis,
+    RSNodeTaskMatrixNode,
+)
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+
+def unregister():
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,68 @@
+import bpy
+import os
+from bpy.props import StringProperty, EnumProperty, IntProperty
+
+from ...nodes.BASE.node_tree import RenderStackNode
+from ...task_table import count_rows
+
+
+def update_node(self, context):
+    self.update_parms()
+
+
+class RSNodeTaskTableNode(RenderStackNode):
+    """Expand the task into one virtual task for each row of a CSV/JSONL file"""
+    bl_idname = 'RSNodeTaskTableNode'
+    bl_label = 'Task Table'
+
+    file: StringProperty(name='Table File', subtype='FILE_PATH', update=update_node)
+    format: EnumProperty(name='Format', items=[
+        ('AUTO', 'Auto', 'By the file extension'),
+        ('CSV', 'CSV', 'First row is the header'),
+        ('JSONL', 'JSONL', 'One json object on each line')],
+                         default='AUTO', update=update_node)
+
+    row_start: IntProperty(name='First Row', default=0, min=0, update=update_node)
+    row_end: IntProperty(name='Last Row', description='Stop before this row, 0 for all the rows',
+                         default=0, min=0, update=update_node)
+
+    def init(self, context):
+        self.outputs.new('RSNodeSocketTaskSettings', "Settings")
+        self.width = 220
+
+    def draw_buttons(self, context, layout):
+        layout.prop(self, 'file', text='')
+        layout.prop(self, 'format', text='')
+        row = layout.row(align=1)
+        row.prop(self, 'row_start', text='From')
+        row.prop(self, 'row_end', text='To')
+
+        path = bpy.path.abspath(self.file)
+        if self.file and os.path.isfile(path):
+            try:
+                layout.label(text=f'{count_rows(path, self.format)} rows', icon='TEXT')
+            except (OSError, ValueError) as e:
+                layout.label(text=str(e), icon='ERROR')
+
+    def get_data(self):
+        task_data = {}
+        path = bpy.path.abspath(self.file)
+        if not os.path.isfile(path):
+            self.use_custom_color = 1
+            self.color = (1, 0, 0)
+            return task_data
+
+        self.use_custom_color = 0
+        task_data['task_table'] = {'file'     : path,
+                                   'format'   : self.format,
+                                   'row_start': self.row_start,
+                                   'row_end'  : self.row_end}
+        return task_data
+
+
+def register():
+    bpy.utils.register_class(RSNodeTaskTableNode)
+
+
+def unregister():
+    bpy.utils.unregister_class(RSNodeTaskTableNode)
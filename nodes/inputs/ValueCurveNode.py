@@ -0,0 +1,92 @@
+import bpy
+from bpy.props import *
+
+from ...nodes.BASE.node_tree import RenderStackNode
+
+
+def update_node(self, context):
+    self.update_parms()
+
+
+class RSNodeValueCurveNode(RenderStackNode):
+    """Drive a task data key over the frames with keyframes or an expression"""
+    bl_idname = 'RSNodeValueCurveNode'
+    bl_label = 'Value Curve'
+
+    key: StringProperty(name='Key', description='Task data key, dots for nested keys, eg. "ev", "samples"',
+                        default='ev', update=update_node)
+    source: EnumProperty(name='Source', items=[
+        ('KEYFRAMES', 'Keyframes', 'Insert keyframes on the value'),
+        ('EXPRESSION', 'Expression', 'Numpy expression of "frame"')],
+                         default='KEYFRAMES', update=update_node)
+
+    value: FloatProperty(name='Value', update=update_node)
+    expression: StringProperty(name='Expression', default='sin(frame / 10)', update=update_node)
+    use_int: BoolProperty(name='Integer', description='Round the values, for samples, bounces...',
+                          default=False, update=update_node)
+
+    def init(self, context):
+        self.outputs.new('RSNodeSocketTaskSettings', "Settings")
+        self.width = 200
+
+    def draw_buttons(self, context, layout):
+        super().draw_buttons(context, layout)
+        layout.prop(self, 'key')
+        layout.prop(self, 'source', expand=1)
+        if self.source == 'KEYFRAMES':
+            row = layout.row(align=1)
+            row.prop(self, 'value')
+            fc = self.get_fcurve()
+            row.label(text=f'{len(fc.keyframe_points)} keys' if fc else 'No keys')
+        else:
+            layout.prop(self, 'expression', text='')
+        layout.prop(self, 'use_int')
+
+    def get_fcurve(self):
+        ad = self.id_data.animation_data
+        if not ad or not ad.action: return None
+        return ad.action.fcurves.find(self.path_from_id('value'))
+
+    def get_keyframes(self, frames=None):
+        """keys of linear or constant fcurves, samples on each frame for the others
+        :parm frames: frames to sample, the keys and the scene frames if None
+        """
+        fc = self.get_fcurve()
+        if not fc or len(fc.keyframe_points) == 0:
+            return {'x': [0], 'y': [self.value], 'interpolation': 'CONSTANT'}
+
+        interpolations = {kp.interpolation for kp in fc.keyframe_points}
+        if len(interpolations) == 1 and interpolations <= {'LINEAR', 'CONSTANT'} and not fc.modifiers:
+            # evaluate_curve extend the keys like the fcurve extrapolation
+            return {'x'            : [kp.co[0] for kp in fc.keyframe_points],
+                    'y'            : [kp.co[1] for kp in fc.keyframe_points],
+                    'interpolation': interpolations.pop(),
+                    'extrapolation': fc.extrapolation}
+
+        if frames is None:
+            scn = bpy.context.scene
+            start, end = (int(f) for f in fc.range())
+            frames = range(min(start, scn.frame_start), max(end, scn.frame_end) + 1)
+        # the queue sample it again on the frames of the task
+        return {'x': list(frames), 'y': [fc.evaluate(f) for f in frames], 'interpolation': 'LINEAR',
+                'sampled': True}
+
+    def get_data(self):
+        if self.key == '':
+            self.set_warning(msg='No key to drive')
+            return {}
+
+        curve = {'key': self.key, 'type': self.source, 'int': self.use_int}
+        if self.source == 'KEYFRAMES':
+            curve.update(self.get_keyframes())
+        else:
+            curve['expression'] = self.expression
+        return {self.name: curve}
+
+
+def register():
+    bpy.utils.register_class(RSNodeValueCurveNode)
+
+
+def unregister():
+    bpy.utils.unregister_class(RSNodeValueCurveNode)
@@ -16,6 +16,13 @@ class RSNodeFrameRangeInputNode(RenderStackNode):
 
     frame_step: IntProperty(name="Frame Step", default=1, min=1, update=update_node)
 
+    render_animation: BoolProperty(name="Render Animation", default=False,
+                                   description="Render the whole range in one render call, "
+                                               "keep the engine warm and allow movie formats")
+    skip_static: BoolProperty(name="Skip Held Frames", default=False,
+                              description="Render only the first frame where nothing is animated, "
+                                          "the held frames are hardlinked to it")
+
     def init(self, context):
         self.outputs.new('RSNodeSocketOutputSettings', "Output Settings")
         self.width = 200
@@ -28,6 +35,9 @@ class RSNodeFrameRangeInputNode(RenderStackNode):
         row.prop(self, 'frame_end', text='End')
 
         col.prop(self, 'frame_step')
+        col.prop(self, 'render_animation')
+        if not self.render_animation:
+            col.prop(self, 'skip_static')
 
     def get_data(self):
         task_data = {}
@@ -36,6 +46,10 @@ class RSNodeFrameRangeInputNode(RenderStackNode):
         task_data["frame_start"] = self.frame_start
         task_data["frame_end"] = self.frame_end
         task_data["frame_step"] = self.frame_step
+        if self.render_animation:
+            task_data["render_animation"] = True
+        elif self.skip_static:
+            task_data["skip_static"] = True
         return task_data
 
 
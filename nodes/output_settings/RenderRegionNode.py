@@ -0,0 +1,89 @@
+import bpy
+from bpy.props import *
+from ...nodes.BASE.node_tree import RenderStackNode
+
+
+def update_node(self, context):
+    self.update_parms()
+
+
+class RSNodeRenderRegionNode(RenderStackNode):
+    """Render a border rectangle of the frame, and patch it into the existing output"""
+    bl_idname = "RSNodeRenderRegionNode"
+    bl_label = 'Render Region'
+
+    min_x: FloatProperty(name='Min X', default=0.25, min=0, max=1, update=update_node)
+    max_x: FloatProperty(name='Max X', default=0.75, min=0, max=1, update=update_node)
+    min_y: FloatProperty(name='Min Y', default=0.25, min=0, max=1, update=update_node)
+    max_y: FloatProperty(name='Max Y', default=0.75, min=0, max=1, update=update_node)
+
+    use_crop: BoolProperty(name='Crop', description='Crop the render to the region', default=False,
+                           update=update_node)
+    use_patch: BoolProperty(name='Patch Existing Output',
+                            description='Composite the region into the existing output file instead of replacing it',
+                            default=True)
+    feather: IntProperty(name='Feather', description='Pixels to blend at the edges of the patch',
+                         default=8, min=0, soft_max=64, subtype='PIXEL')
+
+    def init(self, context):
+        self.outputs.new('RSNodeSocketOutputSettings', "Output Settings")
+        self.width = 200
+
+    def draw_buttons(self, context, layout):
+        col = layout.column(align=1)
+        row = col.row(align=1)
+        row.prop(self, 'min_x', text='X')
+        row.prop(self, 'max_x', text='')
+        row = col.row(align=1)
+        row.prop(self, 'min_y', text='Y')
+        row.prop(self, 'max_y', text='')
+        col.operator('rsn.pick_render_region', icon='EYEDROPPER').node_name = self.name
+
+        col = layout.column(align=1)
+        col.prop(self, 'use_patch')
+        if self.use_patch:
+            col.prop(self, 'feather')
+        else:
+            col.prop(self, 'use_crop')
+
+    def get_data(self):
+        task_data = {}
+        task_data['render_region'] = {'min_x': min(self.min_x, self.max_x),
+                                      'max_x': max(self.min_x, self.max_x),
+                                      'min_y': min(self.min_y, self.max_y),
+                                      'max_y': max(self.min_y, self.max_y),
+                                      # the patch is pasted by pixel, the cropped image is enough
+                                      'crop' : self.use_crop or self.use_patch}
+        if self.use_patch:
+            task_data['region_patch'] = {'feather': self.feather}
+        return task_data
+
+
+class RSN_OT_PickRenderRegion(bpy.types.Operator):
+    """Use the render region of the scene (Ctrl B in the camera view)"""
+    bl_idname = 'rsn.pick_render_region'
+    bl_label = 'From Camera View'
+
+    node_name: StringProperty()
+
+    def execute(self, context):
+        node = context.space_data.edit_tree.nodes.get(self.node_name)
+        rn = context.scene.render
+        if not node: return {'CANCELLED'}
+        if not rn.use_border:
+            self.report({'WARNING'}, 'Draw a render region in the camera view first (Ctrl B)')
+            return {'CANCELLED'}
+
+        node.min_x, node.max_x = rn.border_min_x, rn.border_max_x
+        node.min_y, node.max_y = rn.border_min_y, rn.border_max_y
+        return {'FINISHED'}
+
+
+def register():
+    bpy.utils.register_class(RSNodeRenderRegionNode)
+    bpy.utils.register_class(RSN_OT_PickRenderRegion)
+
+
+def unregister():
+    bpy.utils.unregister_class(RSNodeRenderRegionNode)
+    bpy.utils.unregister_class(RSN_OT_PickRenderRegion)
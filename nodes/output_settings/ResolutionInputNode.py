@@ -1,6 +1,5 @@
 import bpy
 import os
-import shutil
 
 from bpy.props import *
 from bpy.types import Operator, Menu, Panel
@@ -8,7 +7,7 @@ from bl_operators.presets import AddPresetBase
 from bl_ui.utils import PresetPanel
 
 from ...nodes.BASE.node_tree import RenderStackNode
-from ... import __folder_name__
+from ...preset_manifest import install_presets
 
 
 def update_node(self, context):
@@ -103,43 +102,11 @@ class RSN_OT_AddResolutionPreset(AddPresetBase, Operator):
     preset_subdir = 'RSN/resolution_preset'
 
 
-def get_files_from_path(path):
-    files = []
-    for dirName, subdirList, fileList in os.walk(path):
-        dir_ = dirName.replace(path, '')
-        for f in fileList:
-            files.append(os.path.join(dir_, f))
-    return files
-
-
 def add_res_preset_to_user():
     presets_folder = bpy.utils.user_resource('SCRIPTS', "presets")
     rsn_presets_folder = os.path.join(presets_folder, 'RSN', 'resolution_preset')
 
-    if not os.path.exists(rsn_presets_folder):
-        os.makedirs(rsn_presets_folder, exist_ok=True)
-
-    destination = get_files_from_path(rsn_presets_folder)
-
-    addon_folder = bpy.utils.user_resource('SCRIPTS', "addons")
-
-    bundled_presets_folder = os.path.join(addon_folder, __folder_name__, 'preset', 'resolution_preset')
-    # Check what's in the add-on presets folder
-    source = get_files_from_path(bundled_presets_folder)
-
-    # Compare the folders
-    difference = set(source) - set(destination)
-    if len(difference) != 0:
-        print('RSN will install bundled Resolution presets:\n' + str(difference))
-
-    for f in difference:
-        file = os.path.join(bundled_presets_folder, f)
-        dest_file = os.path.join(rsn_presets_folder, f)
-        dest_folder = os.path.dirname(dest_file)
-        if not os.path.exists(dest_folder):
-            os.makedirs(dest_folder, exist_ok=True)
-
-        shutil.copy2(file, dest_folder)
+    install_presets('resolution_preset', rsn_presets_folder)
 
 
 classes = (
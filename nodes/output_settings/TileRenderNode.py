@@ -0,0 +1,52 @@
+import bpy
+import os
+from bpy.props import IntProperty
+from ...nodes.BASE.node_tree import RenderStackNode
+
+
+def update_node(self, context):
+    self.update_parms()
+
+
+class RSNodeTileRenderNode(RenderStackNode):
+    """Split a still into tiles, each tile render in a background blender"""
+    bl_idname = "RSNodeTileRenderNode"
+    bl_label = 'Tile Render'
+
+    tiles_x: IntProperty(name='Tiles X', default=2, min=1, soft_max=16, update=update_node)
+    tiles_y: IntProperty(name='Tiles Y', default=2, min=1, soft_max=16, update=update_node)
+    overlap: IntProperty(name='Overlap', description='Pixels each tile extends into its neighbours, '
+                                                     'blended to hide the denoiser seams',
+                         default=16, min=0, soft_max=128, subtype='PIXEL', update=update_node)
+    workers: IntProperty(name='Workers', description='Max number of blender processes at the same time',
+                         default=max(1, min(4, os.cpu_count() or 1)), min=1, soft_max=32,
+                         update=update_node)
+
+    def init(self, context):
+        self.outputs.new('RSNodeSocketOutputSettings', "Output Settings")
+        self.width = 180
+
+    def draw_buttons(self, context, layout):
+        col = layout.column(align=1)
+        row = col.row(align=1)
+        row.prop(self, 'tiles_x', text='X')
+        row.prop(self, 'tiles_y', text='Y')
+        col.prop(self, 'overlap')
+        col.prop(self, 'workers')
+
+    def get_data(self):
+        task_data = {}
+        if self.tiles_x * self.tiles_y > 1:
+            task_data['tile_render'] = {'tiles_x': self.tiles_x,
+                                        'tiles_y': self.tiles_y,
+                                        'overlap': self.overlap,
+                                        'workers': self.workers}
+        return task_data
+
+
+def register():
+    bpy.utils.register_class(RSNodeTileRenderNode)
+
+
+def unregister():
+    bpy.utils.unregister_class(RSNodeTileRenderNode)
@@ -1,10 +1,71 @@
 import bpy
 from bpy.props import StringProperty, PointerProperty, EnumProperty, BoolProperty
 
+import time
+import hashlib
+import traceback
+from collections import OrderedDict
+
 from ...nodes.BASE.node_tree import RenderStackNode
 from ...preferences import get_pref
 
 
+class RSN_ScriptCache:
+    """Compiled code of the scripts, keyed by the hash of the source
+    a changed Text block has another hash, so it compile again. Old code is dropped when the cache is full
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.codes = OrderedDict()  # (filename, hash): code
+
+    def get(self, source, filename):
+        key = (filename, hashlib.sha1(source.encode('utf-8')).hexdigest())
+        code = self.codes.get(key)
+        if code is None:
+            code = compile(source, filename, 'exec')
+            self.codes[key] = code
+            if len(self.codes) > self.maxsize:
+                self.codes.popitem(last=False)
+        else:
+            self.codes.move_to_end(key)
+        return code
+
+    def clear(self):
+        self.codes.clear()
+
+
+script_cache = RSN_ScriptCache()
+# node name: execution time of the last run in ms
+script_times = {}
+
+
+def get_error_line(e, filename):
+    """line of the error in the script, None if unknown"""
+    if isinstance(e, SyntaxError) and e.filename == filename:
+        return e.lineno
+    lines = [frame.lineno for frame in traceback.extract_tb(e.__traceback__) if frame.filename == filename]
+    return lines[-1] if lines else None
+
+
+def run_script(node_name, source, filename, task_data, env=None):
+    """run a script with bpy, scene and task_data in its namespace
+    :parm filename: name of the Text block, so the errors point to its line
+    :parm env: dict of other names the script can use, copied into the namespace
+    """
+    code = script_cache.get(source, filename)
+    namespace = dict(env) if env else {}
+    namespace.update({'__name__' : '__rsn_script__',
+                      'bpy'      : bpy,
+                      'scene'    : bpy.context.scene,
+                      'task_data': task_data})
+    t1 = time.perf_counter()
+    try:
+        exec(code, namespace)
+    finally:
+        script_times[node_name] = (time.perf_counter() - t1) * 1000
+
+
 def update_node(self, context):
     self.update_parms()
 
@@ -42,6 +103,9 @@ class RSNodeScriptsNode(RenderStackNode):
         else:
             layout.prop(self, "file", text="")
 
+        if self.name in script_times:
+            layout.label(text=f'Last run: {script_times[self.name]:.2f} ms', icon='TIME')
+
         pref = get_pref()
         if not pref.node_viewer.update_scripts:
             layout.label(text='Update is disable in viewer node', icon='ERROR')
@@ -58,4 +122,5 @@ def register():
 
 
 def unregister():
+    script_cache.clear()
     bpy.utils.unregister_class(RSNodeScriptsNode)
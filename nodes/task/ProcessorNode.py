@@ -1,6 +1,9 @@
 import bpy
+import json
 from bpy.props import *
 from ...nodes.BASE.node_tree import RenderStackNode
+from ...utility import format_duration
+from ...render_stats import format_mem
 
 
 class RSNodeProcessorNode(RenderStackNode):
@@ -18,6 +21,8 @@ class RSNodeProcessorNode(RenderStackNode):
     frame_start: IntProperty()
     frame_end: IntProperty()
     frame_current: IntProperty()
+    # json summary of RSN_RenderStats, set when the queue end
+    stats_summary: StringProperty(default='')
 
     green: FloatVectorProperty(subtype='COLOR', default=(0, 1, 0), min=1, max=1)
     red: FloatVectorProperty(subtype='COLOR', default=(0, 0, 0), min=1, max=1)
@@ -104,6 +109,27 @@ class RSNodeProcessorNode(RenderStackNode):
             except:
                 pass
 
+        if self.stats_summary != '':
+            self.draw_stats(layout)
+
+    def draw_stats(self, layout):
+        summary = json.loads(self.stats_summary)
+        layout.separator(factor=0.5)
+        box = layout.box().column(align=1)
+        box.label(text=f"Stats: {summary['frames']} frames | {format_duration(summary['total_time'])}", icon='INFO')
+
+        box.label(text='Slowest Frames', icon='SORTTIME')
+        for f in summary['slowest']:
+            box.label(text=f"  {f['task']} | {f['frame']}: {f['time']:.2f} s")
+
+        box.label(text='Peak Memory', icon='MEMORY')
+        for f in summary['peak_mem']:
+            box.label(text=f"  {f['task']} | {f['frame']}: {format_mem(f['peak_mem'])}")
+
+        box.label(text='Tasks', icon='PRESET')
+        for name, t in summary['tasks'].items():
+            box.label(text=f"  {name}: {t['avg_time']:.2f} s avg | {format_mem(t['peak_mem'])} peak")
+
 
 def register():
     bpy.utils.register_class(RSNodeProcessorNode)
@@ -25,6 +25,26 @@ class RSNodeRenderListNode(RenderStackNode):
 
     processor_node: StringProperty(name='Processor', default='')
 
+    use_persistent_data: BoolProperty(name='Persistent Data',
+                                      description='Keep the render data between tasks (Cycles), '
+                                                  'tasks with the same scene changes will be rendered together',
+                                      default=False)
+
+    # clean the memory between tasks
+    use_memory_hygiene: BoolProperty(name='Memory Hygiene', description='Clean the memory between tasks',
+                                     default=False)
+    purge_orphans: BoolProperty(name='Purge Orphans', description='Remove the data without users',
+                                default=True)
+    free_images: BoolProperty(name='Free Image Buffers', description='Free the pixels of the unused images',
+                              default=True)
+    trace_python: BoolProperty(name='Trace Python', description='Log the python allocations of RSN (slower)',
+                               default=False)
+    memory_limit: IntProperty(name='Memory Limit (MB)', description='0 for no limit', default=0, min=0)
+    limit_action: EnumProperty(name='Over Limit', items=[
+        ('WARNING', 'Warning', 'Log a warning'),
+        ('RESTART', 'Restart Worker', 'Restart the background blender of a render plan, warning otherwise')],
+                               default='WARNING')
+
     def init(self, context):
         self.inputs.new('RSNodeSocketRenderList', "Task")
         self.outputs.new('RSNodeSocketRenderList', 'Processor')
@@ -42,6 +62,7 @@ class RSNodeRenderListNode(RenderStackNode):
         sheet.clean_path = self.clean_path
         sheet.render_display_type = self.render_display_type
         sheet.processor_node = self.processor_node
+        sheet.use_persistent_data = self.use_persistent_data
 
         layout.separator(factor=0.2)
         col = layout.column(align=0)
@@ -52,6 +73,27 @@ class RSNodeRenderListNode(RenderStackNode):
         col.prop(self, 'open_dir')
         col.prop(self, 'clean_path')
         col.prop(self, 'render_display_type')
+        col.prop(self, 'use_persistent_data')
+
+    def draw_buttons_ext(self, context, layout):
+        self.draw_buttons(context, layout)
+
+        layout.separator(factor=0.2)
+        row = layout.row(align=1)
+        row.operator('rsn.export_plan', icon='EXPORT').render_list_node_name = self.name
+        row.operator('rsn.run_plan', icon='IMPORT')
+        layout.operator('rsn.start_render_worker', icon='CONSOLE')
+
+        layout.separator(factor=0.2)
+        col = layout.column(align=1)
+        col.prop(self, 'use_memory_hygiene')
+        sub = col.column(align=1)
+        sub.active = self.use_memory_hygiene
+        sub.prop(self, 'purge_orphans')
+        sub.prop(self, 'free_images')
+        sub.prop(self, 'trace_python')
+        sub.prop(self, 'memory_limit')
+        sub.prop(self, 'limit_action', text='')
 
     def update(self):
         self.auto_update_inputs('RSNodeSocketRenderList', "Task")
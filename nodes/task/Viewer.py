@@ -1,4 +1,5 @@
 from bpy.props import *
+from functools import partial
 
 from ...nodes.BASE.node_tree import RenderStackNode
 from ...utility import *
@@ -16,6 +17,42 @@ def reroute(node):
     return task_node_name
 
 
+def update_viewer_node(tree_name, node_name):
+    """find the task linked to the viewer node and update it"""
+    nt = bpy.data.node_groups.get(tree_name)
+    if not nt or node_name not in nt.nodes: return
+    viewer = nt.nodes[node_name]
+
+    rsn_task = RSN_Nodes(node_tree=nt, root_node_name=node_name)
+    # children of the viewer with the active Variants only
+    node_list = rsn_task.get_children_from_task(task_name=node_name)
+
+    if node_list:
+        node_list_str = ','.join(node_list)
+
+        if bpy.context.window_manager.rsn_node_list != node_list_str:
+            bpy.context.window_manager.rsn_node_list = node_list_str
+
+            pref = get_pref()
+
+            if viewer.inputs[0].is_linked:
+                try:
+                    node = reroute(viewer.inputs[0].links[0].from_node)
+                    bpy.context.window_manager.rsn_viewer_node = node.name
+                    bpy.ops.rsn.update_parms(view_mode_handler=node.name,
+                                             tree_name=tree_name,
+                                             update_scripts=pref.node_viewer.update_scripts,
+                                             use_render_mode=False)
+                    # This error shows when the dragging the link off viewer node(Works well with knife tool)
+                    # this seems to be a blender error
+
+                except IndexError:
+                    pass
+
+            else:
+                bpy.context.window_manager.rsn_viewer_node = ''
+
+
 class RSN_OT_AddViewerNode(bpy.types.Operator):
     bl_idname = 'rsn.add_viewer_node'
     bl_label = 'Add Viewer Node'
@@ -65,49 +102,10 @@ class RSNodeViewerNode(RenderStackNode):
         return f'Task: {bpy.context.window_manager.rsn_viewer_node}'
 
     def update(self):
-        rsn_task = RSN_Nodes(node_tree=bpy.context.space_data.edit_tree,
-                             root_node_name=self.name)
-
-        node_list = rsn_task.get_children_from_node(self)  # VariantsNodeProperty node in each task
-        # only one set VariantsNodeProperty node will be active
-        var_collect = {}
-        for node_name in node_list:
-            set_var_node = rsn_task.nt.nodes[node_name]
-            if set_var_node.bl_idname == 'RSNodeSetVariantsNode':
-                for item in set_var_node.node_collect:
-                    if item.use:
-                        var_collect[item.name] = item.active
-                break
-
-        for node_name, active in var_collect.items():
-            var_node = rsn_task.nt.nodes[node_name]
-            black_list = rsn_task.get_children_from_var_node(var_node, active)
-
-            node_list = [i for i in node_list if i not in black_list]
-
-        if len(node_list) > 0:
-            node_list_str = ','.join(node_list)
-
-            if bpy.context.window_manager.rsn_node_list != node_list_str:
-                bpy.context.window_manager.rsn_node_list = node_list_str
-
-                pref = get_pref()
-
-                if self.inputs[0].is_linked:
-                    try:
-                        node = reroute(self.inputs[0].links[0].from_node)
-                        bpy.context.window_manager.rsn_viewer_node = node.name
-                        bpy.ops.rsn.update_parms(view_mode_handler=node.name,
-                                                 update_scripts=pref.node_viewer.update_scripts,
-                                                 use_render_mode=False)
-                        # This error shows when the dragging the link off viewer node(Works well with knife tool)
-                        # this seems to be a blender error
-
-                    except IndexError:
-                        pass
-
-                else:
-                    bpy.context.window_manager.rsn_viewer_node = ''
+        # knife cut or muting many nodes call this for every change, only the last one is needed
+        pref = get_pref()
+        rsn_debouncer.push('viewer', partial(update_viewer_node, self.id_data.name, self.name),
+                           delay=pref.node_viewer.update_delay)
 
     def free(self):
         bpy.context.window_manager.rsn_viewer_node = ''
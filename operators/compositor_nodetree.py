@@ -5,79 +5,173 @@ import os
 from ..preferences import get_pref
 
 
-class RSN_OT_CreatCompositorNode(bpy.types.Operator):
-    bl_idname = "rsn.creat_compositor_node"
-    bl_label = "Separate Passes"
-
-    use_passes: BoolProperty(default=False)
-    view_layer: StringProperty(default="")
-
-    def set_context_layer(self):
-        nt = bpy.context.scene.node_tree
-        context_layer = None
-        for node in bpy.context.scene.node_tree.nodes:
-            if node.name == f'RSN {bpy.context.window.view_layer.name} Render Layers':
-                context_layer = node
-        if not context_layer:
-            context_layer = nt.nodes.new(type="CompositorNodeRLayers")
-            context_layer.name = f'RSN {bpy.context.window.view_layer.name} Render Layers'
-
-        try:
-            name = get_pref().node_view_layer_passes.comp_node_name
-
-            com = bpy.context.scene.node_tree.nodes[name]
-            nt.links.new(context_layer.outputs[0], com.inputs[0])
-        except Exception as e:
-            for node in bpy.context.scene.node_tree.nodes:
-                if node.bl_idname == 'CompositorNodeComposite':
-                    bpy.context.scene.node_tree.nodes.remove(node)
-
+def rl_node_name(view_layer):
+    return f'RSN {view_layer} Render Layers'
+
+
+def output_node_name(view_layer):
+    return f'RSN {view_layer} Output'
+
+
+def is_rsn_node(node):
+    """nodes created by RSN, they can be removed when not needed"""
+    return node.name.startswith('RSN ') and (
+            (node.bl_idname == 'CompositorNodeRLayers' and node.name.endswith(' Render Layers')) or
+            (node.bl_idname == 'CompositorNodeOutputFile' and node.name.endswith(' Output')))
+
+
+def compare(obj, attr, val):
+    if getattr(obj, attr) != val:
+        setattr(obj, attr, val)
+
+
+class RSN_CompositorSync:
+    """Declarative compositor for the View Layer Passes node
+    Compute the RSN nodes and links a task needs, then apply only the difference to the compositor tree
+    """
+
+    def __init__(self, scene, view_layer_passes, context_layer):
+        """
+        :parm view_layer_passes: task_data['view_layer_passes'], {node name: {'view_layer':str, 'use_passes':bool}}
+        :parm context_layer: name of the view layer to render
+        """
+        self.scene = scene
+        self.context_layer = context_layer
+        # view layers that need a file output node
+        self.pass_layers = []
+        for data in view_layer_passes.values():
+            view_layer = data['view_layer'] if data['view_layer'] != '' else context_layer
+            if data['use_passes'] and view_layer not in self.pass_layers:
+                self.pass_layers.append(view_layer)
+
+    def need_compositing(self):
+        return len(self.pass_layers) != 0
+
+    def desired_nodes(self):
+        """{node name: bl_idname}"""
+        nodes = {rl_node_name(self.context_layer): 'CompositorNodeRLayers'}
+        for view_layer in self.pass_layers:
+            nodes[rl_node_name(view_layer)] = 'CompositorNodeRLayers'
+            nodes[output_node_name(view_layer)] = 'CompositorNodeOutputFile'
+        return nodes
+
+    def apply(self):
+        scn = self.scene
+        if not self.need_compositing():
+            self.clear()
+            return
+
+        if not scn.use_nodes:
+            scn.use_nodes = True
+            # remember that RSN turn it on, so it can be turned off again
+            scn['rsn_use_nodes'] = True
+
+        nt = scn.node_tree
+        desired = self.desired_nodes()
+
+        # remove the RSN nodes that is not needed any more
+        for node in [node for node in nt.nodes if is_rsn_node(node) and node.name not in desired]:
+            nt.nodes.remove(node)
+
+        for view_layer in {self.context_layer, *self.pass_layers}:
+            self.sync_render_layer(nt, view_layer)
+
+        self.sync_composite(nt)
+
+        for view_layer in self.pass_layers:
+            self.sync_file_output(nt, view_layer)
+
+    def clear(self):
+        """remove RSN file outputs and turn off compositing if RSN turned it on"""
+        scn = self.scene
+        if scn.node_tree:
+            for node in [node for node in scn.node_tree.nodes if is_rsn_node(node) and
+                                                                 node.bl_idname == 'CompositorNodeOutputFile']:
+                scn.node_tree.nodes.remove(node)
+
+        if scn.get('rsn_use_nodes'):
+            scn.use_nodes = False
+            del scn['rsn_use_nodes']
+
+    def get_node(self, nt, name, bl_idname):
+        node = nt.nodes.get(name)
+        if node and node.bl_idname != bl_idname:
+            nt.nodes.remove(node)
+            node = None
+        if not node:
+            node = nt.nodes.new(type=bl_idname)
+            node.name = name
+        return node
+
+    def link(self, nt, output, input):
+        for link in input.links:
+            if link.from_socket == output: return
+        nt.links.new(output, input)
+
+    def sync_render_layer(self, nt, view_layer):
+        node = self.get_node(nt, rl_node_name(view_layer), 'CompositorNodeRLayers')
+        if view_layer in self.scene.view_layers:
+            compare(node, 'layer', view_layer)
+        return node
+
+    def sync_composite(self, nt):
+        """keep the render result when compositing is turned on by RSN"""
+        name = get_pref().node_view_layer_passes.comp_node_name
+        com = nt.nodes.get(name)
+        if not com or com.bl_idname != 'CompositorNodeComposite':
+            com = next((node for node in nt.nodes if node.bl_idname == 'CompositorNodeComposite'), None)
+        if not com:
             com = nt.nodes.new(type="CompositorNodeComposite")
             com.name = 'Composite'
             com.location = 430, 430
-            nt.links.new(context_layer.outputs[0], com.inputs[0])
 
-    def execute(self, context):
-        scn = context.scene
-        scn.use_nodes = True
+        # do not override the user's compositing
+        if not com.inputs[0].is_linked:
+            nt.links.new(nt.nodes[rl_node_name(self.context_layer)].outputs[0], com.inputs[0])
 
-        nt = context.scene.node_tree
+    def sync_file_output(self, nt, view_layer):
+        render_layer_node = nt.nodes[rl_node_name(view_layer)]
+        name = output_node_name(view_layer)
 
-        self.set_context_layer()
+        is_new = name not in nt.nodes
+        file_output_node = self.get_node(nt, name, 'CompositorNodeOutputFile')
+        if is_new:
+            file_output_node.label = name
+            file_output_node.location = (400, -300)
+            file_output_node.width = 200
+            file_output_node.hide = True
+            file_output_node.file_slots.clear()
 
-        try:
-            render_layer_node = nt.nodes[f'RSN {self.view_layer} Render Layers']
-        except:
-            render_layer_node = nt.nodes.new(type="CompositorNodeRLayers")
-            render_layer_node.name = f'RSN {self.view_layer} Render Layers'
+        compare(file_output_node, 'base_path', os.path.join(self.scene.render.filepath, view_layer))
 
-        if self.view_layer != '':
-            render_layer_node.layer = self.view_layer
+        outputs = [output for output in render_layer_node.outputs if output.enabled]
+        slot_names = {f"{view_layer}.{output.name}" for output in outputs}
 
-        try:
-            nt.nodes.remove(nt.nodes[f'RSN {self.view_layer} Output'])
-        except Exception as e:
-            pass
+        for slot in [slot for slot in file_output_node.file_slots if slot.path not in slot_names]:
+            file_output_node.file_slots.remove(file_output_node.inputs[slot.path])
 
-        if self.use_passes:
-            file_output_node = nt.nodes.new(type="CompositorNodeOutputFile")
-            file_output_node.name = f"RSN {self.view_layer} Output"
-            file_output_node.label = f"RSN {self.view_layer} Output"
+        for output in outputs:
+            output_name = f"{view_layer}.{output.name}"
+            if output_name not in file_output_node.file_slots:
+                file_output_node.file_slots.new(name=output_name)
+            self.link(nt, output, file_output_node.inputs[output_name])
 
-            file_output_node.base_path = os.path.join(context.scene.render.filepath, self.view_layer)
-            file_output_node.location = (400, -300)
-            file_output_node.width = 200
-            file_output_node.hide = True
 
-            nt = context.scene.node_tree
+def sync_compositor(scene, view_layer_passes, context_layer):
+    RSN_CompositorSync(scene, view_layer_passes, context_layer).apply()
 
-            for i, output in enumerate(render_layer_node.outputs):
-                name = output.name
-                output_name = f"{self.view_layer}.{name}"
-                if output_name not in file_output_node.file_slots:
-                    file_output_node.file_slots.new(name=output_name)
-                nt.links.new(render_layer_node.outputs[name], file_output_node.inputs[output_name])
 
+class RSN_OT_CreatCompositorNode(bpy.types.Operator):
+    bl_idname = "rsn.creat_compositor_node"
+    bl_label = "Separate Passes"
+
+    use_passes: BoolProperty(default=False)
+    view_layer: StringProperty(default="")
+
+    def execute(self, context):
+        sync_compositor(context.scene,
+                        {'': {'view_layer': self.view_layer, 'use_passes': self.use_passes}},
+                        context.view_layer.name)
         return {"FINISHED"}
 
 
@@ -3,182 +3,169 @@ import gpu
 from bpy.types import Operator, Panel, Menu
 from bpy.props import *
 from gpu_extras.batch import batch_for_shader
-from math import cos, sin, pi, hypot
+from math import cos, sin, pi
 
-from .utils import dpifac, draw_tri_fan, get_node_from_pos, draw_text_2d
+from .utils import dpifac, get_node_location, draw_text_2d
 from ...preferences import get_pref
 
+SIDES = 16
 
-def draw_rounded_node_border(shader, node, radius=8, colour=(1.0, 1.0, 1.0, 0.7)):
-    area_width = bpy.context.area.width - (16 * dpifac()) - 1
-    bottom_bar = (16 * dpifac()) + 1
-    sides = 16
-    radius = radius * dpifac()
 
-    nlocx = (node.location.x + 1) * dpifac()
-    nlocy = (node.location.y + 1) * dpifac()
+def corner_points(start, end):
+    """points of the unit circle, computed once instead of every redraw"""
+    return [(cos(i * 2 * pi / SIDES), sin(i * 2 * pi / SIDES)) for i in range(start, end + 1)]
+
+
+TOP_LEFT = corner_points(4, 8)
+TOP_RIGHT = corner_points(0, 4)
+BOTTOM_LEFT = corner_points(8, 12)
+BOTTOM_RIGHT = corner_points(12, 16)
+
+# color index of the vertices
+TASK, FILE_PATH, SETTINGS, INNER = range(4)
+
+
+def rounded_border_tris(x1, y1, x2, y2, radius):
+    """Triangles of a rounded border around a rect in region space
+    :parm x1, y1: top left
+    :parm x2, y2: bottom right
+    :return: list of vertices, 3 for each triangle
+    """
+    tris = []
+
+    for (cx, cy), corner in (((x1, y1), TOP_LEFT), ((x2, y1), TOP_RIGHT),
+                             ((x1, y2), BOTTOM_LEFT), ((x2, y2), BOTTOM_RIGHT)):
+        points = [(radius * ux + cx, radius * uy + cy) for ux, uy in corner]
+        for i in range(len(points) - 1):
+            tris.extend(((cx, cy), points[i], points[i + 1]))
+
+    for a, b, c, d in (((x1 - radius, y2), (x1, y2), (x1, y1), (x1 - radius, y1)),  # left
+                       ((x1, y1), (x2, y1), (x2, y1 + radius), (x1, y1 + radius)),  # top
+                       ((x2, y2), (x2 + radius, y2), (x2 + radius, y1), (x2, y1)),  # right
+                       ((x1, y2), (x2, y2), (x2, y2 - radius), (x1, y2 - radius))):  # bottom
+        tris.extend((a, b, d, d, b, c))
+
+    return tris
+
+
+def get_node_rect(node, view2d):
+    """region space rect of the node
+    :return: x1, y1, x2, y2 (top left, bottom right)
+    """
+    fac = dpifac()
+    locx, locy = get_node_location(node)
+    nlocx = (locx + 1) * fac
+    nlocy = (locy + 1) * fac
     ndimx = node.dimensions.x
     ndimy = node.dimensions.y
-    # This is a stupid way to do this...
-    if node.parent:
-        nlocx += node.parent.location.x
-        nlocy += node.parent.location.y
-        if node.parent.parent:
-            nlocx += node.parent.parent.location.x
-            nlocy += node.parent.parent.location.y
-            if node.parent.parent.parent:
-                nlocx += node.parent.parent.parent.location.x
-                nlocy += node.parent.parent.parent.location.y
 
     if node.hide:
         nlocx += -1
         nlocy += 5
     if node.type == 'REROUTE':
-        # nlocx += 1
         nlocy -= 1
         ndimx = 0
         ndimy = 0
-        radius += 6
-
-    # Top left corner
-    mx, my = bpy.context.region.view2d.view_to_region(nlocx, nlocy, clip=False)
-    vertices = [(mx, my)]
-    for i in range(sides + 1):
-        if (4 <= i <= 8) and my > bottom_bar and mx < area_width:
-            cosine = radius * cos(i * 2 * pi / sides) + mx
-            sine = radius * sin(i * 2 * pi / sides) + my
-            vertices.append((cosine, sine))
-
-    draw_tri_fan(shader, vertices, colour)
-
-    # Top right corner
-    mx, my = bpy.context.region.view2d.view_to_region(nlocx + ndimx, nlocy, clip=False)
-    vertices = [(mx, my)]
-    for i in range(sides + 1):
-        if (0 <= i <= 4) and my > bottom_bar and mx < area_width:
-            cosine = radius * cos(i * 2 * pi / sides) + mx
-            sine = radius * sin(i * 2 * pi / sides) + my
-            vertices.append((cosine, sine))
-
-    draw_tri_fan(shader, vertices, colour)
-
-    # Bottom left corner
-    mx, my = bpy.context.region.view2d.view_to_region(nlocx, nlocy - ndimy, clip=False)
-    vertices = [(mx, my)]
-    for i in range(sides + 1):
-        if (8 <= i <= 12):
-            if my > bottom_bar and mx < area_width:
-                cosine = radius * cos(i * 2 * pi / sides) + mx
-                sine = radius * sin(i * 2 * pi / sides) + my
-                vertices.append((cosine, sine))
-
-    draw_tri_fan(shader, vertices, colour)
-
-    # Bottom right corner
-    mx, my = bpy.context.region.view2d.view_to_region(nlocx + ndimx, nlocy - ndimy, clip=False)
-    vertices = [(mx, my)]
-    for i in range(sides + 1):
-        if (12 <= i <= 16) and my > bottom_bar and mx < area_width:
-            cosine = radius * cos(i * 2 * pi / sides) + mx
-            sine = radius * sin(i * 2 * pi / sides) + my
-            vertices.append((cosine, sine))
-
-    draw_tri_fan(shader, vertices, colour)
-
-    # prepare drawing all edges in one batch
-    vertices = []
-    indices = []
-    id_last = 0
-
-    # Left edge
-    m1x, m1y = bpy.context.region.view2d.view_to_region(nlocx, nlocy, clip=False)
-    m2x, m2y = bpy.context.region.view2d.view_to_region(nlocx, nlocy - ndimy, clip=False)
-    if m1x < area_width and m2x < area_width:
-        vertices.extend([(m2x - radius, m2y), (m2x, m2y),
-                         (m1x, m1y), (m1x - radius, m1y)])
-        indices.extend([(id_last, id_last + 1, id_last + 3),
-                        (id_last + 3, id_last + 1, id_last + 2)])
-        id_last += 4
-
-    # Top edge
-    m1x, m1y = bpy.context.region.view2d.view_to_region(nlocx, nlocy, clip=False)
-    m2x, m2y = bpy.context.region.view2d.view_to_region(nlocx + ndimx, nlocy, clip=False)
-    m1x = min(m1x, area_width)
-    m2x = min(m2x, area_width)
-    if m1y > bottom_bar and m2y > bottom_bar:
-        vertices.extend([(m1x, m1y), (m2x, m1y),
-                         (m2x, m1y + radius), (m1x, m1y + radius)])
-        indices.extend([(id_last, id_last + 1, id_last + 3),
-                        (id_last + 3, id_last + 1, id_last + 2)])
-        id_last += 4
-
-    # Right edge
-    m1x, m1y = bpy.context.region.view2d.view_to_region(nlocx + ndimx, nlocy, clip=False)
-    m2x, m2y = bpy.context.region.view2d.view_to_region(nlocx + ndimx, nlocy - ndimy, clip=False)
-    m1y = max(m1y, bottom_bar)
-    m2y = max(m2y, bottom_bar)
-    if m1x < area_width and m2x < area_width:
-        vertices.extend([(m1x, m2y), (m1x + radius, m2y),
-                         (m1x + radius, m1y), (m1x, m1y)])
-        indices.extend([(id_last, id_last + 1, id_last + 3),
-                        (id_last + 3, id_last + 1, id_last + 2)])
-        id_last += 4
-
-    # Bottom edge
-    m1x, m1y = bpy.context.region.view2d.view_to_region(nlocx, nlocy - ndimy, clip=False)
-    m2x, m2y = bpy.context.region.view2d.view_to_region(nlocx + ndimx, nlocy - ndimy, clip=False)
-    m1x = min(m1x, area_width)
-    m2x = min(m2x, area_width)
-    if m1y > bottom_bar and m2y > bottom_bar:
-        vertices.extend([(m1x, m2y), (m2x, m2y),
-                         (m2x, m1y - radius), (m1x, m1y - radius)])
-        indices.extend([(id_last, id_last + 1, id_last + 3),
-                        (id_last + 3, id_last + 1, id_last + 2)])
-
-    # now draw all edges in one batch
-    if len(vertices) != 0:
-        batch = batch_for_shader(shader, 'TRIS', {"pos": vertices}, indices=indices)
-        shader.bind()
-        shader.uniform_float("color", colour)
-        batch.draw(shader)
 
+    x1, y1 = view2d.view_to_region(nlocx, nlocy, clip=False)
+    x2, y2 = view2d.view_to_region(nlocx + ndimx, nlocy - ndimy, clip=False)
+    return x1, y1, x2, y2
 
-def draw_callback_nodeoutline(self, context):
-    if context.window_manager.rsn_node_list == '':
-        pass
 
-    bgl.glLineWidth(1)
-    bgl.glEnable(bgl.GL_BLEND)
-    bgl.glEnable(bgl.GL_LINE_SMOOTH)
-    bgl.glHint(bgl.GL_LINE_SMOOTH_HINT, bgl.GL_NICEST)
+class OutlineCache:
+    """All outlines in one vertex buffer
+    The vertices are rebuilt only when the nodes / view change, the batch when the alpha change
+    """
 
-    shader = gpu.shader.from_builtin('2D_UNIFORM_COLOR')
+    def __init__(self):
+        self.geo_key = None
+        self.pos = []
+        self.kinds = []
 
-    task_outer = (self.task_color[0], self.task_color[1], self.task_color[2], self.alpha)
-    file_path_outer = (self.file_path_color[0], self.file_path_color[1], self.file_path_color[2], self.alpha)
+        self.batch = None
+        self.batch_key = None
 
-    col_outer = (self.settiings_color[0], self.settiings_color[1], self.settiings_color[2], self.alpha)
-    col_inner = (0.0, 0.0, 0.0, self.alpha + 0.1)
+    def get_geo_key(self, context, nodes, radius):
+        view2d = context.region.view2d
+        return (context.region.width, context.region.height, radius, dpifac(),
+                tuple(view2d.view_to_region(0, 0, clip=False)),
+                tuple(view2d.view_to_region(1000, 1000, clip=False)),
+                tuple((node.name, get_node_location(node), tuple(node.dimensions), node.hide) for node in nodes))
 
-    node_list = context.window_manager.rsn_node_list.split(',')
+    def build_geo(self, context, nodes, radius):
+        view2d = context.region.view2d
+        width, height = context.region.width, context.region.height
+        self.pos = []
+        self.kinds = []
 
-    for node_name in node_list:
-        try:
-            node = context.space_data.edit_tree.nodes[node_name]
+        for node in nodes:
             if node.bl_idname == 'RSNodeTaskNode':
-                draw_rounded_node_border(shader, node, radius=self.radius * 1.25, colour=task_outer)
-                draw_rounded_node_border(shader, node, radius=self.radius * 1.25 - 1.25, colour=col_inner)
-
+                r, kind = radius * 1.25, TASK
+                inner = r - 1.25
             elif node.bl_idname == 'RSNodeFilePathInputNode':
-                draw_rounded_node_border(shader, node, radius=self.radius, colour=file_path_outer)
-                draw_rounded_node_border(shader, node, radius=self.radius - 1, colour=col_inner)
-
+                r, kind = radius, FILE_PATH
+                inner = r - 1
             else:
-                draw_rounded_node_border(shader, node, radius=self.radius, colour=col_outer)
-                draw_rounded_node_border(shader, node, radius=self.radius - 1, colour=col_inner)
+                r, kind = radius, SETTINGS
+                inner = r - 1
+
+            r *= dpifac()
+            inner *= dpifac()
+            if node.type == 'REROUTE':
+                r += 6
+                inner += 6
+
+            x1, y1, x2, y2 = get_node_rect(node, view2d)
+            # view culling
+            if x2 + r < 0 or x1 - r > width or y1 + r < 0 or y2 - r > height:
+                continue
+
+            # outer first, the inner border is drawn over it
+            outer_tris = rounded_border_tris(x1, y1, x2, y2, r)
+            inner_tris = rounded_border_tris(x1, y1, x2, y2, inner)
+            self.pos.extend(outer_tris)
+            self.kinds.extend([kind] * len(outer_tris))
+            self.pos.extend(inner_tris)
+            self.kinds.extend([INNER] * len(inner_tris))
+
+    def get_batch(self, context, shader, nodes, radius, palette):
+        geo_key = self.get_geo_key(context, nodes, radius)
+        if geo_key != self.geo_key:
+            self.build_geo(context, nodes, radius)
+            self.geo_key = geo_key
+            self.batch_key = None
+
+        if palette != self.batch_key:
+            colors = [palette[kind] for kind in self.kinds]
+            self.batch = batch_for_shader(shader, 'TRIS', {"pos": self.pos, "color": colors}) if self.pos else None
+            self.batch_key = palette
+
+        return self.batch
+
+
+def draw_callback_nodeoutline(self, context):
+    bgl.glLineWidth(1)
+    bgl.glEnable(bgl.GL_BLEND)
+    bgl.glEnable(bgl.GL_LINE_SMOOTH)
+    bgl.glHint(bgl.GL_LINE_SMOOTH_HINT, bgl.GL_NICEST)
+
+    shader = gpu.shader.from_builtin('2D_FLAT_COLOR')
+
+    palette = (
+        (self.task_color[0], self.task_color[1], self.task_color[2], self.alpha),
+        (self.file_path_color[0], self.file_path_color[1], self.file_path_color[2], self.alpha),
+        (self.settiings_color[0], self.settiings_color[1], self.settiings_color[2], self.alpha),
+        (0.0, 0.0, 0.0, self.alpha + 0.1),
+    )
+
+    nt = context.space_data.edit_tree
+    node_list = context.window_manager.rsn_node_list.split(',') if context.window_manager.rsn_node_list else []
+    nodes = [nt.nodes[name] for name in node_list if name in nt.nodes] if nt else []
 
-        except KeyError:
-            pass
+    batch = self.outline_cache.get_batch(context, shader, nodes, self.radius, palette)
+    if batch:
+        shader.bind()
+        batch.draw(shader)
 
     # draw text information
     task_text = "No Active Task!" if context.window_manager.rsn_viewer_node == '' else context.window_manager.rsn_viewer_node
@@ -188,10 +175,9 @@ def draw_callback_nodeoutline(self, context):
     file_path_text = context.scene.render.filepath if is_save else "Save your file first!"
     draw_text_2d((1, 1, 1, self.alpha), f"FilePath: {file_path_text}", 20, 40)
 
-
-# restore
-bgl.glDisable(bgl.GL_BLEND)
-bgl.glDisable(bgl.GL_LINE_SMOOTH)
+    # restore
+    bgl.glDisable(bgl.GL_BLEND)
+    bgl.glDisable(bgl.GL_LINE_SMOOTH)
 
 
 class RSN_OT_DrawNodes(Operator, ):
@@ -201,21 +187,24 @@ class RSN_OT_DrawNodes(Operator, ):
     bl_options = {'REGISTER', 'UNDO'}
 
     def modal(self, context, event):
-        context.area.tag_redraw()
-
         if event.type == 'TIMER':
             # show draw
             if context.scene.RSNBusyDrawing:
-                if self.alpha < 0.5: self.alpha += 0.02
+                # only redraw while fading, the draw handler still run on other redraws
+                if self.alpha < 0.5:
+                    self.alpha = min(self.alpha + 0.02, 0.5)
+                    self.area.tag_redraw()
 
             # close draw
             else:
                 if self.alpha > 0:
                     self.alpha -= 0.02
+                    self.area.tag_redraw()
                     return {'RUNNING_MODAL'}
                 # remove handles
                 context.window_manager.event_timer_remove(self._timer)
                 bpy.types.SpaceNodeEditor.draw_handler_remove(self._handle, 'WINDOW')
+                self.area.tag_redraw()
                 return {'FINISHED'}
 
         return {'PASS_THROUGH'}
@@ -223,6 +212,8 @@ class RSN_OT_DrawNodes(Operator, ):
     def invoke(self, context, event):
         # init draw values
         self.alpha = 0
+        self.area = context.area
+        self.outline_cache = OutlineCache()
         self.radius = get_pref().node_viewer.border_radius
         # node color
         self.settiings_color = get_pref().node_viewer.settiings_color
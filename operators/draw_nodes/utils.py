@@ -15,6 +15,17 @@ def dpifac():
     return prefs.dpi * prefs.pixel_size / 72
 
 
+def get_node_location(node):
+    """location in the view, node.location is relative to its parent frame"""
+    x, y = node.location
+    parent = node.parent
+    while parent:
+        x += parent.location.x
+        y += parent.location.y
+        parent = parent.parent
+    return x, y
+
+
 def draw_text_2d(color, text, x, y):
     font_id = 0
     blf.position(font_id, x, y, 0)
@@ -72,71 +83,134 @@ def store_mouse_cursor(context, event):
         space.cursor_location = tree.view_center
 
 
-def get_node_from_pos(nodes, context, event):
-    nodes_near_mouse = []
-    nodes_under_mouse = []
-    target_node = None
+class RSN_NodeGrid:
+    """Uniform grid over the node bounds in view space
+    Only the moved (selected) nodes are updated on each event, all nodes when a node is added, removed,
+    renamed or a frame moves
+    """
+
+    def __init__(self, cell_size=200):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy): set of node names
+        self.bounds = {}  # node name: (x1, y1, x2, y2), y1 is the top
+        self.node_cells = {}  # node name: list of (cx, cy)
+        self.extent = None  # min/max cell index ever used: cx1, cy1, cx2, cy2
+        self.node_names = None  # names of all the nodes at the last rebuild
+
+    def get_cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def get_bounds(self, node):
+        locx, locy = get_node_location(node)
+        dimx = node.dimensions.x / dpifac()
+        dimy = node.dimensions.y / dpifac()
+        return locx, locy, locx + dimx, locy - dimy
+
+    def insert(self, name, bounds):
+        x1, y1, x2, y2 = bounds
+        cx1, cy1 = self.get_cell(x1, y2)
+        cx2, cy2 = self.get_cell(x2, y1)
+        cells = [(cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1)]
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(name)
+        self.bounds[name] = bounds
+
+        if self.extent is None:
+            self.extent = (cx1, cy1, cx2, cy2)
+        else:
+            ex1, ey1, ex2, ey2 = self.extent
+            self.extent = (min(ex1, cx1), min(ey1, cy1), max(ex2, cx2), max(ey2, cy2))
+        self.node_cells[name] = cells
+
+    def remove(self, name):
+        for cell in self.node_cells.pop(name, ()):
+            names = self.cells.get(cell)
+            if names:
+                names.discard(name)
+                if not names: del self.cells[cell]
+        self.bounds.pop(name, None)
+
+    def update_node(self, node):
+        bounds = self.get_bounds(node)
+        if self.bounds.get(node.name) != bounds:
+            self.remove(node.name)
+            self.insert(node.name, bounds)
+
+    def rebuild(self, nodes):
+        names = set()
+        for node in nodes:
+            if node.type == 'FRAME': continue  # no point trying to link to a frame node
+            names.add(node.name)
+            self.update_node(node)
+
+        for name in set(self.bounds) - names:
+            self.remove(name)
+        self.node_names = {node.name for node in nodes}
+
+    def sync(self, nodes, selected_nodes):
+        """update the index incrementally, nodes only move when they are selected"""
+        if self.node_names != {node.name for node in nodes} or any(node.type == 'FRAME' for node in selected_nodes):
+            self.rebuild(nodes)
+        else:
+            for node in selected_nodes:
+                self.update_node(node)
+
+    def nodes_at(self, x, y):
+        names = self.cells.get(self.get_cell(x, y), ())
+        return [name for name in names if
+                self.bounds[name][0] <= x <= self.bounds[name][2] and self.bounds[name][3] <= y <= self.bounds[name][1]]
+
+    def distance(self, name, x, y):
+        """distance to the nearest corner or middle of border"""
+        x1, y1, x2, y2 = self.bounds[name]
+        xm, ym = (x1 + x2) / 2, (y1 + y2) / 2
+        return min(hypot(x - px, y - py) for px, py in ((x1, y1), (x2, y1), (x1, y2), (x2, y2),
+                                                        (xm, y1), (xm, y2), (x1, ym), (x2, ym)))
+
+    def nearest(self, x, y):
+        """search the grid ring by ring around the point"""
+        if not self.cells: return None
+
+        cx, cy = self.get_cell(x, y)
+        ex1, ey1, ex2, ey2 = self.extent
+        max_ring = max(cx - ex1, ex2 - cx, cy - ey1, ey2 - cy, 0)
+
+        best, best_dist = None, float('inf')
+        for ring in range(max_ring + 1):
+            for i in range(cx - ring, cx + ring + 1):
+                for j in range(cy - ring, cy + ring + 1):
+                    if max(abs(i - cx), abs(j - cy)) != ring: continue
+                    for name in self.cells.get((i, j), ()):
+                        dist = self.distance(name, x, y)
+                        if dist < best_dist:
+                            best, best_dist = name, dist
+            # nodes outside this ring are at least this far away
+            if best is not None and best_dist <= ring * self.cell_size:
+                break
+
+        return best
 
+
+node_grids = {}  # node tree name: RSN_NodeGrid
+
+
+def get_node_grid(nodes, context):
+    grid = node_grids.setdefault(nodes.id_data.name, RSN_NodeGrid())
+    grid.sync(nodes, context.selected_nodes or [])
+    return grid
+
+
+def get_node_from_pos(nodes, context, event):
     store_mouse_cursor(context, event)
     x, y = context.space_data.cursor_location
-    x = x
-    y = y
-
-    # Make a list of each corner (and middle of border) for each node.
-    # Will be sorted to find nearest point and thus nearest node
-    node_points_with_dist = []
-
-    for node in nodes:
-        skipnode = False
-        if node.type != 'FRAME':  # no point trying to link to a frame node
-            locx = node.location.x
-            locy = node.location.y
-            dimx = node.dimensions.x / dpifac()
-            dimy = node.dimensions.y / dpifac()
-            if node.parent:
-                locx += node.parent.location.x
-                locy += node.parent.location.y
-                if node.parent.parent:
-                    locx += node.parent.parent.location.x
-                    locy += node.parent.parent.location.y
-                    if node.parent.parent.parent:
-                        locx += node.parent.parent.parent.location.x
-                        locy += node.parent.parent.parent.location.y
-                        if node.parent.parent.parent.parent:
-                            # Support three levels or parenting
-                            # There's got to be a better way to do this...
-                            skipnode = True
-            if not skipnode:
-                node_points_with_dist.append([node, hypot(x - locx, y - locy)])  # Top Left
-                node_points_with_dist.append([node, hypot(x - (locx + dimx), y - locy)])  # Top Right
-                node_points_with_dist.append([node, hypot(x - locx, y - (locy - dimy))])  # Bottom Left
-                node_points_with_dist.append([node, hypot(x - (locx + dimx), y - (locy - dimy))])  # Bottom Right
-
-                node_points_with_dist.append([node, hypot(x - (locx + (dimx / 2)), y - locy)])  # Mid Top
-                node_points_with_dist.append([node, hypot(x - (locx + (dimx / 2)), y - (locy - dimy))])  # Mid Bottom
-                node_points_with_dist.append([node, hypot(x - locx, y - (locy - (dimy / 2)))])  # Mid Left
-                node_points_with_dist.append([node, hypot(x - (locx + dimx), y - (locy - (dimy / 2)))])  # Mid Right
-
-    nearest_node = sorted(node_points_with_dist, key=lambda k: k[1])[0][0]
-
-    for node in nodes:
-        if node.type != 'FRAME' and not skipnode:
-            locx = node.location.x
-            locy = node.location.y
-            dimx = node.dimensions.x / dpifac()
-            dimy = node.dimensions.y / dpifac()
-            if node.parent:
-                locx += node.parent.location.x
-                locy += node.parent.location.y
-            if (locx <= x <= locx + dimx) and \
-                    (locy - dimy <= y <= locy):
-                nodes_under_mouse.append(node)
 
+    grid = get_node_grid(nodes, context)
+    nearest_name = grid.nearest(x, y)
+    if nearest_name is None: return None
+
+    nodes_under_mouse = grid.nodes_at(x, y)
+
+    # use the node under the mouse if there is one and only one, else use the nearest node
     if len(nodes_under_mouse) == 1:
-        if nodes_under_mouse[0] != nearest_node:
-            target_node = nodes_under_mouse[0]  # use the node under the mouse if there is one and only one
-        else:
-            target_node = nearest_node  # else use the nearest node
-    else:
-        target_node = nearest_node
-    return target_node
+        return nodes.get(nodes_under_mouse[0])
+    return nodes.get(nearest_name)
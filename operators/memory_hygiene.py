@@ -0,0 +1,149 @@
+import bpy
+
+import os
+import gc
+import sys
+import logging
+import tracemalloc
+
+logger = logging.getLogger('mylogger')
+
+# python allocations in these files are RSN's own
+RSN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ids that pile up when the tasks swap materials, worlds and compositor nodes
+PURGE_COLLECTIONS = ('materials', 'images', 'node_groups', 'textures', 'worlds', 'meshes', 'lights', 'cameras')
+
+
+def get_rss():
+    """resident memory of this process in MB, None if it can not be read"""
+    try:
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + \
+                           [(name, ctypes.c_size_t) for name in (
+                               'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                               'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                               'PagefileUsage', 'PeakPagefileUsage')]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize / 1024 ** 2
+            return None
+
+        # macOS: only the peak is known (bytes)
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 ** 2
+    except (OSError, ValueError, AttributeError, ImportError):
+        return None
+
+
+def purge_orphans():
+    """remove the data without users
+    :return: number of removed ids
+    """
+    if hasattr(bpy.data, 'orphans_purge'):
+        try:
+            return bpy.data.orphans_purge(do_recursive=True)
+        except TypeError:
+            # older blender: purge one level at a time
+            count = total = bpy.data.orphans_purge()
+            while count:
+                count = bpy.data.orphans_purge()
+                total += count
+            return total
+
+    total = 0
+    for attr in PURGE_COLLECTIONS:
+        coll = getattr(bpy.data, attr)
+        for id in [id for id in coll if id.users == 0 and not id.use_fake_user]:
+            coll.remove(id)
+            total += 1
+    return total
+
+
+def free_image_buffers():
+    """free the pixels of the loaded images that nothing use
+    :return: number of images
+    """
+    count = 0
+    for image in bpy.data.images:
+        if image.type not in {'IMAGE', 'MULTILAYER'} or not image.has_data:
+            continue
+        if image.users - int(image.use_fake_user) == 0:
+            image.buffers_free()
+            count += 1
+    return count
+
+
+def get_hygiene_settings(node):
+    """settings of a Render List node, None if not used"""
+    if not getattr(node, 'use_memory_hygiene', False): return None
+    return {'purge_orphans': node.purge_orphans,
+            'free_images'  : node.free_images,
+            'trace_python' : node.trace_python,
+            'memory_limit' : node.memory_limit,
+            'limit_action' : node.limit_action}
+
+
+class RSN_MemoryHygiene:
+    """Clean the memory between two tasks
+    :parm settings: dict from get_hygiene_settings
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.tracing = False
+
+    def start(self):
+        if self.settings['trace_python'] and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+
+    def stop(self):
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def run(self, task_name=''):
+        """:return: None, or the limit action ('WARNING', 'RESTART') if the memory is over the limit"""
+        s = self.settings
+        before = get_rss()
+
+        purged = purge_orphans() if s['purge_orphans'] else 0
+        freed = free_image_buffers() if s['free_images'] else 0
+        gc.collect()
+
+        after = get_rss()
+        logger.info(f'RSN Memory before "{task_name}": {format_rss(before)} -> {format_rss(after)}, '
+                    f'{purged} orphans purged, {freed} image buffers freed')
+        if tracemalloc.is_tracing():
+            logger.info(f'RSN Python allocations:\n{self.trace_summary()}')
+
+        if s['memory_limit'] and after is not None and after > s['memory_limit']:
+            logger.warning(f'RSN Memory {format_rss(after)} is over the limit of {s["memory_limit"]} MB')
+            return s['limit_action']
+        return None
+
+    def trace_summary(self, count=5):
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, os.path.join(RSN_DIR, '*'))])
+        stats = snapshot.statistics('lineno')
+        lines = [f'  total {sum(stat.size for stat in stats) / 1024:.1f} KiB in {len(stats)} lines']
+        for stat in stats[:count]:
+            frame = stat.traceback[0]
+            lines.append(f'  {os.path.relpath(frame.filename, RSN_DIR)}:{frame.lineno}: '
+                         f'{stat.size / 1024:.1f} KiB in {stat.count} blocks')
+        return '\n'.join(lines)
+
+
+def format_rss(mb):
+    return 'unknown' if mb is None else f'{mb:.0f} MB'
@@ -0,0 +1,269 @@
+import bpy
+from bpy.props import StringProperty
+
+import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utility import *
+from ..task_matrix import get_missing_keys
+
+logger = logging.getLogger('mylogger')
+
+# task level keys and the node they come from
+TASK_KEY_NODES = {
+    'camera'    : 'RSNodeCamInputNode',
+    'world'     : 'RSNodeWorldInputNode',
+    'view_layer': 'RSNodeViewLayerInputNode',
+}
+
+OBJECT_KEYS = ('object_display', 'object_psr', 'object_data', 'object_material', 'object_modifier')
+
+MAX_WORKERS = 8
+
+
+def safe_eval(path):
+    """eval a data path, return (value, error message)"""
+    try:
+        return eval(path), ''
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+class RSN_PreflightReport:
+    """Issues found before rendering
+    :parm issues: list of (level, task name, node name, message), level in {'ERROR', 'WARNING'}
+    """
+
+    def __init__(self):
+        self.issues = []
+
+    def add(self, level, task, node, msg):
+        self.issues.append((level, task, node, msg))
+
+    def error(self, task, node, msg):
+        self.add('ERROR', task, node, msg)
+
+    def warning(self, task, node, msg):
+        self.add('WARNING', task, node, msg)
+
+    def has_error(self):
+        return any(level == 'ERROR' for level, task, node, msg in self.issues)
+
+    def is_empty(self):
+        return len(self.issues) == 0
+
+    def by_task(self):
+        d = {}
+        for issue in self.issues:
+            d.setdefault(issue[1], []).append(issue)
+        return d
+
+    def as_text(self):
+        return '\n'.join(f'[{level}] {task} > {node}: {msg}' if node else f'[{level}] {task}: {msg}'
+                         for level, task, node, msg in self.issues)
+
+
+class RSN_Preflight:
+    """Validate the task data of a queue against the current blend file
+    All the bpy data is read on the main thread, only the file checks run in a thread pool
+    """
+
+    def __init__(self, rsn_queue):
+        self.rsn_queue = rsn_queue
+        self.nt = rsn_queue.nt
+        self.report = RSN_PreflightReport()
+        # (task, node, path, message) checked in the thread pool
+        self.files = []
+
+    def run(self):
+        scn = bpy.context.scene
+        for task, task_data in self.rsn_queue.iter_tasks(expand=False):
+            if isinstance(task_data, RSN_TaskSource):
+                # only the first virtual task is made, the others are checked when they are expanded
+                first = task_data.first()
+                if first is None:
+                    self.report.warning(task, '', 'No virtual task to render')
+                    continue
+                task, task_data = first
+            try:
+                self.check_task(scn, task, task_data)
+            except Exception as e:
+                # the check runs in the invoke of the confirm sheet, it must not raise
+                logger.debug('RSN Preflight check failed', exc_info=e)
+                self.report.error(task, '', f'Can not be checked: {type(e).__name__}: {e}')
+
+        self.collect_scene_files()
+        self.check_files()
+        return self.report
+
+    def find_node(self, task, bl_idname):
+        """name of the node in the task that write this key, the task name if not found"""
+        for name in reversed(self.rsn_queue.task_list_dict.get(task, [])):
+            node = self.nt.nodes.get(name)
+            if node and node.bl_idname == bl_idname:
+                return name
+        return ''
+
+    def check_task(self, scn, task, d):
+        r = self.report
+
+        if d.get('camera'):
+            cam, err = safe_eval(d['camera'])
+            if cam is None:
+                r.error(task, self.find_node(task, TASK_KEY_NODES['camera']), f'Camera not found {err}')
+        elif scn.camera is None:
+            r.error(task, '', 'No camera for this task')
+
+        if 'world' in d and d['world'] not in bpy.data.worlds:
+            r.error(task, self.find_node(task, TASK_KEY_NODES['world']), f'World "{d["world"]}" not found')
+
+        if d.get('view_layer') and d['view_layer'] not in scn.view_layers:
+            r.error(task, self.find_node(task, TASK_KEY_NODES['view_layer']),
+                    f'View layer "{d["view_layer"]}" not found')
+
+        for key in OBJECT_KEYS:
+            for node_name, node_data in d.get(key, {}).items():
+                ob, err = safe_eval(node_data['object'])
+                if ob is None:
+                    r.error(task, node_name, f'Object not found {err}')
+                    continue
+                if key == 'object_material':
+                    self.check_material(task, node_name, ob, node_data)
+                elif key == 'object_data':
+                    try:
+                        obj, attr = source_attr(ob.data, node_data['data_path'])
+                    except Exception as e:
+                        r.error(task, node_name, f'Data path "{node_data["data_path"]}" not found ({e})')
+                        continue
+                    if not hasattr(obj, attr):
+                        r.error(task, node_name, f'Data path "{node_data["data_path"]}" not found')
+                elif key == 'object_modifier':
+                    match = re.match(r"modifiers[[](.*?)[]]", node_data['data_path'])
+                    if not match or match.group(1)[1:-1] not in ob.modifiers:
+                        r.error(task, node_name, f'Modifier "{node_data["data_path"]}" not found')
+
+        for node_name, node_data in d.get('property', {}).items():
+            value, err = safe_eval(node_data['full_data_path'])
+            if err:
+                r.error(task, node_name, f'Full data path error {err}')
+
+        for node_name, value in d.get('scripts', {}).items():
+            try:
+                compile(value, node_name, 'exec')
+            except SyntaxError as e:
+                r.error(task, node_name, f'Syntax error: {e}')
+
+        for node_name, file_name in d.get('scripts_file', {}).items():
+            if file_name not in bpy.data.texts:
+                r.error(task, node_name, f'Text "{file_name}" not found')
+
+        for node_name, curve in d.get('curves', {}).items():
+            missing = get_missing_keys(curve['key'], d)
+            if 'values' not in curve:
+                r.error(task, node_name, f'Value curve of "{curve["key"]}" can not be evaluated')
+            elif missing:
+                r.error(task, node_name, f'Value curve of "{curve["key"]}" needs {", ".join(missing)} in the task')
+            elif d.get('render_animation'):
+                r.warning(task, node_name, 'Value curves are not applied in an animation render')
+
+        if d.get('path'):
+            self.files.append((task, '', ('dir', bpy.path.abspath(d['path'])), 'Output folder can not be created'))
+
+        if d['frame_end'] < d['frame_start']:
+            r.error(task, '', f'Frame end {d["frame_end"]} is before frame start {d["frame_start"]}')
+
+    def check_material(self, task, node_name, ob, node_data):
+        r = self.report
+        if node_data['new_material'] not in bpy.data.materials:
+            r.error(task, node_name, f'Material "{node_data["new_material"]}" not found')
+        if node_data['slot_index'] >= len(ob.material_slots):
+            r.error(task, node_name, f'Object "{ob.name}" has no material slot {node_data["slot_index"]}')
+
+    def collect_scene_files(self):
+        """images and libraries used in the blend file"""
+        for image in bpy.data.images:
+            if image.source not in {'FILE', 'SEQUENCE', 'MOVIE'} or image.packed_file or image.users == 0:
+                continue
+            path = bpy.path.abspath(image.filepath, library=image.library)
+            self.files.append(('Scene', image.name, ('file', path), f'Image file missing: {path}'))
+
+        for lib in bpy.data.libraries:
+            path = bpy.path.abspath(lib.filepath)
+            self.files.append(('Scene', lib.name, ('file', path), f'Library file missing: {path}'))
+
+    def check_files(self):
+        if not self.files: return
+
+        checks = list({check for task, node, check, msg in self.files})
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(checks))) as executor:
+            result = dict(zip(checks, executor.map(check_path, checks)))
+
+        for task, node, check, msg in self.files:
+            if not result[check]:
+                # a missing file do not stop the render, but the result may be wrong
+                self.report.warning(task, node, msg)
+
+
+def check_path(check):
+    """run in the thread pool, no bpy here"""
+    kind, path = check
+    if kind == 'file':
+        return os.path.exists(path)
+    # dir: exist, or the nearest existing parent is writable
+    dir = os.path.dirname(path)
+    while dir and not os.path.exists(dir):
+        parent = os.path.dirname(dir)
+        if parent == dir: break
+        dir = parent
+    return os.path.isdir(dir) and os.access(dir, os.W_OK)
+
+
+def preflight_check(rsn_queue, mark_nodes=True):
+    """validate the whole queue and return a RSN_PreflightReport
+    :parm mark_nodes: show the warning on the nodes
+    """
+    report = RSN_Preflight(rsn_queue).run()
+
+    if not report.is_empty():
+        logger.warning(f'RSN Preflight:\n{report.as_text()}')
+
+    if mark_nodes:
+        for level, task, node_name, msg in report.issues:
+            node = rsn_queue.nt.nodes.get(node_name) if node_name else None
+            if node and hasattr(node, 'set_warning'):
+                node.set_warning(msg=msg)
+
+    return report
+
+
+class RSN_OT_Preflight(bpy.types.Operator):
+    """Check the tasks of a Render List before rendering"""
+    bl_idname = 'rsn.preflight'
+    bl_label = 'Preflight Check'
+
+    render_list_node_name: StringProperty()
+
+    def execute(self, context):
+        rsn_tree = RSN_NodeTree()
+        nt = rsn_tree.get_context_tree()
+        if not nt or self.render_list_node_name not in nt.nodes:
+            self.report({'ERROR'}, 'Render List node not found')
+            return {'CANCELLED'}
+
+        report = preflight_check(RSN_Queue(nodetree=nt, render_list_node=self.render_list_node_name))
+        if report.is_empty():
+            self.report({'INFO'}, 'Preflight: no problem found')
+        else:
+            self.report({'ERROR'} if report.has_error() else {'WARNING'},
+                        f'Preflight: {len(report.issues)} problems, see the console')
+        return {'FINISHED'}
+
+
+def register():
+    bpy.utils.register_class(RSN_OT_Preflight)
+
+
+def unregister():
+    bpy.utils.unregister_class(RSN_OT_Preflight)
@@ -0,0 +1,67 @@
+import bpy
+
+import os
+import logging
+
+from ..utility import *
+
+logger = logging.getLogger('mylogger')
+
+
+class RSN_RegionPatch:
+    """Render a region to a side file, then composite it into the existing output
+    create it after the task is applied, it redirect the render output of the current frame
+    """
+
+    def __init__(self, task_data, scene=None):
+        self.scene = scene if scene else bpy.context.scene
+        rn = self.scene.render
+        self.frame = self.scene.frame_current
+        self.region = task_data['render_region']
+        self.feather = task_data['region_patch'].get('feather', 0)
+
+        self.output = bpy.path.abspath(rn.frame_path(frame=self.frame))
+        # render to a hidden file next to the output
+        self.ori_filepath = rn.filepath
+        head, tail = os.path.split(rn.filepath)
+        rn.filepath = os.path.join(head, '.rsn_patch_' + tail)
+        self.patch_file = bpy.path.abspath(rn.frame_path(frame=self.frame))
+
+    def apply(self):
+        """
+        :return: the output path, None if nothing is rendered
+        """
+        self.scene.render.filepath = self.ori_filepath
+
+        if not os.path.exists(self.patch_file):
+            logger.warning(f'RSN Region patch not rendered: {self.patch_file}')
+            return None
+
+        if not os.path.exists(self.output):
+            # nothing to patch, keep the region alone
+            logger.warning(f'RSN Region patch: {self.output} not found, save the region only')
+            os.replace(self.patch_file, self.output)
+            return self.output
+
+        base = bpy.data.images.load(self.output, check_existing=False)
+        patch = bpy.data.images.load(self.patch_file, check_existing=False)
+        try:
+            # the base may have another resolution, place the region by its factor
+            w, h = base.size
+            x0, y0 = int(self.region['min_x'] * w), int(self.region['min_y'] * h)
+            pixels = composite_patch(image_to_array(base), image_to_array(patch), x0, y0, self.feather)
+            base.pixels.foreach_set(pixels.ravel())
+
+            # write next to the output, then replace it, the output is never half written
+            root, ext = os.path.splitext(self.output)
+            tmp = f'{root}.rsn_tmp{ext}'
+            base.filepath_raw = tmp
+            base.save()
+            os.replace(tmp, self.output)
+        finally:
+            bpy.data.images.remove(base)
+            bpy.data.images.remove(patch)
+
+        os.remove(self.patch_file)
+        logger.info(f'RSN Region patched: {self.output}')
+        return self.output
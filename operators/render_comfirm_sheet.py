@@ -7,6 +7,10 @@ from bpy.props import *
 
 from ..utility import *
 from ..preferences import get_pref
+from .preflight import preflight_check
+
+
+MOVIE_FORMATS = {'AVI_JPEG', 'AVI_RAW', 'FFMPEG'}
 
 
 class RSN_OT_RenderButton(bpy.types.Operator):
@@ -29,9 +33,15 @@ class RSN_OT_RenderButton(bpy.types.Operator):
         name='Display')
 
     processor_node: StringProperty(name='Processor Node', default='')
+    use_persistent_data: BoolProperty()
 
     # task_data
     rsn_queue = None
+    preflight = None
+    # sheet rows, computed on invoke
+    rows = []
+    total_frames = 0
+    total_time = None
 
     # ui
     display_num: IntProperty(name='Max Display Number', min=1, default=10, soft_max=20)
@@ -56,9 +66,27 @@ class RSN_OT_RenderButton(bpy.types.Operator):
         self.nt = rsn_tree.get_wm_node_tree()
 
         self.rsn_queue = RSN_Queue(nodetree=rsn_tree.get_wm_node_tree(), render_list_node=self.render_list_node_name)
+        # show the order the tasks will be rendered
+        if self.use_persistent_data:
+            self.rsn_queue.schedule_for_persistent_data()
+
+    def draw_preflight(self, layout, max_lines=8):
+        report = self.preflight
+        if not report or report.is_empty(): return
+
+        box = layout.box()
+        box.alert = report.has_error()
+        box.label(text=f'Preflight: {len(report.issues)} problems', icon='ERROR')
+        col = box.column(align=1)
+        for level, task, node, msg in report.issues[:max_lines]:
+            col.label(text=f'{task} > {node}: {msg}' if node else f'{task}: {msg}',
+                      icon='CANCEL' if level == 'ERROR' else 'INFO')
+        if len(report.issues) > max_lines:
+            col.label(text=f'... {len(report.issues) - max_lines} more, see the console')
 
     def draw(self, context):
         layout = self.layout
+        self.draw_preflight(layout)
         layout.prop(self, 'processor_node', icon='TIME')
 
         box = layout.split().box()
@@ -91,45 +119,94 @@ class RSN_OT_RenderButton(bpy.types.Operator):
         layout.prop(self, 'display_num')
         layout.separator(factor=0.5)
 
-        pages = math.ceil(self.rsn_queue.get_length() / self.display_num)
+        pages = max(math.ceil(len(self.rows) / self.display_num), 1)
         if self.page_num > pages: self.page_num = pages
 
-        start_index = math.floor((self.page_num - 1) * self.display_num)
-        end_index = start_index + self.display_num
-
-        # draw task
-        for i, task_node in enumerate(self.rsn_queue.task_queue):
-            if start_index <= i < end_index:
-                # Index
-                col1.label(text=f'{i}')
-                # node and mute
-                node = bpy.context.space_data.edit_tree.nodes[task_node]
-                col2.prop(node, 'mute', text=task_node, icon='PANEL_CLOSE' if node.mute else 'CHECKMARK')
-                # label
-                col3.label(text=self.rsn_queue.task_data_queue[i]['label'])
-                # Range
-                fs = self.rsn_queue.task_data_queue[i]["frame_start"]
-                fe = self.rsn_queue.task_data_queue[i]["frame_end"]
-                col4.label(text=f'{fs} → {fe} ({fe - fs + 1})')
-                # filepath
-                if 'path' in self.rsn_queue.task_data_queue[i]:
-                    dir = self.rsn_queue.task_data_queue[i]["path"]
-                    show = col5.operator('rsn.show_task_details', icon='VIEWZOOM', text='Show')
-                    show.task_data = dir
-                    show.width = 500
-                else:
-                    col5.label(text='Not Defined')
-                # file name
-                if 'path_format' in self.rsn_queue.task_data_queue[i]:
-                    format = self.rsn_queue.task_data_queue[i]["path_format"]
-                    show = col6.operator('rsn.show_task_details', icon='VIEWZOOM', text='Show')
-                    show.task_data = format
-                    show.width = 500
-                else:
-                    col6.label(text='Not Defined')
-                # task_data_list
-                d = json.dumps(self.rsn_queue.task_data_queue[i], indent=2, ensure_ascii=False)
-                col7.operator("rsn.get_task_info", text="", icon="INFO").task_name = task_node
+        start_index = (self.page_num - 1) * self.display_num
+        nodes = self.nt.nodes
+
+        # draw the rows of this page only
+        for row in self.rows[start_index:start_index + self.display_num]:
+            # Index
+            col1.label(text=f"{row['index']}")
+            # node and mute
+            node = nodes.get(row['task'])
+            if node:
+                col2.prop(node, 'mute', text=row['task'], icon='PANEL_CLOSE' if node.mute else 'CHECKMARK')
+            else:
+                col2.label(text=row['task'])
+            # label
+            col3.label(text=row['label'])
+            # Range
+            col4.label(text=row['range'])
+            # filepath
+            if row['path'] is not None:
+                show = col5.operator('rsn.show_task_details', icon='VIEWZOOM', text='Show')
+                show.task_data = row['path']
+                show.width = 500
+            else:
+                col5.label(text='Not Defined')
+            # file name, resolved
+            if row['output']:
+                show = col6.operator('rsn.show_task_details', icon='VIEWZOOM', text=row['first_name'])
+                show.task_data = row['output']
+                show.width = 500
+            else:
+                col6.label(text='Not Defined')
+            # task_data_list
+            col7.operator("rsn.get_task_info", text="", icon="INFO").task_name = row['node']
+
+        # summary
+        layout.separator(factor=0.5)
+        box = layout.box()
+        row = box.row()
+        row.label(text=f'Tasks: {len(self.rows)}')
+        row.label(text=f'Frames: {self.total_frames}')
+        row.label(text=f'Estimated: {format_duration(self.total_time)}' if self.total_time is not None
+                  else 'Estimated: --', icon='TIME')
+
+    def get_rows(self):
+        """compute everything the sheet draws once, the draw only slices the current page"""
+        self.rows = []
+        self.total_frames = 0
+        self.total_time = 0
+        scn = bpy.context.scene
+
+        for i, (task, task_data) in enumerate(self.rsn_queue.iter_tasks(expand=False)):
+            # the virtual tasks are not made yet, their count and the frames of the node are used
+            tasks = 1
+            if isinstance(task_data, RSN_TaskSource):
+                tasks, task_data = task_data.count, task_data.task_data
+
+            fs, fe, step = task_data["frame_start"], task_data["frame_end"], task_data["frame_step"]
+            frames = range(fs, fe + 1, max(step, 1))
+            count = len(frames)
+            self.total_frames += count * tasks
+
+            frame_time = get_frame_time(task, scn)
+            if frame_time is None or self.total_time is None:
+                self.total_time = None
+            else:
+                self.total_time += frame_time * count * tasks
+
+            row = {'index'     : i,
+                   'task'      : task if tasks == 1 else f'{task} × {tasks}',
+                   'node'      : task_data.get('virtual_of', task),
+                   'label'     : task_data['label'],
+                   'range'     : f'{fs} → {fe} ({count})' + (' Anim' if task_data.get('render_animation') else ''),
+                   'path'      : task_data.get('path'),
+                   'output'    : '',
+                   'first_name': ''}
+
+            if 'path_format' in task_data and count:
+                values = get_path_values(task_data, scn)
+                first = get_output_path(task_data, frames[0], values)
+                last = get_output_path(task_data, frames[-1], values)
+                row['first_name'] = os.path.basename(first)
+                row['output'] = '\n'.join((f"Format: {task_data['path_format']}",
+                                           f'First: {first}',
+                                           f'Last: {last}'))
+            self.rows.append(row)
 
     def execute(self, context):
         blend_path = context.blend_data.filepath
@@ -137,21 +214,32 @@ class RSN_OT_RenderButton(bpy.types.Operator):
         if blend_path == "":
             self.report({"ERROR"}, "Save your file first!")
             return {"FINISHED"}
-        elif context.scene.render.image_settings.file_format in {'AVI_JPEG', 'AVI_RAW', 'FFMPEG'}:
-            self.report({"ERROR"}, "Not Support Anunimation Format")
-            return {"FINISHED"}
+
+        # movie can only be written by the tasks in animation mode
+        for task, task_data in self.rsn_queue.iter_tasks(expand=False):
+            if isinstance(task_data, RSN_TaskSource):
+                task_data = task_data.task_data
+            file_format = task_data.get('image_settings', {}).get('file_format',
+                                                                  context.scene.render.image_settings.file_format)
+            if file_format in MOVIE_FORMATS and not task_data.get('render_animation'):
+                self.report({"ERROR"}, f'{task}: Movie format need "Render Animation" in the Frame Range node')
+                return {"FINISHED"}
 
         self.change_shading()
         bpy.ops.rsn.render_stack_task(render_list_node_name=self.render_list_node_name,
                                       open_dir=self.open_dir,
                                       clean_path=self.clean_path,
                                       render_display_type=self.render_display_type,
-                                      processor_node=self.processor_node)
+                                      processor_node=self.processor_node,
+                                      use_persistent_data=self.use_persistent_data)
 
         return {'FINISHED'}
 
     def invoke(self, context, event):
         self.get_render_data()
+        # find the broken task before hours of rendering
+        self.preflight = preflight_check(self.rsn_queue)
+        self.get_rows()
         return context.window_manager.invoke_props_dialog(self, width=600)
 
 
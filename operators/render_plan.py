@@ -0,0 +1,284 @@
+import bpy
+from bpy.props import StringProperty, IntProperty
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+
+import os
+import sys
+import json
+import time
+import logging
+
+from ..utility import *
+from ..render_plan import RSN_Plan, PLAN_EXT
+from ..task_matrix import get_skip_keys
+from ..render_stats import RSN_RenderStats
+from .. import __folder_name__
+from .memory_hygiene import RSN_MemoryHygiene, get_hygiene_settings
+from .. import bl_info
+from .tile_render import RSN_TileJob
+from .region_patch import RSN_RegionPatch
+from .static_frames import RSN_StaticFrames
+
+logger = logging.getLogger('mylogger')
+
+# options that run python, one of them run the plan
+PYTHON_OPTIONS = ('--python-expr', '--python', '-P')
+
+
+class RSN_RestartWorker(Exception):
+    """the memory is over the limit, render the rest of the plan in a new blender
+    :parm start: index of the next task
+    """
+
+    def __init__(self, start):
+        super().__init__(f'Restart from task {start}')
+        self.start = start
+
+
+def get_restart_args(argv, expr, blend=''):
+    """command line of the new blender, the options of this one with the python that run the plan replaced
+    :parm argv: sys.argv of this blender
+    :parm expr: python expression that run the plan again
+    :parm blend: blend file to load, added if it is not in the command line
+    """
+    args = list(argv)
+    end = args.index('--') if '--' in args else len(args)
+    options = [i for i in range(1, end - 1) if args[i] in PYTHON_OPTIONS]
+    if options:
+        # the one that run the plan, the last one if none says so
+        i = next((i for i in options if 'run_plan' in args[i + 1]), options[-1])
+        args[i:i + 2] = ['--python-expr', expr]
+    else:
+        i = end
+        args[i:i] = ['--python-expr', expr]
+
+    # the blend file must be loaded before the python run
+    if blend and os.path.abspath(blend) not in {os.path.abspath(arg) for arg in args[1:i]}:
+        args.insert(i, blend)
+    if '-b' not in args[1:i] and '--background' not in args[1:i]:
+        args.insert(1, '-b')
+    return args
+
+
+def restart_worker(plan_path, start):
+    """replace this background blender with a new one that load the blend file again
+    the command line options are kept (engine, threads, factory startup, the args after "--")
+    """
+    expr = (f'import bpy, addon_utils;'
+            f'addon_utils.enable({__folder_name__!r});'
+            f'bpy.ops.rsn.run_plan(filepath={plan_path!r}, start={start})')
+    args = get_restart_args(sys.argv, expr, bpy.data.filepath)
+    logger.warning(f'RSN Restart worker from task {start}')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execv(bpy.app.binary_path, args)
+
+
+def export_plan(node_tree, render_list_node_name, filepath):
+    """resolve the queue of a Render List node and write it to a plan file"""
+    rsn_queue = RSN_Queue(nodetree=node_tree, render_list_node=render_list_node_name)
+    plan = RSN_Plan.from_queue(rsn_queue,
+                               hygiene=get_hygiene_settings(node_tree.nodes[render_list_node_name]),
+                               blend=bpy.data.filepath,
+                               tree=node_tree.name,
+                               render_list=render_list_node_name,
+                               rsn='.'.join(str(v) for v in bl_info['version']),
+                               blender=bpy.app.version_string)
+    plan.dump(filepath)
+    return plan
+
+
+def apply_plan_task(task, frame=None, tree_name='', task_data_json=None, skip_keys=()):
+    """apply the task data of a plan task, no node tree evaluation
+    :parm frame: set this frame before, so the frame in the output path is right
+    :parm task_data_json: task['data'] already dumped, to save the work for each frame
+    :parm skip_keys: keys already applied by the task before
+    """
+    if frame is not None:
+        bpy.context.scene.frame_set(frame)
+    if task_data_json is None:
+        task_data_json = json.dumps(task['data'], default=list)
+    bpy.ops.rsn.update_parms(view_mode_handler=task['name'],
+                             tree_name=tree_name,
+                             task_data_json=task_data_json,
+                             skip_keys=','.join(skip_keys),
+                             use_render_mode=True)
+
+
+def run_plan(plan, start=0, progress=None, stats=None, hygiene=None):
+    """Render a plan frame by frame, blocking
+    use it in background mode: blender -b scene.blend --python-expr "import bpy;bpy.ops.rsn.run_plan(filepath='x.rsnplan')"
+    :parm start: index of the first task to render
+    :parm progress: function(task index, task, frame) called before each frame
+    :parm stats: RSN_RenderStats to record each frame, its update() should be in the render_stats handler
+    :parm hygiene: RSN_MemoryHygiene to run between the tasks
+    :raise RSN_RestartWorker: the memory is over the limit in background mode
+    :return: number of rendered frames
+    """
+    scn = bpy.context.scene
+    scn.render.use_file_extension = 1
+    tree_name = plan.meta.get('tree', '')
+    count = 0
+    applied_task = None
+
+    for i, task in enumerate(plan.tasks[start:], start=start):
+        if hygiene and applied_task is not None:
+            if hygiene.run(task['name']) == 'RESTART' and bpy.app.background:
+                raise RSN_RestartWorker(i)
+        task_data_json = json.dumps(task['data'], default=list)
+        skip_keys = get_skip_keys(task['data'], applied_task)
+        applied_task = task['name']
+        if task['data'].get('render_animation') and task['frames']:
+            if progress: progress(i, task, task['frames'][0])
+            apply_plan_task(task, task['frames'][0], tree_name, task_data_json, skip_keys)
+            # one render call for the whole range, the handlers record each frame
+            frame_time = None
+
+            def pre(dummy, thrd=None):
+                nonlocal frame_time
+                frame_time = time.time()
+                if stats: stats.begin(task['name'], task['data'].get('label', ''), scn.frame_current,
+                                      scn.render.engine)
+
+            def post(dummy, thrd=None):
+                nonlocal frame_time
+                if frame_time is None: return
+                if stats: stats.end(time.time() - frame_time)
+                frame_time = None
+
+            bpy.app.handlers.render_pre.append(pre)
+            bpy.app.handlers.render_post.append(post)
+            try:
+                bpy.ops.render.render(animation=True)
+            finally:
+                bpy.app.handlers.render_pre.remove(pre)
+                bpy.app.handlers.render_post.remove(post)
+            count += len(task['frames'])
+            continue
+
+        static_frames = None
+        for frame in task['frames']:
+            if static_frames and frame in static_frames.skip_frames:
+                continue
+            if progress: progress(i, task, frame)
+            apply_plan_task(task, frame, tree_name, task_data_json, skip_keys)
+            skip_keys = ()
+            if task['data'].get('skip_static') and static_frames is None:
+                static_frames = RSN_StaticFrames(task['name'], task['data'], task['frames'])
+
+            t1 = time.time()
+            if stats: stats.begin(task['name'], task['data'].get('label', ''), frame, scn.render.engine)
+            if 'tile_render' in task['data']:
+                job = RSN_TileJob(task['name'], task['data'])
+                job.start()
+                job.wait()
+                job.finish()
+            elif 'region_patch' in task['data']:
+                patch = RSN_RegionPatch(task['data'])
+                bpy.ops.render.render(write_still=True)
+                # the output is replaced, the held frames are linked below, after this
+                try:
+                    patch.apply()
+                except Exception as e:
+                    # the patch file stay, the plan go on with the next frame
+                    logger.warning('RSN Region patch failed', exc_info=e)
+            else:
+                bpy.ops.render.render(write_still=True)
+            logger.info(f'RSN Plan: {task["name"]} frame {frame} took {time.time() - t1:.2f} s')
+            if stats: stats.end(time.time() - t1)
+            count += 1
+            if static_frames:
+                static_frames.link(frame)
+
+    return count
+
+
+class RSN_OT_ExportPlan(bpy.types.Operator, ExportHelper):
+    """Export the resolved render queue to a plan file"""
+    bl_idname = 'rsn.export_plan'
+    bl_label = 'Export Render Plan'
+
+    filename_ext = PLAN_EXT
+    filter_glob: StringProperty(default=f'*{PLAN_EXT}', options={'HIDDEN'})
+
+    render_list_node_name: StringProperty()
+
+    def execute(self, context):
+        rsn_tree = RSN_NodeTree()
+        nt = rsn_tree.get_context_tree()
+        if not nt or self.render_list_node_name not in nt.nodes:
+            self.report({'ERROR'}, 'Render List node not found')
+            return {'CANCELLED'}
+
+        plan = export_plan(nt, self.render_list_node_name, self.filepath)
+        self.report({'INFO'}, f'Export {len(plan.tasks)} tasks, {plan.frame_count()} frames')
+        return {'FINISHED'}
+
+
+class RSN_OT_RunPlan(bpy.types.Operator, ImportHelper):
+    """Render a plan file without evaluating the node tree"""
+    bl_idname = 'rsn.run_plan'
+    bl_label = 'Render Plan'
+
+    filename_ext = PLAN_EXT
+    filter_glob: StringProperty(default=f'*{PLAN_EXT}', options={'HIDDEN'})
+
+    start: IntProperty(name='Start Task', default=0, min=0)
+
+    def execute(self, context):
+        try:
+            plan = RSN_Plan.load(self.filepath)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f'Can not load plan: {e}')
+            return {'CANCELLED'}
+
+        blend = plan.meta.get('blend', '')
+        if blend and bpy.data.filepath and os.path.normcase(blend) != os.path.normcase(bpy.data.filepath):
+            logger.warning(f'RSN Plan was exported from {blend}')
+
+        stats = RSN_RenderStats()
+        settings = plan.meta.get('hygiene')
+        hygiene = RSN_MemoryHygiene(settings) if settings else None
+
+        def stats_update(text, *args):
+            stats.update(text)
+
+        bpy.app.handlers.render_stats.append(stats_update)
+        if hygiene: hygiene.start()
+        restart = None
+        try:
+            count = run_plan(plan, start=self.start, stats=stats, hygiene=hygiene)
+        except RSN_RestartWorker as e:
+            restart = e.start
+            count = len(stats.frames)
+        finally:
+            bpy.app.handlers.render_stats.remove(stats_update)
+            if hygiene: hygiene.stop()
+
+        if not stats.is_empty():
+            # one file for each worker, a restarted worker start from another task
+            name = os.path.splitext(os.path.basename(self.filepath))[0] + f'_stats_{self.start}'
+            files = stats.export(os.path.dirname(self.filepath), name)
+            logger.info(f'RSN Plan stats: {files[0]}')
+
+        if restart is not None:
+            restart_worker(self.filepath, restart)
+
+        self.report({'INFO'}, f'Rendered {count} frames')
+        return {'FINISHED'}
+
+
+classes = (
+    RSN_OT_ExportPlan,
+    RSN_OT_RunPlan,
+)
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+
+def unregister():
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,204 @@
+import bpy
+from bpy.props import IntProperty, StringProperty
+
+import os
+import hmac
+import json
+import time
+import socket
+import logging
+import subprocess
+
+from ..render_plan import RSN_Plan
+from ..worker_protocol import HOST, DEFAULT_PORT, send_message, read_messages, new_token, write_token
+from .. import __folder_name__
+from .render_plan import run_plan, RSN_RestartWorker
+from .memory_hygiene import RSN_MemoryHygiene
+from .update_parms import get_scene_state, restore_scene_state
+
+logger = logging.getLogger('mylogger')
+
+# seconds a client has to send its request, and to read each event
+CLIENT_TIMEOUT = 30
+
+
+def worker_command(port=DEFAULT_PORT, blend='', token=''):
+    """command line of a background worker
+    :parm token: '' to let the worker make one and write it to its token file
+    """
+    expr = (f'import addon_utils, importlib;'
+            f'addon_utils.enable({__folder_name__!r});'
+            f'importlib.import_module({__folder_name__ + ".operators.render_worker"!r})'
+            f'.serve({port}, {blend!r}, {token!r})')
+    return [bpy.app.binary_path, '-b', '--python-expr', expr]
+
+
+class RSN_RenderWorker:
+    """Keep a blend file loaded and render the plans sent to the socket, one at a time
+    the settings a job change are put back after it, the file is loaded again only when it is another
+    one or it is saved again. Blender start and the add-on registration are only paid once.
+    A request with "reload" load the file again after the job, for the changes that can not be put back (scripts).
+    """
+
+    def __init__(self, port=DEFAULT_PORT, token=''):
+        self.port = port
+        self.token = token
+        self.blend = ''
+        self.mtime = None
+        self.reload = False
+        self.plans = 0
+        self.client = None
+
+    def send(self, message):
+        """the render go on if the client is gone"""
+        if self.client is None: return
+        try:
+            send_message(self.client, message)
+        except OSError:
+            logger.warning('RSN Worker: client disconnected')
+            self.client = None
+
+    def load_blend(self, blend):
+        t1 = time.time()
+        bpy.ops.wm.open_mainfile(filepath=blend, load_ui=False)
+        self.blend = blend
+        self.mtime = os.stat(blend).st_mtime_ns
+        self.reload = False
+        self.send({'event': 'load', 'blend': blend, 'seconds': round(time.time() - t1, 3)})
+        logger.info(f'RSN Worker: load {blend} in {time.time() - t1:.2f} s')
+
+    def ensure_blend(self, blend):
+        """load the blend file if it is another one, or it is saved again"""
+        blend = os.path.abspath(blend)
+        if os.path.normcase(blend) != os.path.normcase(self.blend) or os.stat(blend).st_mtime_ns != self.mtime:
+            self.load_blend(blend)
+
+    def render(self, message):
+        if 'plan_data' in message:
+            plan = RSN_Plan.from_dict(message['plan_data'])
+        else:
+            plan = RSN_Plan.load(message['plan'])
+
+        blend = message.get('blend') or plan.meta.get('blend', '')
+        if not blend:
+            raise ValueError('No blend file to render')
+        self.ensure_blend(blend)
+
+        settings = plan.meta.get('hygiene')
+        hygiene = RSN_MemoryHygiene(settings) if settings else None
+
+        def progress(index, task, frame):
+            self.send({'event': 'frame', 'index': index, 'task': task['name'], 'frame': frame})
+
+        t1 = time.time()
+        start = message.get('start', 0)
+        count = 0
+        while True:
+            state = get_scene_state(task['data'] for task in plan.tasks[start:])
+            try:
+                count += run_plan(plan, start=start, progress=progress, hygiene=hygiene)
+                break
+            except RSN_RestartWorker as e:
+                # the worker must stay, a new load of the file free the memory instead
+                # and leave nothing to put back
+                state = None
+                self.load_blend(self.blend)
+                start = e.start
+            finally:
+                if state is not None:
+                    restore_scene_state(state)
+
+        self.reload = bool(message.get('reload'))
+        self.plans += 1
+        self.send({'event': 'done', 'frames': count, 'seconds': round(time.time() - t1, 3)})
+
+    def handle(self, message):
+        """:return: False to stop the worker"""
+        if not isinstance(message, dict) or \
+                not hmac.compare_digest(str(message.get('token', '')), self.token):
+            self.send({'event': 'error', 'msg': 'Invalid token'})
+            return True
+
+        cmd = message.get('cmd')
+        if cmd == 'quit':
+            self.send({'event': 'quit'})
+            return False
+        elif cmd == 'ping':
+            self.send({'event': 'pong', 'blend': self.blend, 'plans': self.plans})
+        elif cmd == 'render':
+            try:
+                self.render(message)
+            except Exception as e:
+                # a bad request must not stop the worker
+                logger.warning('RSN Worker: render failed', exc_info=e)
+                self.send({'event': 'error', 'msg': f'{type(e).__name__}: {e}'})
+        else:
+            self.send({'event': 'error', 'msg': f'Unknown command {cmd!r}'})
+        return True
+
+    def serve(self):
+        with socket.create_server((HOST, self.port)) as server:
+            logger.warning(f'RSN Worker: listening on {HOST}:{self.port}')
+            running = True
+            while running:
+                conn, addr = server.accept()
+                # a client that never send its request must not block the worker
+                conn.settimeout(CLIENT_TIMEOUT)
+                with conn, conn.makefile('rw', encoding='utf-8', newline='\n') as file:
+                    self.client = file
+                    try:
+                        message = next(read_messages(file), None)
+                    except (OSError, ValueError) as e:
+                        self.send({'event': 'error', 'msg': f'Bad request: {e}'})
+                        self.client = None
+                        continue
+                    if message is not None:
+                        running = self.handle(message)
+                    self.client = None
+
+                # asked by the request, done while the client does not wait
+                if running and self.reload and self.blend:
+                    try:
+                        self.load_blend(self.blend)
+                    except Exception as e:
+                        logger.warning('RSN Worker: can not load the blend file again', exc_info=e)
+
+
+def serve(port=DEFAULT_PORT, blend='', token=''):
+    """run a worker until it get a quit request, use it in background mode
+    not an operator: loading a blend file inside a running operator is not safe
+    :parm token: the clients must send it, a new one is made and written to the token file if empty
+    """
+    if not token:
+        token = new_token()
+        logger.warning(f'RSN Worker: token written to {write_token(token, port)}')
+    worker = RSN_RenderWorker(port, token)
+    if blend:
+        worker.load_blend(os.path.abspath(blend))
+    worker.serve()
+
+
+class RSN_OT_StartRenderWorker(bpy.types.Operator):
+    """Start a background blender that keep the blend file loaded and render the plans sent to it"""
+    bl_idname = 'rsn.start_render_worker'
+    bl_label = 'Start Render Worker'
+
+    port: IntProperty(name='Port', default=DEFAULT_PORT, min=1024, max=65535)
+    blend: StringProperty(name='Blend File', subtype='FILE_PATH',
+                          description='Load this file at start, the current file if empty')
+
+    def execute(self, context):
+        blend = bpy.path.abspath(self.blend) if self.blend else bpy.data.filepath
+        log = os.path.join(bpy.app.tempdir, f'rsn_worker_{self.port}.log')
+        with open(log, 'w') as f:
+            subprocess.Popen(worker_command(self.port, blend), stdout=f, stderr=subprocess.STDOUT)
+        self.report({'INFO'}, f'Render worker on port {self.port}, log: {log}')
+        return {'FINISHED'}
+
+
+def register():
+    bpy.utils.register_class(RSN_OT_StartRenderWorker)
+
+
+def unregister():
+    bpy.utils.unregister_class(RSN_OT_StartRenderWorker)
@@ -8,6 +8,15 @@ from bpy.props import *
 from ..utility import *
 from ..preferences import get_pref
 from ..ui.icon_utils import RSN_Preview
+from ..nodes.scripts.SmtpEmailNode import email_dispatcher
+from .tile_render import RSN_TileJob
+from .region_patch import RSN_RegionPatch
+from .static_frames import RSN_StaticFrames
+from ..task_matrix import get_skip_keys
+from ..param_curves import get_curve_values
+from ..render_stats import RSN_RenderStats
+from .memory_hygiene import RSN_MemoryHygiene, get_hygiene_settings
+from .update_parms import restore_render_border
 
 # set logger
 LOG_FORMAT = "%(asctime)s - RSN-%(levelname)s - %(message)s"
@@ -36,24 +45,78 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
     ori_render_display_type = None
 
     processor_node: StringProperty(name='Processor', default='')
+    use_persistent_data: BoolProperty(name='Persistent Data', default=False)
+    ori_use_persistent_data = None
 
     # render state
     _timer = None
     stop = None
     rendering = None
+    frame_time = None
+    # rendering a task in one animation render
+    animation = None
+    # background tile render of the current frame
+    tile_job = None
+    # region of the current frame to composite into the existing output
+    region_patch = None
+    # frame to link the held frames to, after its region patch is applied
+    patch_link_frame = None
+    # held frames of the current task
+    static_frames = None
+    # name of the last applied task, to apply only the changes of the next matrix task
+    applied_task = None
+    # time, memory and samples of each frame
+    stats = None
+    # clean the memory between tasks
+    hygiene = None
     # get and apply from rsn queue
     rsn_queue = None
 
     # set render state
     def pre(self, dummy, thrd=None):
         self.rendering = True
+        self.frame_time = time.time()
+        scn = bpy.context.scene
+        self.stats.begin(self.rsn_queue.task_name, self.rsn_queue.task_data.get('label', ''),
+                         scn.frame_current, scn.render.engine)
+
+    def stats_update(self, text, thrd=None):
+        self.stats.update(text)
 
     def post(self, dummy, thrd=None):
+        # for the estimated time of the confirm sheet
+        if self.frame_time:
+            seconds = time.time() - self.frame_time
+            record_frame_time(self.rsn_queue.task_name, seconds)
+            self.stats.end(seconds)
+            self.frame_time = None
+        # animation: blender step the frames itself, only show the progress
+        if self.animation:
+            self.update_process_node()
+            return
+        # the frame is written, link the held frames to it
+        # a patched frame is replaced by a new file, link it after the patch
+        if self.static_frames:
+            if self.region_patch:
+                self.patch_link_frame = bpy.context.scene.frame_current
+            else:
+                self.static_frames.link(bpy.context.scene.frame_current)
         # check and update frame
         self.frame_check()
         # set state (for switch task)
         self.rendering = False
 
+    def complete(self, dummy, thrd=None):
+        """the whole range of an animation task is rendered"""
+        if not self.animation: return
+        self.animation = False
+
+        self.rsn_queue.pop()
+        self.rsn_queue.update_task_data()
+        if not self.rsn_queue.is_empty():
+            bpy.context.scene.frame_current = self.rsn_queue.frame_start
+        self.rendering = False
+
     def cancelled(self, dummy, thrd=None):
         self.stop = True
 
@@ -61,6 +124,8 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
     def append_handles(self):
         bpy.app.handlers.render_pre.append(self.pre)  # 检测渲染状态
         bpy.app.handlers.render_post.append(self.post)
+        bpy.app.handlers.render_stats.append(self.stats_update)
+        bpy.app.handlers.render_complete.append(self.complete)
         bpy.app.handlers.render_cancel.append(self.cancelled)
         self._timer = bpy.context.window_manager.event_timer_add(0.2, window=bpy.context.window)  # 添加计时器检测状态
         bpy.context.window_manager.modal_handler_add(self)
@@ -68,6 +133,8 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
     def remove_handles(self):
         bpy.app.handlers.render_pre.remove(self.pre)
         bpy.app.handlers.render_post.remove(self.post)
+        bpy.app.handlers.render_stats.remove(self.stats_update)
+        bpy.app.handlers.render_complete.remove(self.complete)
         bpy.app.handlers.render_cancel.remove(self.cancelled)
         bpy.context.window_manager.event_timer_remove(self._timer)
 
@@ -78,7 +145,14 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
             node.count_frames = self.rsn_queue.get_frame_length()
             node.done_frames = 0
             node.all_tasks = ''
-            node.all_tasks = ','.join(self.rsn_queue.task_queue)
+            # one item for all the virtual tasks of a node, they are not made yet
+            names = []
+            for task, task_data in self.rsn_queue.iter_tasks(expand=False):
+                name = task if isinstance(task_data, RSN_TaskSource) else task_data.get('virtual_of', task)
+                if not names or names[-1] != name:
+                    names.append(name)
+            node.all_tasks = ','.join(names)
+            node.stats_summary = ''
         except Exception as e:
             logger.debug(f'Processor {self.processor_node} not found')
 
@@ -86,7 +160,7 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
         try:
             node = self.rsn_queue.nt.nodes[self.processor_node]
             node.done_frames += 1
-            node.curr_task = self.rsn_queue.task_name
+            node.curr_task = self.rsn_queue.task_data.get('virtual_of', self.rsn_queue.task_name)
             node.task_label = self.rsn_queue.task_data['label']
 
             node.frame_start = self.rsn_queue.frame_start
@@ -103,9 +177,21 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
                 node.curr_task = 'RENDER_FINISHED'
             else:
                 node.all_tasks += ',RENDER_STOPED'
+            if not self.stats.is_empty():
+                node.stats_summary = json.dumps(self.stats.summary())
         except:
             pass
 
+    def export_stats(self):
+        """write the stats next to the last output, or the blend file"""
+        if self.stats.is_empty(): return
+        dir = os.path.dirname(bpy.path.abspath(bpy.context.scene.render.filepath)) or bpy.path.abspath('//')
+        try:
+            files = self.stats.export(dir, f'rsn_stats_{time.strftime("%Y%m%d_%H%M%S")}')
+            logger.info(f'RSN Render stats: {files[0]}')
+        except OSError as e:
+            logger.warning(f'RSN Render stats can not be written: {e}')
+
     # init
     def init_logger(self, node_list_dict):
         pref = get_pref()
@@ -117,6 +203,8 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
         # set state
         self.stop = False
         self.rendering = False
+        self.animation = False
+        self.stats = RSN_RenderStats()
         # set and get tree
         rsn_tree = RSN_NodeTree()
         rsn_tree.set_context_tree_as_wm_tree()
@@ -127,6 +215,9 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
             context.window_manager.rsn_running_modal = False
             self.report({"WARNING"}, 'Nothing to render！')
             return {"FINISHED"}
+        if self.use_persistent_data:
+            self.init_persistent_data()
+        self.init_hygiene()
         # info log
         self.init_logger(self.rsn_queue.task_list_dict)
         self.init_process_node()
@@ -141,18 +232,42 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
 
         return {"RUNNING_MODAL"}
 
+    def init_persistent_data(self):
+        """keep the render data for the whole queue, render the tasks that change the scene in the same way together"""
+        rn = bpy.context.scene.render
+        self.ori_use_persistent_data = rn.use_persistent_data
+        rn.use_persistent_data = True
+
+        before, after = self.rsn_queue.schedule_for_persistent_data()
+        logger.info(f'RSN Persistent data: {before} -> {after} invalidating task changes')
+
+    def init_hygiene(self):
+        settings = get_hygiene_settings(self.rsn_queue.nt.nodes.get(self.render_list_node_name))
+        self.hygiene = RSN_MemoryHygiene(settings) if settings else None
+        if self.hygiene: self.hygiene.start()
+
+    def run_hygiene(self, task):
+        if self.hygiene.run(task):
+            # no worker to restart in the user interface
+            self.report({'WARNING'}, 'RSN Memory is over the limit, see the console')
+
     # update
     def frame_check(self):
         # update task
         self.rsn_queue.update_task_data()
         if not self.rsn_queue.is_empty():
+            frame = bpy.context.scene.frame_current + self.rsn_queue.frame_step
+            # the held frames are linked, not rendered
+            if self.static_frames:
+                while frame in self.static_frames.skip_frames:
+                    frame += self.rsn_queue.frame_step
 
-            if bpy.context.scene.frame_current >= self.rsn_queue.frame_end:
+            if frame > self.rsn_queue.frame_end:
                 self.rsn_queue.pop()
                 self.rsn_queue.update_task_data()
                 bpy.context.scene.frame_current = self.rsn_queue.frame_start
             else:
-                bpy.context.scene.frame_current += self.rsn_queue.frame_step
+                bpy.context.scene.frame_current = frame
             # show in nodes
             self.update_process_node()
 
@@ -164,13 +279,73 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
         scn.render.use_file_extension = 1
         # update
         task = self.rsn_queue.task_name
-        bpy.ops.rsn.update_parms(view_mode_handler=task, use_render_mode=True)
+        task_data = self.rsn_queue.task_data
+        if self.hygiene and self.applied_task is not None and self.applied_task != task:
+            self.run_hygiene(task)
+        # the baked curves are looked up for the frame, only their values are sent
+        try:
+            curve_values = json.dumps(get_curve_values(task_data, scn.frame_current)) if 'curves' in task_data else ''
+        except ValueError as e:
+            # not baked, the node show the error when the tree is read
+            logger.warning(f'RSN Value Curve: {e}')
+            curve_values = ''
+        if 'virtual_of' in task_data:
+            # virtual task has no node, apply its data directly
+            data = {k: v for k, v in task_data.items() if k != 'curves'}
+            bpy.ops.rsn.update_parms(view_mode_handler=task, use_render_mode=True,
+                                     tree_name=self.rsn_queue.nt.name,
+                                     task_data_json=json.dumps(data, default=list),
+                                     skip_keys=','.join(get_skip_keys(task_data, self.applied_task)),
+                                     curve_values_json=curve_values)
+        else:
+            # the tree is read again so the Set Variants apply
+            bpy.ops.rsn.update_parms(view_mode_handler=task, use_render_mode=True,
+                                     curve_values_json=curve_values)
+        self.applied_task = task
+
+        self.update_static_frames(task, task_data)
+        if 'region_patch' in task_data and 'tile_render' not in task_data and not task_data.get('render_animation'):
+            self.region_patch = RSN_RegionPatch(task_data)
+
+    def update_static_frames(self, task, task_data):
+        """analyse the frames once when a task start"""
+        if not task_data.get('skip_static') or task_data.get('render_animation'):
+            self.static_frames = None
+        elif not self.static_frames or self.static_frames.task_name != task:
+            frames = range(task_data['frame_start'], task_data['frame_end'] + 1, task_data['frame_step'])
+            self.static_frames = RSN_StaticFrames(task, task_data, frames)
+
+    # tile render
+    def start_tile_job(self):
+        self.rendering = True
+        self.frame_time = time.time()
+        self.tile_job = RSN_TileJob(self.rsn_queue.task_name, self.rsn_queue.task_data)
+        try:
+            self.tile_job.start()
+        except Exception as e:
+            logger.warning('RSN Tile render can not start', exc_info=e)
+            self.tile_job = None
+            self.stop = True
+
+    def finish_tile_job(self):
+        job, self.tile_job = self.tile_job, None
+        if job.finish() is None:
+            self.report({'ERROR'}, f'Tile render of "{job.task_name}" failed')
+            self.stop = True
+            return
+        # same as a normal frame
+        self.post(None)
 
     # finish
     def finish(self):
         # clear_queue/log
         self.finish_process_node()
         self.rsn_queue.clear_queue()
+        # send the last email digest
+        email_dispatcher.flush()
+        self.export_stats()
+        if self.hygiene:
+            self.hygiene.stop()
         # open folder after render
         if self.open_dir:
             try:
@@ -180,12 +355,30 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
                 logger.warning('RSN File path error, can not open dir after rendering')
         if self.clean_path:
             bpy.context.scene.render.filepath = ""
+        restore_render_border(bpy.context.scene)
+        if self.ori_use_persistent_data is not None:
+            bpy.context.scene.render.use_persistent_data = self.ori_use_persistent_data
+            self.ori_use_persistent_data = None
         # return display type
         bpy.context.preferences.view.render_display_type = self.ori_render_display_type
 
     def modal(self, context, event):
         if event.type == 'TIMER':
+            # the frame is rendered and written
+            if self.region_patch and self.rendering is False:
+                patch, self.region_patch = self.region_patch, None
+                try:
+                    patch.apply()
+                except Exception as e:
+                    logger.warning('RSN Region patch failed', exc_info=e)
+                if self.patch_link_frame is not None and self.static_frames:
+                    self.static_frames.link(self.patch_link_frame)
+                self.patch_link_frame = None
+
             if True in (self.rsn_queue.is_empty(), self.stop is True):
+                if self.tile_job:
+                    self.tile_job.cancel()
+                    self.tile_job = None
                 # set modal property
                 bpy.context.window_manager.rsn_running_modal = False
                 self.remove_handles()
@@ -193,9 +386,24 @@ class RSN_OT_RenderStackTask(bpy.types.Operator):
 
                 return {"FINISHED"}
 
+            elif self.tile_job:
+                if self.tile_job.poll():
+                    self.finish_tile_job()
+
             elif self.rendering is False:
                 self.switch2task()
-                bpy.ops.render.render("INVOKE_DEFAULT", write_still=True)
+                if 'tile_render' in self.rsn_queue.task_data and not self.rsn_queue.task_data.get('render_animation'):
+                    self.start_tile_job()
+                elif self.rsn_queue.task_data.get('render_animation'):
+                    # one render call for the whole range, the frame is stepped by blender
+                    self.animation = True
+                    self.rendering = True
+                    if bpy.ops.render.render("INVOKE_DEFAULT", animation=True) == {'CANCELLED'}:
+                        logger.warning(f'RSN Animation render of "{self.rsn_queue.task_name}" can not start')
+                        self.animation = False
+                        self.stop = True
+                else:
+                    bpy.ops.render.render("INVOKE_DEFAULT", write_still=True)
 
         return {"PASS_THROUGH"}
 
@@ -1,5 +1,4 @@
 import bpy
-import numpy
 from bpy.props import IntProperty, BoolProperty
 
 import time
@@ -37,10 +36,10 @@ class RSN_OT_MergeSelectedNodes(bpy.types.Operator):
         else:
             need_to_sort = tasks
 
-        loc_x = numpy.mean([node.location[0] for node in need_to_sort])
-        loc_y = numpy.mean([node.location[1] for node in need_to_sort])
+        loc_x = sum(node.location[0] for node in need_to_sort) / len(need_to_sort)
+        loc_y = sum(node.location[1] for node in need_to_sort) / len(need_to_sort)
 
-        width = numpy.mean([node.width for node in need_to_sort])
+        width = sum(node.width for node in need_to_sort) / len(need_to_sort)
 
         if not self.make_version:
             list_node = nt.nodes.new('RSNodeSettingsMergeNode')
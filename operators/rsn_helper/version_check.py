@@ -1,22 +1,84 @@
-import requests
-from html.parser import HTMLParser
 import bpy
+from bpy.props import StringProperty, FloatProperty, BoolProperty
+
+import os
+import threading
+import logging
 
 from ...preferences import get_pref
 from ... import bl_info
+from ...update_check import fetch_version, read_cache
+
+logger = logging.getLogger('mylogger')
+
+README_URL = 'https://github.com/atticus-lv/RenderStackNode/blob/main/README.md'
+CACHE_FILE = 'rsn_update_check.json'
 
 
-class MyHTMLParser(HTMLParser):
+class RSN_UpdateChecker:
+    """Fetch the latest version on a background thread
+    The thread never touch bpy, the result is applied by a bpy.app.timers function
+    """
+
     def __init__(self):
-        HTMLParser.__init__(self)
-        self.links = []
+        self.thread = None
+        self.result = None
+        self.error = None
+        self._poll = self.poll  # timers compare the function object
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, url, cache_path, timeout):
+        if self.is_running(): return
+
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self.fetch, args=(url, cache_path, timeout),
+                                       name='RSN Update Check', daemon=True)
+        self.thread.start()
+
+        if not bpy.app.timers.is_registered(self._poll):
+            bpy.app.timers.register(self._poll, first_interval=0.5)
+
+    def fetch(self, url, cache_path, timeout):
+        try:
+            self.result = fetch_version(url, cache_path, timeout)
+        except Exception as e:
+            self.error = e
+
+    def poll(self):
+        if self.is_running():
+            return 0.5
+
+        if self.error:
+            logger.warning(f'RSN check update failed: {self.error}')
+        elif self.result is not None:
+            apply_version(self.result)
 
-    def handle_starttag(self, tag, attrs):
-        # print('<%s>' % tag)
-        if tag == "a" and len(attrs) != 0:
-            for (variable, value) in attrs:
-                if variable == "id" and value.startswith("user-content"):
-                    self.links.append(value)
+    def cancel(self):
+        if bpy.app.timers.is_registered(self._poll):
+            bpy.app.timers.unregister(self._poll)
+
+
+update_checker = RSN_UpdateChecker()
+
+
+def get_current_version():
+    v = bl_info['version']
+    return int(f'{v[0]}{v[1]}{v[2]}')
+
+
+def apply_version(new_v):
+    pref = get_pref()
+    if get_current_version() != new_v:
+        pref.need_update = True
+        pref.latest_version = new_v
+
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'PREFERENCES':
+                area.tag_redraw()
 
 
 class RSN_OT_CheckUpdate(bpy.types.Operator):
@@ -24,22 +86,29 @@ class RSN_OT_CheckUpdate(bpy.types.Operator):
     bl_idname = 'rsn.check_update'
     bl_label = 'Check Update'
 
+    url: StringProperty(name='URL', default=README_URL, options={'HIDDEN', 'SKIP_SAVE'})
+    cache_ttl: FloatProperty(name='Cache Time', description='Seconds to use the cached result',
+                             default=86400, min=0, options={'HIDDEN', 'SKIP_SAVE'})
+    timeout: FloatProperty(name='Timeout', default=5, min=0.1, options={'HIDDEN', 'SKIP_SAVE'})
+    use_cache: BoolProperty(name='Use Cache', description='Use the cached result if it is not too old',
+                            default=True, options={'HIDDEN', 'SKIP_SAVE'})
+
+    def invoke(self, context, event):
+        # the user asks for it, always check again
+        self.use_cache = False
+        return self.execute(context)
+
     def execute(self, context):
-        # get current version num
-        pref = get_pref()
-        v = bl_info['version']
-        v = int(f'{v[0]}{v[1]}{v[2]}')
-        # get latest version
-        response = requests.get('https://github.com/atticus-lv/RenderStackNode/blob/main/README.md')
-        html_code = response.text
-        parser = MyHTMLParser()
-        parser.feed(html_code)
-        parser.close()
-        new_v = int(parser.links[1][-3:])
-
-        if v != new_v:
-            pref.need_update = True
-            pref.latest_version = new_v
+        cache_path = os.path.join(bpy.utils.user_resource('CONFIG'), CACHE_FILE)
+
+        new_v = read_cache(cache_path, self.cache_ttl) if self.use_cache else None
+        if new_v is not None:
+            apply_version(new_v)
+        else:
+            # do not block the ui
+            update_checker.start(self.url, cache_path, self.timeout)
+            self.report({'INFO'}, 'Checking update...')
+
         return {'FINISHED'}
 
 
@@ -48,4 +117,5 @@ def register():
 
 
 def unregister():
+    update_checker.cancel()
     bpy.utils.unregister_class(RSN_OT_CheckUpdate)
@@ -0,0 +1,182 @@
+import bpy
+
+import os
+import shutil
+import logging
+
+from ..utility import *
+from ..param_curves import get_curves_signature
+
+logger = logging.getLogger('mylogger')
+
+# modifiers that change over time without fcurves
+TIME_MODIFIERS = {'PARTICLE_SYSTEM', 'CLOTH', 'FLUID', 'SOFT_BODY', 'DYNAMIC_PAINT', 'OCEAN', 'WAVE',
+                  'MESH_CACHE', 'MESH_SEQUENCE_CACHE', 'EXPLODE', 'NODES'}
+
+
+# bpy.data collections whose fcurves can change the render, missing ones are skipped (blender version)
+ANIMATED_COLLECTIONS = ('objects', 'cameras', 'lights', 'meshes', 'curves', 'materials', 'worlds',
+                        'node_groups', 'shape_keys', 'textures', 'armatures', 'lattices', 'particles',
+                        'metaballs', 'volumes', 'pointclouds', 'linestyles', 'speakers')
+
+GREASE_PENCIL_TYPES = {'GPENCIL', 'GREASEPENCIL'}
+
+
+def get_embedded_trees(scene):
+    """node trees that are not in bpy.data.node_groups"""
+    trees = [scene.node_tree] if scene.node_tree else []
+    for attr in ('materials', 'worlds', 'lights', 'textures', 'linestyles'):
+        for id in getattr(bpy.data, attr, ()):
+            if getattr(id, 'node_tree', None):
+                trees.append(id.node_tree)
+    return trees
+
+
+def get_animated_ids(scene):
+    """ids that may change the render, including the embedded node trees (compositor, material, world, light...)"""
+    ids = [scene]
+    for attr in ANIMATED_COLLECTIONS:
+        ids.extend(getattr(bpy.data, attr, ()))
+    ids.extend(get_embedded_trees(scene))
+    if scene.world and scene.world not in ids:
+        ids.append(scene.world)
+    return [id for id in ids if getattr(id, 'animation_data', None)]
+
+
+def driver_use_frame(fc):
+    """the driver read the frame in its expression or in a variable"""
+    driver = fc.driver
+    if driver.type == 'SCRIPTED' and 'frame' in driver.expression:
+        return True
+    for var in driver.variables:
+        for target in var.targets:
+            if 'frame' in (target.data_path or ''):
+                return True
+    return False
+
+
+def find_time_dependency(scene, animated_ids):
+    """reason why the frames can not be compared by fcurves, '' if they can"""
+    for ob in scene.objects:
+        if ob.hide_render: continue
+        if ob.type in GREASE_PENCIL_TYPES:
+            return f'Grease pencil "{ob.name}" is drawn on frames'
+        for mod in ob.modifiers:
+            if mod.type in TIME_MODIFIERS and mod.show_render:
+                return f'Modifier "{mod.name}" on "{ob.name}"'
+
+    if scene.rigidbody_world and scene.rigidbody_world.enabled:
+        return 'Rigid body world'
+
+    for marker in scene.timeline_markers:
+        if marker.camera:
+            return f'Marker "{marker.name}" bind a camera'
+
+    for image in bpy.data.images:
+        if image.source in {'SEQUENCE', 'MOVIE'} and image.users:
+            return f'Image "{image.name}" is a {image.source.lower()}'
+
+    for id in animated_ids:
+        ad = id.animation_data
+        if len(ad.nla_tracks):
+            return f'NLA on "{id.name}"'
+        for fc in ad.drivers:
+            if driver_use_frame(fc):
+                return f'Driver "{fc.data_path}" on "{id.name}" use the frame'
+    return ''
+
+
+def get_fcurves(animated_ids):
+    fcurves = []
+    for id in animated_ids:
+        action = id.animation_data.action
+        if action:
+            fcurves.extend(fc for fc in action.fcurves if not fc.mute)
+    return fcurves
+
+
+def get_static_spans(scene, frames, task_data=None):
+    """Group the frames where the animated values do not change
+    drivers without the frame only depend on other properties, they are static when the fcurves are
+    :parm task_data: the values of its Value Curves are compared too
+    :return: list of spans, each is a list of frames, only the first one need to render
+        None if the scene depends on time in another way
+    """
+    animated_ids = get_animated_ids(scene)
+    reason = find_time_dependency(scene, animated_ids)
+    if reason:
+        logger.info(f'RSN Static frames: not used, {reason}')
+        return None
+
+    fcurves = get_fcurves(animated_ids)
+    spans = []
+    last = None
+    for frame in frames:
+        signature = tuple(round(fc.evaluate(frame), 6) for fc in fcurves)
+        if task_data:
+            signature += get_curves_signature(task_data, frame)
+        if spans and signature == last:
+            spans[-1].append(frame)
+        else:
+            spans.append([frame])
+        last = signature
+    return spans
+
+
+def frame_output_path(scene, task_data, frame):
+    """output file of a task at a frame, the task must be applied"""
+    rn = scene.render
+    if 'path' not in task_data:
+        return bpy.path.abspath(rn.frame_path(frame=frame))
+
+    values = get_path_values(task_data, scene, applied=True)
+    postfix = get_path_format(task_data['path_format']).format(values, frame)
+    ori_filepath = rn.filepath
+    try:
+        rn.filepath = os.path.join(os.path.dirname(task_data['path']), postfix)
+        return bpy.path.abspath(rn.frame_path(frame=frame))
+    finally:
+        rn.filepath = ori_filepath
+
+
+def link_frame(src, dst):
+    """hardlink a held frame to the rendered one, copy if the file system can not link"""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class RSN_StaticFrames:
+    """Static frames of a task
+    :parm links: {rendered frame: [(source file, held frame file)]}
+    :parm skip_frames: set of frames that are linked instead of rendered
+    """
+
+    def __init__(self, task_name, task_data, frames, scene=None):
+        self.scene = scene if scene else bpy.context.scene
+        self.task_name = task_name
+        self.links = {}
+        self.skip_frames = set()
+
+        spans = get_static_spans(self.scene, frames, task_data)
+        if not spans: return
+
+        for span in spans:
+            if len(span) == 1: continue
+            src = frame_output_path(self.scene, task_data, span[0])
+            self.links[span[0]] = [(src, frame_output_path(self.scene, task_data, f)) for f in span[1:]]
+            self.skip_frames.update(span[1:])
+
+        if self.skip_frames:
+            logger.info(f'RSN Static frames "{task_name}": {len(self.skip_frames)} of {len(frames)} frames are held')
+
+    def link(self, frame):
+        """call after the frame is written"""
+        for src, dst in self.links.get(frame, ()):
+            try:
+                link_frame(src, dst)
+            except OSError as e:
+                logger.warning(f'RSN Static frame {dst} not linked: {e}')
@@ -0,0 +1,151 @@
+import bpy
+
+import os
+import copy
+import time
+import glob
+import shutil
+import tempfile
+import subprocess
+import logging
+
+from ..utility import *
+from ..render_plan import RSN_Plan, PLAN_EXT
+from .. import __folder_name__
+
+logger = logging.getLogger('mylogger')
+
+# task data that should not go to the tile workers
+TILE_SKIP_KEYS = ('tile_render', 'render_animation', 'email', 'view_layer_passes', 'render_region', 'region_patch')
+
+
+def tile_image_settings(task_data, scene):
+    """tiles are saved as float exr, so the stitching is lossless"""
+    transparent = task_data.get('image_settings', {}).get('transparent', scene.render.film_transparent)
+    return {'file_format': 'OPEN_EXR',
+            'color_mode' : 'RGBA',
+            'color_depth': '32',
+            'use_preview': False,
+            'compression': 15,
+            'quality'    : 90,
+            'transparent': transparent}
+
+
+class RSN_TileJob:
+    """Render one frame of a task as tiles in background blender processes, then stitch them
+    the workers apply the tile task data from a render plan, so they never evaluate the node tree
+    """
+
+    def __init__(self, task_name, task_data, scene=None):
+        self.scene = scene if scene else bpy.context.scene
+        self.task_name = task_name
+        self.task_data = task_data
+        self.settings = task_data['tile_render']
+        self.frame = self.scene.frame_current
+        # the task is applied, the scene has the right resolution and output path
+        rn = self.scene.render
+        self.width = rn.resolution_x * rn.resolution_percentage // 100
+        self.height = rn.resolution_y * rn.resolution_percentage // 100
+        self.output = bpy.path.abspath(rn.frame_path(frame=self.frame))
+
+        self.regions = tile_regions(self.width, self.height,
+                                    self.settings['tiles_x'], self.settings['tiles_y'], self.settings['overlap'])
+        self.dir = tempfile.mkdtemp(prefix='rsn_tiles_')
+        self.blend = os.path.join(self.dir, 'tiles.blend')
+
+        self.pending = []  # commands not started
+        self.running = []  # (index, Popen)
+        self.failed = []
+
+    def tile_data(self, i, rect):
+        d = copy.deepcopy(self.task_data)
+        for key in TILE_SKIP_KEYS:
+            d.pop(key, None)
+        d['path'] = self.dir + os.sep
+        d['path_format'] = f'tile_{i:03d}_'
+        d['image_settings'] = tile_image_settings(self.task_data, self.scene)
+        d['render_region'] = region_to_border(rect, self.width, self.height, crop=True)
+        d['frame_start'] = d['frame_end'] = self.frame
+        d['frame_step'] = 1
+        return d
+
+    def start(self):
+        # workers read the current state of the file, not the last saved one
+        bpy.ops.wm.save_as_mainfile(filepath=self.blend, copy=True)
+
+        threads = max(1, (os.cpu_count() or 1) // self.settings['workers'])
+        for i, rect in enumerate(self.regions):
+            plan = RSN_Plan(meta={'tree': '', 'tile': i})
+            plan.add_task(f'{self.task_name} Tile {i}', self.tile_data(i, rect))
+            plan_path = os.path.join(self.dir, f'tile_{i:03d}{PLAN_EXT}')
+            plan.dump(plan_path)
+
+            expr = (f'import bpy, addon_utils;'
+                    f'addon_utils.enable({__folder_name__!r});'
+                    f'bpy.ops.rsn.run_plan(filepath={plan_path!r})')
+            self.pending.append((i, [bpy.app.binary_path, '-b', self.blend, '-t', str(threads),
+                                     '--python-expr', expr]))
+        self.launch()
+        logger.info(f'RSN Tile render "{self.task_name}": {len(self.regions)} tiles, {self.dir}')
+
+    def launch(self):
+        while self.pending and len(self.running) < self.settings['workers']:
+            i, cmd = self.pending.pop(0)
+            # log to a file, a full pipe would block the worker
+            with open(os.path.join(self.dir, f'tile_{i:03d}.log'), 'w') as log:
+                self.running.append((i, subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)))
+
+    def poll(self):
+        """:return: True when all the tiles are done"""
+        for i, proc in list(self.running):
+            if proc.poll() is None: continue
+            self.running.remove((i, proc))
+            if proc.returncode != 0 or not self.tile_file(i):
+                self.failed.append(i)
+                logger.warning(f'RSN Tile {i} failed ({proc.returncode}), see {self.dir}')
+        self.launch()
+        return not self.pending and not self.running
+
+    def wait(self, interval=0.5):
+        while not self.poll():
+            time.sleep(interval)
+
+    def cancel(self):
+        self.pending.clear()
+        for i, proc in self.running:
+            proc.terminate()
+        self.running.clear()
+
+    def tile_file(self, i):
+        files = glob.glob(os.path.join(glob.escape(self.dir), f'tile_{i:03d}_*.exr'))
+        return files[0] if files else None
+
+    def finish(self):
+        """stitch the tiles and write the output like a normal render
+        :return: output path, None if any tile failed
+        """
+        if self.failed:
+            logger.warning(f'RSN Tile render "{self.task_name}" failed, tiles kept in {self.dir}')
+            return None
+
+        tiles = []
+        for i, rect in enumerate(self.regions):
+            image = bpy.data.images.load(self.tile_file(i), check_existing=False)
+            try:
+                tiles.append((rect, image_to_array(image)))
+            finally:
+                bpy.data.images.remove(image)
+
+        pixels = stitch_tiles(self.width, self.height, tiles, self.settings['overlap'])
+
+        image = bpy.data.images.new('RSN Tiles', self.width, self.height, alpha=True, float_buffer=True)
+        try:
+            image.pixels.foreach_set(pixels.ravel())
+            os.makedirs(os.path.dirname(self.output), exist_ok=True)
+            # use the image settings and color management of the scene
+            image.save_render(self.output, scene=self.scene)
+        finally:
+            bpy.data.images.remove(image)
+
+        shutil.rmtree(self.dir, ignore_errors=True)
+        return self.output
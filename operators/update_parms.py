@@ -2,10 +2,15 @@ import bpy
 from bpy.props import StringProperty, BoolProperty
 from ..utility import *
 from ..preferences import get_pref
+from .compositor_nodetree import sync_compositor
+from ..nodes.scripts.SmtpEmailNode import queue_email
+from ..nodes.scripts.ScriptsNode import run_script, get_error_line
+from ..param_curves import apply_curves
 
 import logging
 import time
 import os
+import json
 from functools import wraps
 import re
 
@@ -40,6 +45,129 @@ def compare(obj: object, attr: str, val):
         logger.info(e)
 
 
+# border settings changed by the render region, saved in the scene before the first change
+BORDER_ATTRS = ('use_border', 'border_min_x', 'border_max_x', 'border_min_y', 'border_max_y', 'use_crop_to_border')
+
+
+def restore_render_border(scene):
+    """put back the border settings of the scene before RSN changed them"""
+    saved = scene.get('rsn_border')
+    if saved is None: return
+    for attr in BORDER_ATTRS:
+        compare(scene.render, attr, type(getattr(scene.render, attr))(saved[attr]))
+    del scene['rsn_border']
+
+
+# scene settings changed by each key of the task data
+SCENE_ATTRS = {
+    'camera': (('', 'camera'),),
+    'ev': (('view_settings', 'exposure'), ('view_settings', 'gamma'),
+           ('view_settings', 'view_transform'), ('view_settings', 'look')),
+    'res_x': (('render', 'resolution_x'), ('render', 'resolution_y'), ('render', 'resolution_percentage')),
+    'render_region': tuple(('render', attr) for attr in BORDER_ATTRS),
+    'engine': (('render', 'engine'),),
+    'samples': (('eevee', 'taa_render_samples'), ('cycles', 'samples')),
+    'frame_start': (('', 'frame_start'), ('', 'frame_end'), ('', 'frame_step')),
+    'image_settings': (('render.image_settings', 'file_format'), ('render.image_settings', 'color_mode'),
+                       ('render.image_settings', 'color_depth'), ('render.image_settings', 'use_preview'),
+                       ('render.image_settings', 'compression'), ('render.image_settings', 'quality'),
+                       ('render', 'film_transparent')),
+    'world': (('', 'world'),),
+    'ssm_light_studio': (('ssm', 'light_studio_index'),),
+}
+
+
+def get_state_value(owner, attr):
+    value = getattr(owner, attr)
+    # vectors and colors are copied, they would follow the changes
+    if hasattr(value, '__len__') and not isinstance(value, str):
+        return tuple(value)
+    return value
+
+
+def get_owner(obj, path):
+    for name in path.split('.') if path else ():
+        obj = getattr(obj, name)
+    return obj
+
+
+def get_scene_targets(data):
+    """settings the task data change, as (owner, attribute)"""
+    scn = bpy.context.scene
+    for key, attrs in SCENE_ATTRS.items():
+        if key not in data: continue
+        for path, attr in attrs:
+            if not path or hasattr(scn, path.split('.')[0]):  # the render engine may not be there
+                yield get_owner(scn, path), attr
+
+    for key, path in (('cycles_light_path', 'cycles'), ('octane', 'octane')):
+        if key in data and hasattr(scn, path):
+            for attr in data[key]:
+                yield get_owner(scn, path), attr
+
+    for d in data.get('object_display', {}).values():
+        yield eval(d['object']), 'hide_viewport'
+        yield eval(d['object']), 'hide_render'
+    for d in data.get('object_psr', {}).values():
+        for attr in ('location', 'scale', 'rotation_euler'):
+            yield eval(d['object']), attr
+    for d in data.get('object_data', {}).values():
+        yield source_attr(eval(d['object']).data, d['data_path'])
+    for d in data.get('object_modifier', {}).values():
+        match = re.match(r"modifiers[[](.*?)[]]", d['data_path'])
+        if match and match.group(1):
+            yield eval(d['object']).modifiers[match.group(1)[1:-1]], d['data_path'].split('.')[-1]
+    for d in data.get('object_material', {}).values():
+        yield eval(d['object']).material_slots[d['slot_index']], 'material'
+    for d in data.get('property', {}).values():
+        owner, sep, attr = d['full_data_path'].rpartition('.')
+        if sep and attr.isidentifier():
+            yield eval(owner), attr
+
+
+def get_scene_state(task_list):
+    """values of the settings the tasks are going to change, to put them back after the render
+    the scripts and the view layer passes are not undone
+    :parm task_list: task data of the tasks
+    :return: list of (owner, attribute, value)
+    """
+    scn = bpy.context.scene
+    state = []
+    seen = set()
+
+    def add(owner, attr):
+        if (owner, attr) in seen: return
+        seen.add((owner, attr))
+        try:
+            state.append((owner, attr, get_state_value(owner, attr)))
+        except AttributeError as e:
+            logger.info(e)
+
+    add(scn, 'frame_current')
+    add(scn.render, 'filepath')
+    add(scn.render, 'use_file_extension')
+    for data in task_list:
+        try:
+            for owner, attr in get_scene_targets(data):
+                add(owner, attr)
+        except Exception as e:
+            # the task report the missing object itself when it is applied
+            logger.info(f'RSN scene state: {e}')
+    return state
+
+
+def restore_scene_state(state):
+    """put back the values of get_scene_state()"""
+    scn = bpy.context.scene
+    if 'rsn_border' in scn:
+        del scn['rsn_border']
+    for owner, attr, value in state:
+        try:
+            compare(owner, attr, value)
+        except (ReferenceError, TypeError, ValueError) as e:
+            logger.warning(f'RSN can not restore "{attr}": {e}')
+
+
 class RSN_OT_UpdateParms(bpy.types.Operator):
     """Update RSN parameters"""
     bl_idname = "rsn.update_parms"
@@ -48,9 +176,14 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
     use_render_mode: BoolProperty(default=True, description="Prevent from python context error")
 
     view_mode_handler: StringProperty()
+    tree_name: StringProperty(description="Read this node tree instead of the context one (for timers)")
     update_scripts: BoolProperty(default=False)
+    task_data_json: StringProperty(description="Apply this task data (json) instead of reading the node tree")
+    skip_keys: StringProperty(description="Keys of the json task data that are already applied, comma separated")
+    curve_values_json: StringProperty(description="Values of the baked curves at this frame (json), "
+                                                  "the curves of the task data are not evaluated")
 
-    nt: None
+    nt = None
     task_data = None
 
     def execute(self, context):
@@ -79,6 +212,10 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
         use try to catch error because user may use task info node to input settings
 
         """
+        if self.nt is None:
+            # applying a render plan, no node to show the warning
+            logger.warning(f'RSN {node_name}: {msg}')
+            return
         try:
             node = self.nt.nodes[node_name]
             node.set_warning(msg=msg)
@@ -89,7 +226,19 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
     def get_data(self):
         """Viewer mode and render mode.Prevent the python state error"""
 
-        if not self.use_render_mode:
+        if self.task_data_json != '':
+            # task data from a render plan, the node tree is not needed
+            self.nt = bpy.data.node_groups.get(self.tree_name)
+            self.task_data = json.loads(self.task_data_json)
+            for key in self.skip_keys.split(','):
+                self.task_data.pop(key, None)
+            logger.debug(f'Get Task "{self.view_mode_handler}" from json')
+            return
+
+        if self.tree_name != '':
+            # read the node tree by name (no space_data in timers)
+            self.nt = bpy.data.node_groups.get(self.tree_name)
+        elif not self.use_render_mode:
             # read the node tree from context space_data
             rsn_tree = RSN_NodeTree()
             self.nt = rsn_tree.get_context_tree()
@@ -113,6 +262,17 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
             logger.debug(f'Not task is linked to the viewer')
 
 
+    def update_curves(self):
+        """values of the Value Curve nodes at the current frame"""
+        if self.curve_values_json != '':
+            apply_curves(self.task_data, None, json.loads(self.curve_values_json))
+        elif 'curves' in self.task_data:
+            try:
+                apply_curves(self.task_data, bpy.context.scene.frame_current)
+            except ValueError as e:
+                for node_name in self.task_data['curves']:
+                    self.warning_node_color(node_name, str(e))
+
     def update_color_management(self):
         """may change in 2.93 version"""
         if 'ev' in self.task_data:
@@ -150,70 +310,24 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
             return os.path.dirname(bpy.data.filepath) + "/"
 
     def get_postfix(self):
-        """path expression"""
-        scn = bpy.context.scene
-        cam = scn.camera
-
-        blend_name = ''
-        postfix = ''
-
-        if 'path' in self.task_data:
-
-            postfix = self.task_data["path_format"]
-            # replace camera name
-            if cam:
-                postfix = postfix.replace('$camera', cam.name)
-            else:
-                postfix = postfix
-            # replace engine
-            postfix = postfix.replace('$engine', bpy.context.scene.render.engine)
-            # replace res
-            postfix = postfix.replace('$res', f"{scn.render.resolution_x}x{scn.render.resolution_y}")
-            # replace label
-            postfix = postfix.replace('$label', self.task_data["label"])
-            # replace view_layer
-            postfix = postfix.replace('$vl', bpy.context.view_layer.name)
-            # version_
-            postfix = postfix.replace('$V', self.task_data["version"])
-
-            # frame completion
-            STYLE = re.findall(r'([$]F\d)', postfix)
-            if len(STYLE) > 0:
-                c_frame = bpy.context.scene.frame_current
-                for i, string in enumerate(STYLE):
-                    format = f'0{STYLE[i][-1:]}d'
-                    postfix = postfix.replace(STYLE[i], f'{c_frame:{format}}')
-
-            # time format
-            TIME = re.findall(r'([$]T{.*?})', postfix)
-            if len(TIME) > 0:
-                for i, string in enumerate(TIME):
-                    format = time.strftime(TIME[i][3:-1], time.localtime())
-                    postfix = postfix.replace(TIME[i], format)
-
-            # replace filename
-            try:
-                blend_name = bpy.path.basename(bpy.data.filepath)[:-6]
-                postfix = postfix.replace('$blend', blend_name)
-            except Exception:
-                return 'untitled'
+        """path expression, compiled once for each format"""
+        if 'path' not in self.task_data: return ''
 
-        return postfix
+        values = get_path_values(self.task_data, applied=True)
+        # blender fill the frame number when rendering animation
+        frame = None if self.task_data.get('render_animation') else bpy.context.scene.frame_current
+        return get_path_format(self.task_data['path_format']).format(values, frame)
 
     def update_view_layer_passes(self):
         """each view layer will get a file output node
         but I recommend to save an Multilayer exr file instead of use this node
+        only the difference to the last task is applied, compositing stay off when no pass is needed
         """
-        if 'view_layer_passes' in self.task_data:
-            for node_name, dict in self.task_data['view_layer_passes'].items():
-                try:
-                    bpy.ops.rsn.creat_compositor_node(
-                        view_layer=self.task_data['view_layer_passes'][node_name]['view_layer'],
-                        use_passes=self.task_data['view_layer_passes'][node_name]['use_passes'])
-                except Exception as e:
-                    logger.warning(f'View Layer Passes {node_name} error', exc_info=e)
-        else:
-            bpy.ops.rsn.creat_compositor_node(use_passes=0, view_layer=bpy.context.window.view_layer.name)
+        try:
+            sync_compositor(bpy.context.scene, self.task_data.get('view_layer_passes', {}),
+                            bpy.context.view_layer.name)
+        except Exception as e:
+            logger.warning('View Layer Passes error', exc_info=e)
 
     def update_property(self):
         if 'property' in self.task_data:
@@ -252,7 +366,7 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
                     if ob.material_slots[dict['slot_index']].material.name != dict['new_material']:
                         ob.material_slots[dict['slot_index']].material = bpy.data.materials[dict['new_material']]
                 except Exception as e:
-                    pass
+                    self.warning_node_color(node_name, f'Material error!\n{e}')
 
     def update_object_data(self):
         if 'object_data' in self.task_data:
@@ -295,22 +409,29 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
         if 'email' in self.task_data:
             for node_name, email_dict in self.task_data['email'].items():
                 try:
-                    bpy.ops.rsn.send_email(subject=email_dict['subject'],
-                                           content=email_dict['content'],
-                                           sender_name=email_dict['sender_name'],
-                                           email=email_dict['email'])
+                    # send on the background thread
+                    queue_email(subject=email_dict['subject'],
+                                content=email_dict['content'],
+                                sender_name=email_dict['sender_name'],
+                                email=email_dict['email'])
                 except Exception as e:
                     self.warning_node_color(node_name, str(e))
 
     def updata_view_layer(self):
-        if 'view_layer' in self.task_data and bpy.context.window.view_layer.name != self.task_data['view_layer']:
-            bpy.context.window.view_layer = bpy.context.scene.view_layers[self.task_data['view_layer']]
+        window = get_window()
+        if 'view_layer' in self.task_data and window and window.view_layer.name != self.task_data['view_layer']:
+            window.view_layer = bpy.context.scene.view_layers[self.task_data['view_layer']]
 
     def updata_scripts(self):
+        """the code is compiled once and cached until the source change
+        the scripts still see the names of this module and of the method, as with exec() before
+        """
         if 'scripts' in self.task_data:
             for node_name, value in self.task_data['scripts'].items():
+                filename = f'<RSN {node_name}>'
                 try:
-                    exec(value)
+                    run_script(node_name, value, filename, self.task_data,
+                               dict(globals(), self=self, node_name=node_name, value=value))
                 except Exception as e:
                     self.warning_node_color(node_name, str(e))
 
@@ -318,9 +439,11 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
             for node_name, file_name in self.task_data['scripts_file'].items():
                 try:
                     c = bpy.data.texts[file_name].as_string()
-                    exec(c)
+                    run_script(node_name, c, file_name, self.task_data,
+                               dict(globals(), self=self, node_name=node_name, file_name=file_name, c=c))
                 except Exception as e:
-                    self.warning_node_color(node_name, str(e))
+                    line = get_error_line(e, file_name)
+                    self.warning_node_color(node_name, f'{file_name} line {line}: {e}' if line else str(e))
 
     def update_image_format(self):
         if 'image_settings' in self.task_data:
@@ -398,6 +521,23 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
             compare(rn, 'resolution_y', self.task_data['res_y'])
             compare(rn, 'resolution_percentage', self.task_data['res_scale'])
 
+    def update_render_region(self):
+        """border render, the border of the scene is restored for the tasks without a region"""
+        scn = bpy.context.scene
+        rn = scn.render
+        if 'render_region' in self.task_data:
+            region = self.task_data['render_region']
+            if 'rsn_border' not in scn:
+                scn['rsn_border'] = {attr: getattr(rn, attr) for attr in BORDER_ATTRS}
+            compare(rn, 'use_border', True)
+            compare(rn, 'border_min_x', region['min_x'])
+            compare(rn, 'border_max_x', region['max_x'])
+            compare(rn, 'border_min_y', region['min_y'])
+            compare(rn, 'border_max_y', region['max_y'])
+            compare(rn, 'use_crop_to_border', region['crop'])
+        else:
+            restore_render_border(scn)
+
     def update_camera(self):
         if 'camera' in self.task_data and self.task_data['camera']:
             cam = eval(self.task_data['camera'])
@@ -411,10 +551,12 @@ class RSN_OT_UpdateParms(bpy.types.Operator):
         self.get_data()
 
         if self.task_data:
+            self.update_curves()
 
             self.update_camera()
             self.update_color_management()
             self.update_res()
+            self.update_render_region()
             self.update_render_engine()
 
             self.update_property()
@@ -0,0 +1,137 @@
+"""Value curves of the task data
+
+A Value Curve node add a curve to task_data['curves'] ({node name: curve}), the curve
+drive one task data key (dots for nested keys) over the frames.
+
+curve from the node:
+    {'key': 'ev', 'type': 'KEYFRAMES', 'x': [frames], 'y': [values], 'interpolation': 'LINEAR' or 'CONSTANT'}
+        'extrapolation': 'LINEAR' to extend the first and last keys, constant if missing
+        'sampled': True if x are samples of an fcurve, the node sample it again on the frames of the task
+    {'key': 'ev', 'type': 'EXPRESSION', 'expression': 'np.sin(frame / 10)'}
+    'int': True to round the values (samples, bounces...)
+
+When the queue is built the curves are baked for the frames of the task:
+    {'key': 'ev', 'start': frame start, 'step': frame step, 'values': array('d'), 'int': False}
+so the value of a frame is only a lookup.
+
+numpy is imported when a curve is baked. Nothing in this module imports bpy.
+"""
+
+from array import array
+
+from .task_table import set_key
+
+
+def get_numpy():
+    import numpy as np
+    return np
+
+
+def expression_namespace(np, frames):
+    return {'__builtins__': {},
+            'np'         : np,
+            'frame'      : frames,
+            'pi'         : np.pi,
+            'sin'        : np.sin,
+            'cos'        : np.cos,
+            'sqrt'       : np.sqrt,
+            'abs'        : np.abs,
+            'clip'       : np.clip,
+            'min'        : np.minimum,
+            'max'        : np.maximum,
+            'floor'      : np.floor,
+            'round'      : np.round}
+
+
+def evaluate_curve(curve, frames):
+    """values of a (not baked) curve at the frames, all at once
+    :parm frames: list or numpy array of frames
+    :return: numpy array
+    """
+    np = get_numpy()
+    frames = np.asarray(frames, dtype=np.float64)
+
+    if curve['type'] == 'EXPRESSION':
+        try:
+            values = eval(curve['expression'], expression_namespace(np, frames))
+        except Exception as e:
+            raise ValueError(f'Expression "{curve["expression"]}": {e}') from e
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), frames.shape)
+    else:
+        x = np.asarray(curve['x'], dtype=np.float64)
+        y = np.asarray(curve['y'], dtype=np.float64)
+        if curve.get('interpolation') == 'CONSTANT':
+            # hold the value of the last key before the frame
+            i = np.clip(np.searchsorted(x, frames, side='right') - 1, 0, len(y) - 1)
+            values = y[i]
+        else:
+            # constant outside the keys, like the default fcurve extrapolation
+            values = np.interp(frames, x, y)
+            if curve.get('extrapolation') == 'LINEAR' and len(x) > 1:
+                # the slope of the first and last segments
+                before, after = frames < x[0], frames > x[-1]
+                values[before] = y[0] + (frames[before] - x[0]) * (y[1] - y[0]) / (x[1] - x[0])
+                values[after] = y[-1] + (frames[after] - x[-1]) * (y[-1] - y[-2]) / (x[-1] - x[-2])
+
+    if curve.get('int'):
+        values = np.round(values)
+    return values
+
+
+def bake_curve(curve, frame_start, frame_end, frame_step=1):
+    """bake a curve for the frames of a task"""
+    np = get_numpy()
+    frames = np.arange(frame_start, frame_end + 1, frame_step)
+    values = evaluate_curve(curve, frames)
+    return {'key'   : curve['key'],
+            'start' : frame_start,
+            'step'  : frame_step,
+            'values': array('d', values.tolist()),
+            'int'   : curve.get('int', False)}
+
+
+def bake_task_curves(task_data):
+    """bake all the curves of a task in place, call it after the frame range is filled
+    the curves that can not be evaluated are kept as they are
+    :return: list of (node name, error message)
+    """
+    errors = []
+    curves = task_data.get('curves', {})
+    for name, curve in curves.items():
+        if 'values' in curve: continue
+        try:
+            curves[name] = bake_curve(curve, task_data['frame_start'], task_data['frame_end'],
+                                      task_data['frame_step'])
+        except ValueError as e:
+            errors.append((name, str(e)))
+    return errors
+
+
+def get_curve_value(curve, frame):
+    if 'values' in curve:
+        values = curve['values']
+        i = min(max((frame - curve['start']) // curve['step'], 0), len(values) - 1)
+        value = values[i]
+    else:
+        # not baked (the viewer), evaluate this frame only
+        value = float(evaluate_curve(curve, [frame])[0])
+    return int(value) if curve.get('int') else value
+
+
+def get_curve_values(task_data, frame):
+    """:return: {task data key: value} of the curves at this frame"""
+    return {curve['key']: get_curve_value(curve, frame) for curve in task_data.get('curves', {}).values()}
+
+
+def apply_curves(task_data, frame, values=None):
+    """set the values of the curves at this frame into the task data
+    :parm values: from get_curve_values, the curves are not read if given
+    """
+    if values is None:
+        values = get_curve_values(task_data, frame)
+    for key, value in values.items():
+        set_key(task_data, key, value)
+
+
+def get_curves_signature(task_data, frame):
+    return tuple(get_curve_value(curve, frame) for curve in task_data.get('curves', {}).values())
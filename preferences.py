@@ -29,6 +29,15 @@ class NodeSmtpProps(bpy.types.PropertyGroup):
         name="SMTP Password",
         description="The SMTP Password for your receiver email",
         subtype='PASSWORD')
+    port: IntProperty(name="Port", default=465, min=1, max=65535)
+    use_ssl: BoolProperty(name="Use SSL", default=True)
+
+    batch_size: IntProperty(name="Batch Size",
+                            description="Send one digest for this number of mails, 0 to only use the time window",
+                            default=1, min=0)
+    batch_interval: FloatProperty(name="Batch Interval",
+                                  description="Send one digest for all mails in this time (seconds), 0 to disable",
+                                  default=0, min=0)
 
 
 class NodeViewerProps(bpy.types.PropertyGroup):
@@ -56,6 +65,10 @@ class NodeViewerProps(bpy.types.PropertyGroup):
     update_view_layer_passes: BoolProperty(name='Update ViewLayer Passes',
                                            description="Update ViewLayer Passes node when using viewer node",
                                            default=False)
+    update_delay: FloatProperty(name='Update Delay',
+                                description="Seconds to wait after the last change before updating the viewer task, "
+                                            "0 to update at once",
+                                default=0.1, min=0, soft_max=1)
 
 
 class NodeFilePathProps(bpy.types.PropertyGroup):
@@ -181,6 +194,10 @@ class RSN_Preference(bpy.types.AddonPreferences):
             box.use_property_split = True
             box.prop(self.node_smtp, "server", text='Server')
             box.prop(self.node_smtp, "password", text='Password')
+            box.prop(self.node_smtp, "port")
+            box.prop(self.node_smtp, "use_ssl")
+            box.prop(self.node_smtp, "batch_size")
+            box.prop(self.node_smtp, "batch_interval")
 
     def viewer_node(self, box):
         box.prop(self.node_viewer, 'show', text="Viewer Node", emboss=False,
@@ -191,6 +208,7 @@ class RSN_Preference(bpy.types.AddonPreferences):
             box.prop(self.node_viewer, 'update_scripts')
             box.prop(self.node_viewer, 'update_path')
             box.prop(self.node_viewer, 'update_view_layer_passes')
+            box.prop(self.node_viewer, 'update_delay')
 
     def drawKeymap(self):
         col = self.layout.box().column()
@@ -0,0 +1,153 @@
+"""Install the bundled presets to the user preset folder
+
+preset/manifest.json lists the bundled files of each preset family with a content hash:
+
+    {"version": 1,
+     "families": {"resolution_preset": {"1920 x 1080.py": "<sha1>", ...}}}
+
+The user folder keeps a record of what has been installed (.rsn_manifest.json),
+together with the size and mtime of the bundled manifest. When they match,
+nothing changed and the registration is a single small file read.
+
+Nothing in this module imports bpy. Regenerate the manifest after adding or changing a preset:
+
+    python preset_manifest.py
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+
+logger = logging.getLogger('mylogger')
+
+MANIFEST_VERSION = 1
+PRESET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preset')
+MANIFEST_FILE = 'manifest.json'
+RECORD_FILE = '.rsn_manifest.json'
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def manifest_stamp(path):
+    """size and mtime of the bundled manifest, cheaper than reading it"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def scan_family(family_dir):
+    """{relative path: hash} of the preset files in a family folder"""
+    files = {}
+    for root, dirs, file_list in os.walk(family_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for f in sorted(file_list):
+            path = os.path.join(root, f)
+            rel = os.path.relpath(path, family_dir).replace(os.sep, '/')
+            files[rel] = file_hash(path)
+    return files
+
+
+def build_manifest(preset_dir=PRESET_DIR):
+    families = {}
+    for family in sorted(os.listdir(preset_dir)):
+        family_dir = os.path.join(preset_dir, family)
+        if os.path.isdir(family_dir) and family != '__pycache__':
+            families[family] = scan_family(family_dir)
+    return {'version': MANIFEST_VERSION, 'families': families}
+
+
+def write_manifest(preset_dir=PRESET_DIR):
+    manifest = build_manifest(preset_dir)
+    write_json(os.path.join(preset_dir, MANIFEST_FILE), manifest)
+    return manifest
+
+
+def install_presets(family, user_preset_dir, preset_dir=PRESET_DIR):
+    """Copy the new or updated bundled presets of a family to the user folder
+    A file is copied when it has not been installed before, or when the bundled file changed
+    and the user has not edited the installed copy. Presets removed by the user stay removed.
+    :parm family: folder name in preset/, eg. 'resolution_preset'
+    :parm user_preset_dir: user folder of this family, eg. scripts/presets/RSN/resolution_preset
+    :return: list of installed files
+    """
+    manifest_path = os.path.join(preset_dir, MANIFEST_FILE)
+    record_path = os.path.join(user_preset_dir, RECORD_FILE)
+    stamp = manifest_stamp(manifest_path)
+
+    record = read_json(record_path) or {}
+    if stamp is not None and record.get('version') == MANIFEST_VERSION and record.get('stamp') == stamp:
+        return []
+
+    manifest = read_json(manifest_path)
+    if manifest is not None and manifest.get('version') == MANIFEST_VERSION:
+        bundled = manifest['families'].get(family, {})
+    else:
+        # no usable manifest, scan the bundled folder instead
+        bundled = scan_family(os.path.join(preset_dir, family))
+
+    installed = record.get('files', {}) if record.get('version') == MANIFEST_VERSION else {}
+    family_dir = os.path.join(preset_dir, family)
+    copied = []
+
+    for rel, bundled_hash in bundled.items():
+        old_hash = installed.get(rel)
+        if old_hash == bundled_hash: continue
+
+        dest = os.path.join(user_preset_dir, *rel.split('/'))
+        if os.path.exists(dest):
+            dest_hash = file_hash(dest)
+            if dest_hash == bundled_hash:
+                installed[rel] = bundled_hash
+                continue
+            # keep the user's edit
+            if dest_hash != old_hash: continue
+        elif old_hash is not None:
+            # removed by the user
+            continue
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copy2(os.path.join(family_dir, *rel.split('/')), dest)
+        installed[rel] = bundled_hash
+        copied.append(rel)
+
+    if copied:
+        logger.info(f'RSN installed bundled {family}:\n{copied}')
+
+    try:
+        os.makedirs(user_preset_dir, exist_ok=True)
+        write_json(record_path, {'version': MANIFEST_VERSION, 'stamp': stamp, 'files': installed})
+    except OSError as e:
+        logger.warning(f'RSN preset record not saved: {e}')
+
+    return copied
+
+
+if __name__ == '__main__':
+    manifest = write_manifest()
+    for family, files in manifest['families'].items():
+        print(f'{family}: {len(files)} files')
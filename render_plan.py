@@ -0,0 +1,111 @@
+"""Portable render plan
+
+A plan is the fully resolved render queue: the task data of every task, the frames to render
+and the output template. It is written once from the node tree, after that it can be inspected,
+diffed or handed to other blender processes, which apply it without evaluating the node tree.
+
+Nothing in this module imports bpy.
+
+json format (.rsnplan):
+    {"version": 1,
+     "meta": {"blend": "/path/scene.blend", "tree": "NodeTree", "render_list": "Render List", ...},
+     "tasks": [
+        {"name": "Task", "label": "Task",
+         "frames": [1, 2, 3],
+         "output": "//render/$label_$F4",
+         "data": {<task data>}},
+        ...
+     ]}
+"""
+
+import os
+import json
+import time
+
+PLAN_VERSION = 1
+PLAN_EXT = '.rsnplan'
+
+
+def expand_frames(frame_start, frame_end, frame_step=1):
+    return list(range(frame_start, frame_end + 1, max(frame_step, 1)))
+
+
+def output_template(task_data):
+    """directory and file name format of a task, '' if the task use the scene file path"""
+    if 'path' not in task_data:
+        return ''
+    return os.path.join(os.path.dirname(task_data['path']), task_data.get('path_format', ''))
+
+
+class RSN_Plan:
+    """Resolved render queue
+    :parm tasks: list of dict {'name', 'label', 'frames', 'output', 'data'}
+    :parm meta: dict, where the plan comes from
+    """
+
+    def __init__(self, tasks=None, meta=None):
+        self.tasks = tasks if tasks is not None else []
+        self.meta = meta if meta is not None else {}
+
+    def add_task(self, name, task_data):
+        frames = expand_frames(task_data['frame_start'], task_data['frame_end'], task_data['frame_step'])
+        task = {'name'  : name,
+                'label' : task_data.get('label', name),
+                'frames': frames,
+                'output': output_template(task_data),
+                'data'  : task_data}
+        self.tasks.append(task)
+        return task
+
+    @classmethod
+    def from_queue(cls, rsn_queue, **meta):
+        """
+        :parm rsn_queue: RSN_Queue, the frames are filled in init_queue
+        """
+        plan = cls(meta=dict(meta, created=time.strftime('%Y-%m-%d %H:%M:%S')))
+        # the virtual tasks are made one by one, the plan holds them all
+        for name, task_data in rsn_queue.iter_tasks():
+            plan.add_task(name, task_data)
+        return plan
+
+    def get_task(self, name):
+        for task in self.tasks:
+            if task['name'] == name:
+                return task
+
+    def frame_count(self):
+        return sum(len(task['frames']) for task in self.tasks)
+
+    ## IO
+    #########################################
+
+    def to_dict(self):
+        return {'version': PLAN_VERSION, 'meta': self.meta, 'tasks': self.tasks}
+
+    @classmethod
+    def from_dict(cls, data):
+        version = data.get('version')
+        if version != PLAN_VERSION:
+            raise ValueError(f'Unsupported plan version: {version} (expect {PLAN_VERSION})')
+        return cls(tasks=data['tasks'], meta=data.get('meta', {}))
+
+    def dumps(self, indent=None):
+        # compact by default, task data may contain vectors
+        separators = None if indent else (',', ':')
+        return json.dumps(self.to_dict(), indent=indent, separators=separators, ensure_ascii=False, default=list)
+
+    @classmethod
+    def loads(cls, string):
+        return cls.from_dict(json.loads(string))
+
+    def dump(self, path, indent=None):
+        """write to a temp file first, workers never read a half written plan"""
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.dumps(indent))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.loads(f.read())
@@ -0,0 +1,111 @@
+"""Statistics of each rendered frame
+
+Blender reports the render state as text in the render_stats handler, eg.
+    "Fra:1 Mem:120.05M (Peak 310.61M) | Time:00:02.31 | Mem:9.89M, Peak:9.89M | Scene, ViewLayer | Sample 32/64"
+the text is parsed while the frame renders, the frame is recorded in render_post.
+
+Nothing in this module imports bpy.
+"""
+
+import os
+import re
+import csv
+import json
+
+PEAK = re.compile(r'Peak[: ]\s*([\d.]+)\s*([KMG])', re.IGNORECASE)
+SAMPLE = re.compile(r'(?:Sample|Rendering)\s+(\d+)\s*/\s*(\d+)')
+
+UNIT = {'K': 1 / 1024, 'M': 1, 'G': 1024}
+
+FIELDS = ('task', 'label', 'frame', 'engine', 'time', 'peak_mem', 'samples')
+
+
+def parse_stats(text):
+    """:return: dict with 'peak_mem' (MB) and 'samples' when found in the text"""
+    stats = {}
+    peaks = [float(value) * UNIT[unit.upper()] for value, unit in PEAK.findall(text)]
+    if peaks:
+        stats['peak_mem'] = max(peaks)
+    match = SAMPLE.search(text)
+    if match:
+        stats['samples'] = int(match.group(1))
+    return stats
+
+
+def format_mem(mb):
+    return f'{mb / 1024:.2f} G' if mb >= 1024 else f'{mb:.0f} M'
+
+
+class RSN_RenderStats:
+    """Frames rendered by a queue
+    :parm frames: list of dict with the keys of FIELDS
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.current = None
+
+    def begin(self, task, label, frame, engine):
+        self.current = {'task': task, 'label': label, 'frame': frame, 'engine': engine,
+                        'time': 0.0, 'peak_mem': 0.0, 'samples': 0}
+
+    def update(self, text):
+        """call from the render_stats handler, keep the highest values"""
+        if self.current is None: return
+        stats = parse_stats(text)
+        if stats.get('peak_mem', 0) > self.current['peak_mem']:
+            self.current['peak_mem'] = stats['peak_mem']
+        if stats.get('samples', 0) > self.current['samples']:
+            self.current['samples'] = stats['samples']
+
+    def end(self, seconds):
+        if self.current is None: return
+        self.current['time'] = round(seconds, 3)
+        self.frames.append(self.current)
+        self.current = None
+
+    def is_empty(self):
+        return len(self.frames) == 0
+
+    ## REPORT
+    #########################################
+
+    def task_averages(self):
+        """:return: {task: {'frames', 'avg_time', 'total_time', 'peak_mem'}} in render order"""
+        tasks = {}
+        for f in self.frames:
+            t = tasks.setdefault(f['task'], {'frames': 0, 'total_time': 0.0, 'peak_mem': 0.0})
+            t['frames'] += 1
+            t['total_time'] += f['time']
+            t['peak_mem'] = max(t['peak_mem'], f['peak_mem'])
+        for t in tasks.values():
+            t['avg_time'] = t['total_time'] / t['frames']
+        return tasks
+
+    def summary(self, count=3):
+        """short report for the Processor node"""
+        return {'frames'    : len(self.frames),
+                'total_time': sum(f['time'] for f in self.frames),
+                'slowest'   : sorted(self.frames, key=lambda f: f['time'], reverse=True)[:count],
+                'peak_mem'  : sorted(self.frames, key=lambda f: f['peak_mem'], reverse=True)[:count],
+                'tasks'     : self.task_averages()}
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.frames)
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'frames': self.frames, 'summary': self.summary()}, f, indent=2, ensure_ascii=False)
+
+    def export(self, dir, name):
+        """write name.csv and name.json in the folder
+        :return: list of files
+        """
+        os.makedirs(dir, exist_ok=True)
+        files = [os.path.join(dir, name + '.csv'), os.path.join(dir, name + '.json')]
+        self.export_csv(files[0])
+        self.export_json(files[1])
+        return files
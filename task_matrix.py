@@ -0,0 +1,168 @@
+"""Virtual tasks from a matrix of axes
+
+A Task Matrix node add 'task_matrix' to the task data, the queue then expands the task
+into the cartesian product of its axes, one virtual task for each combination.
+
+axis:
+    {'type': 'VARIANTS', 'node': variants node name, 'values': [input index, ...]}
+    {'type': 'SWEEP', 'key': task data key (dots for nested keys), 'values': [value, ...]}
+
+The combinations are made one at a time in gray code order, so two following combinations
+only differ in one axis. Each virtual task keeps the top level keys that changed from the
+one before ('matrix_changed'), the render only apply these keys again.
+
+The queue holds the generator and pull one combination when the render reach it, the number
+of tasks is the product of the axis sizes (count_matrix_tasks), no task data is made for it.
+
+Nothing in this module imports bpy.
+"""
+
+import math
+
+from .task_table import parse_value, apply_row
+
+# keys that are applied node by node, they can be skipped when they have not changed
+BRANCH_KEYS = ('property', 'object_display', 'object_psr', 'object_data', 'object_material',
+               'object_modifier', 'world', 'ssm_light_studio')
+
+# update_parms apply these keys together, a sweep of the key need the others in the task
+KEY_NEEDS = {'ev'     : ('gamma',),
+             'gamma'  : ('ev',),
+             'samples': ('engine',)}
+
+
+def get_missing_keys(key, task_data):
+    """keys that must be in the task data before this key can be applied
+    :parm key: dots for nested keys, the parents must exist (their node is in the task)
+    """
+    missing = [k for k in KEY_NEEDS.get(key, ()) if k not in task_data]
+    keys = key.split('.')
+    data = task_data
+    for i, k in enumerate(keys[:-1]):
+        if not isinstance(data, dict) or k not in data:
+            missing.append('.'.join(keys[:i + 1]))
+            break
+        data = data[k]
+    return missing
+
+
+def check_sweep_keys(axes, task_data):
+    """:raise ValueError: a sweep key can not be applied to this task data"""
+    for axis in axes:
+        if axis['type'] != 'SWEEP': continue
+        missing = get_missing_keys(axis['key'], task_data)
+        if missing:
+            raise ValueError(f'Sweep of "{axis["key"]}" needs {", ".join(missing)} in the task, '
+                             f'add the node that set it')
+
+
+def sweep_range(start, stop, step):
+    """values from start to stop (included)"""
+    if step == 0 or (stop - start) / step < 0:
+        return [start]
+    count = int(math.floor((stop - start) / step + 1e-9)) + 1
+    if all(float(v).is_integer() for v in (start, step)):
+        return [int(start + i * step) for i in range(count)]
+    return [round(start + i * step, 6) for i in range(count)]
+
+
+def sweep_list(text):
+    """'64, 128, 256' -> [64, 128, 256]"""
+    return [parse_value(v.strip()) for v in text.split(',') if v.strip()]
+
+
+def gray_product(sizes):
+    """index tuples of the cartesian product, two following tuples only differ in one axis
+    the last axis change fastest (reflected mixed radix gray code)
+    """
+    if not sizes or 0 in sizes: return
+
+    digits = [0] * len(sizes)
+    dirs = [1] * len(sizes)
+    yield tuple(digits)
+
+    while True:
+        for j in range(len(sizes) - 1, -1, -1):
+            d = digits[j] + dirs[j]
+            if 0 <= d < sizes[j]:
+                digits[j] = d
+                break
+            dirs[j] = -dirs[j]
+        else:
+            return
+        yield tuple(digits)
+
+
+def count_matrix_tasks(task_data):
+    """number of combinations, without making them"""
+    sizes = [len(axis['values']) for axis in task_data['task_matrix']['axes'] if axis['values']]
+    count = 1 if sizes else 0
+    for size in sizes:
+        count *= size
+    return count
+
+
+def get_changed_keys(last, data):
+    return sorted(k for k in set(last) | set(data) if last.get(k) != data.get(k))
+
+
+def axis_label(axis, value):
+    if axis['type'] == 'VARIANTS':
+        return f"{axis['node']}{value}"
+    return f"{axis['key'].split('.')[-1]}{value}"
+
+
+def iter_matrix_tasks(task_name, task_data, resolve_variants=None):
+    """Expand a task with a matrix into virtual tasks, one combination at a time
+    :parm resolve_variants: function({variants node name: active input}) -> task data,
+        None if the matrix has only sweeps
+    :return: generator of (virtual task name, task data)
+    """
+    axes = [axis for axis in task_data['task_matrix']['axes'] if axis['values']]
+    var_axes = [axis for axis in axes if axis['type'] == 'VARIANTS']
+    if var_axes and resolve_variants is None:
+        raise ValueError('Variants axes need the node tree')
+
+    base_label = task_data.get('label') or task_name
+    last = last_name = None
+
+    for i, index in enumerate(gray_product([len(axis['values']) for axis in axes])):
+        values = [axis['values'][j] for axis, j in zip(axes, index)]
+
+        if var_axes:
+            var_collect = {axis['node']: value for axis, value in zip(axes, values) if axis['type'] == 'VARIANTS'}
+            base = resolve_variants(var_collect)
+        else:
+            base = task_data
+        base = {k: v for k, v in base.items() if k != 'task_matrix'}
+        if var_axes or i == 0:
+            check_sweep_keys(axes, base)
+
+        sweeps = {axis['key']: value for axis, value in zip(axes, values) if axis['type'] == 'SWEEP'}
+        data = apply_row(base, sweeps)
+
+        suffix = '_'.join(axis_label(axis, value) for axis, value in zip(axes, values))
+        name = f'{task_name}[{suffix}]'
+        data['name'] = name
+        data['virtual_of'] = task_name
+        data['matrix_index'] = i
+        if 'label' not in sweeps:
+            data['label'] = f'{base_label}_{suffix}'
+
+        if last is not None:
+            data['matrix_prev'] = last_name
+            data['matrix_changed'] = [k for k in get_changed_keys(last, data) if k in BRANCH_KEYS]
+        last, last_name = data, name
+
+        yield name, data
+
+
+def get_skip_keys(task_data, last_task):
+    """branch keys that are already applied by the task before
+    :parm last_task: name of the task applied before
+    """
+    if 'matrix_changed' not in task_data or task_data.get('matrix_prev') != last_task:
+        return []
+    # keys driven by value curves change on each frame
+    driven = {curve['key'].split('.')[0] for curve in task_data.get('curves', {}).values()}
+    return [k for k in BRANCH_KEYS if k in task_data and k not in task_data['matrix_changed'] and k not in driven]
@@ -0,0 +1,135 @@
+"""Virtual tasks from a table file
+
+A Task Table node add 'task_table' to the task data, the queue then expands the task
+into one virtual task for each row, no blender node is created for them.
+
+CSV: the first row is the header, each column is a task data key.
+JSONL: one json object on each line.
+
+Keys with dots set nested values, eg. "image_settings.file_format".
+CSV cells are read as json when possible (1, 0.5, true, [1, 2]), as text otherwise.
+Empty cells do not override anything. The "name" column names the virtual task.
+The "name", "label" and "version" cells are always text, they are joined into the output path.
+
+The rows are streamed: the queue holds the generator of iter_table_tasks and expands the
+next row only when the render reach it. Only the row count of each file is cached, for the
+progress and the confirm sheet.
+
+Nothing in this module imports bpy.
+"""
+
+import os
+import csv
+import json
+import copy
+import hashlib
+from itertools import islice
+
+# (path, format): (mtime, size, hash, row count)
+_cache = {}
+
+# keys that are text even if the cell looks like a number
+TEXT_KEYS = ('name', 'label', 'version')
+
+
+def parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def read_rows(path, format='AUTO'):
+    """stream the rows of a table file
+    :parm format: 'CSV', 'JSONL' or 'AUTO' (by the extension)
+    """
+    if format == 'AUTO':
+        format = 'JSONL' if os.path.splitext(path)[1].lower() in {'.jsonl', '.ndjson', '.json'} else 'CSV'
+
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if format == 'JSONL':
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            for row in csv.DictReader(f):
+                row = {k.strip(): v for k, v in row.items() if k and v not in (None, '')}
+                yield {k: v if k in TEXT_KEYS else parse_value(v) for k, v in row.items()}
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def count_rows(path, format='AUTO'):
+    """number of rows of a table file, counted again only when the file content change
+    the mtime and size are checked first, the hash only when they change
+    """
+    st = os.stat(path)
+    cached = _cache.get((path, format))
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[3]
+
+    hash = file_hash(path)
+    if cached and cached[2] == hash:
+        count = cached[3]
+    else:
+        count = sum(1 for row in read_rows(path, format))
+    _cache[(path, format)] = (st.st_mtime_ns, st.st_size, hash, count)
+    return count
+
+
+def count_table_tasks(task_data):
+    """number of virtual tasks of the table, without reading the rows if the file has not changed"""
+    table = task_data['task_table']
+    start = table.get('row_start', 0)
+    end = min(table.get('row_end') or float('inf'), count_rows(table['file'], table.get('format', 'AUTO')))
+    return max(int(end) - start, 0)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def set_key(data, key, value):
+    """set "a.b.c" as nested keys"""
+    keys = key.split('.')
+    for k in keys[:-1]:
+        if not isinstance(data.get(k), dict):
+            data[k] = {}
+        data = data[k]
+    data[keys[-1]] = value
+
+
+def apply_row(task_data, row):
+    """task data with the row overrides, the task data is not changed"""
+    data = copy.deepcopy(task_data)
+    for key, value in row.items():
+        set_key(data, key, value)
+    return data
+
+
+def iter_table_tasks(task_name, task_data):
+    """Expand a task with a table into virtual tasks, one row at a time
+    :return: generator of (virtual task name, task data)
+    """
+    table = task_data['task_table']
+    base = {k: v for k, v in task_data.items() if k != 'task_table'}
+    rows = read_rows(table['file'], table.get('format', 'AUTO'))
+    stop = table.get('row_end') or None
+
+    for i, row in enumerate(islice(rows, table.get('row_start', 0), stop), start=table.get('row_start', 0)):
+        row = {k: str(v) if k in TEXT_KEYS else v for k, v in row.items()}
+        name = f"{task_name}[{row.pop('name', i)}]"
+        data = apply_row(base, row)
+        data['name'] = name
+        data['virtual_of'] = task_name
+        data['table_row'] = i
+        if 'label' not in row:
+            data['label'] = f"{base.get('label', task_name)}_{i}"
+        yield name, data
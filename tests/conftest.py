@@ -0,0 +1,46 @@
+"""Load the bpy-free modules of the add-on without blender
+
+The package __init__ imports bpy, so the add-on folder is registered as a bare package
+and only the modules that never touch bpy are imported from it.
+
+Run the tests from the add-on folder with: python -m pytest tests
+"""
+
+import os
+import sys
+import json
+import types
+import importlib
+
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PACKAGE = 'rsn_standalone'
+
+
+def load_module(name):
+    """import a module of the add-on, eg. 'node_graph'"""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ADDON_DIR]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f'{PACKAGE}.{name}')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def node_graph():
+    return load_module('node_graph')
+
+
+@pytest.fixture
+def graph_from_fixture(node_graph):
+    def load(name):
+        return node_graph.RSN_Graph.from_dict(load_fixture(name))
+
+    return load
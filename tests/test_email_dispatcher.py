@@ -0,0 +1,179 @@
+import email
+import socketserver
+import threading
+import time
+from email.header import decode_header, make_header
+
+import pytest
+
+from conftest import load_module
+
+email_dispatcher = load_module('email_dispatcher')
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """just enough smtp for smtplib, the messages are kept on the server"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            cmd = line.split(' ', 1)[0].upper()
+            if cmd == 'DATA':
+                self.reply('354 end with .')
+                data = []
+                for raw in self.rfile:
+                    raw = raw.decode()
+                    if raw.rstrip('\r\n') == '.':
+                        break
+                    data.append(raw)
+                self.server.messages.append(email.message_from_string(''.join(data)))
+                self.reply('250 queued')
+            elif cmd == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.messages = []
+        self.connections = 0
+
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dispatcher():
+    d = email_dispatcher.RSN_EmailDispatcher(max_retries=1, backoff=0)
+    yield d
+    d.stop()
+
+
+def make_mail(i, receiver='me@localhost'):
+    return {'subject': f'Task {i}', 'content': f'Task {i} done', 'sender_name': 'RSN', 'email': receiver}
+
+
+def make_config(server, receiver='me@localhost'):
+    return ('127.0.0.1', server.server_address[1], False, '', receiver)
+
+
+def wait_for(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise TimeoutError
+        time.sleep(0.01)
+
+
+def subject(message):
+    return str(make_header(decode_header(message['Subject'])))
+
+
+def test_one_mail(smtp_server, dispatcher):
+    assert dispatcher.put(make_mail(1), make_config(smtp_server))
+    wait_for(lambda: dispatcher.sent == 1)
+
+    message = smtp_server.messages[0]
+    assert subject(message) == 'Task 1'
+    assert message.get_payload(decode=True).decode() == 'Task 1 done'
+
+
+def test_digest_and_reused_connection(smtp_server, dispatcher):
+    dispatcher.batch_size = 2
+    config = make_config(smtp_server)
+    for i in range(4):
+        dispatcher.put(make_mail(i), config)
+    wait_for(lambda: dispatcher.sent == 4)
+
+    assert [subject(m) for m in smtp_server.messages] == ['RSN: 2 notifications'] * 2
+    assert 'Task 0 done' in smtp_server.messages[0].get_payload(decode=True).decode()
+    assert smtp_server.connections == 1
+
+
+def test_flush_pending(smtp_server, dispatcher):
+    dispatcher.batch_size = 10
+    dispatcher.put(make_mail(1), make_config(smtp_server))
+    dispatcher.flush()
+    wait_for(lambda: dispatcher.sent == 1)
+
+
+def test_stop_send_pending(smtp_server, dispatcher):
+    dispatcher.batch_size = 10
+    dispatcher.put(make_mail(1), make_config(smtp_server))
+    dispatcher.stop()
+
+    assert dispatcher.sent == 1
+    assert not dispatcher.is_alive()
+
+
+def test_failed_delivery(smtp_server, dispatcher):
+    config = ('127.0.0.1', smtp_server.server_address[1], False, '', 'me@localhost')
+    smtp_server.shutdown()
+    smtp_server.server_close()
+
+    dispatcher.put(make_mail(1), config)
+    wait_for(lambda: dispatcher.failed == 1)
+    assert dispatcher.sent == 0
+
+
+class BlockedDispatcher(email_dispatcher.RSN_EmailDispatcher):
+    """the worker wait in send_digest until released"""
+
+    def __init__(self):
+        super().__init__(maxsize=1, max_retries=0, backoff=0)
+        self.release = threading.Event()
+        self.digests = []
+
+    def send_digest(self, pending):
+        self.release.wait(5)
+        self.digests.append(len(pending))
+
+
+def test_full_queue_does_not_block():
+    d = BlockedDispatcher()
+    d.put(make_mail(0), None)
+    wait_for(lambda: d.queue.empty())  # the worker is in send_digest
+    assert d.put(make_mail(1), None)
+    assert not d.put(make_mail(2), None)
+    assert d.dropped == 1
+
+    t1 = time.monotonic()
+    d.flush()
+    thread = d.thread
+    d.stop(timeout=0.2)
+    assert time.monotonic() - t1 < 1
+
+    # the busy worker is kept, no second worker is started
+    assert d.thread is thread
+    d.start()
+    assert d.thread is thread
+
+    # the mail in the queue is sent before the worker ends
+    d.batch_size = 10
+    d.release.set()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert d.digests == [1, 1]
+
+    d.stop()
+    assert d.thread is None
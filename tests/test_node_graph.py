@@ -0,0 +1,62 @@
+def test_children_skip_mute_and_reroute(graph_from_fixture):
+    graph = graph_from_fixture('render_list.json')
+    children = graph.get_children(graph.get_id('Render List'))
+
+    assert graph.names(children) == ['Camera', 'Resolution', 'Merge', 'Task A',
+                                     'Resolution', 'Task B', 'Render List']
+
+
+def test_children_with_mute(graph_from_fixture):
+    graph = graph_from_fixture('render_list.json')
+    names = graph.names(graph.get_children(graph.get_id('Render List'), pass_mute=False))
+
+    assert 'Muted' in names
+    assert 'Task C' in names
+    assert 'Reroute' not in names
+
+
+def test_group_by_task(graph_from_fixture):
+    graph = graph_from_fixture('render_list.json')
+    children = graph.get_children(graph.get_id('Render List'))
+
+    assert graph.group_by_type(children) == {'Task A': ['Camera', 'Resolution', 'Merge'],
+                                             'Task B': ['Resolution']}
+
+
+def test_var_collect_only_used_items(graph_from_fixture):
+    graph = graph_from_fixture('variants.json')
+    children = graph.get_children(graph.get_id('Task'))
+
+    assert graph.get_var_collect(children) == {'Variants': 1}
+
+
+def test_prune_with_set_variants(graph_from_fixture):
+    graph = graph_from_fixture('variants.json')
+    names = graph.names(graph.get_task_children(graph.get_id('Task')))
+
+    assert names == ['Set Variants', 'Modifier B', 'Material B', 'Variants', 'Camera', 'Merge', 'Task']
+
+
+def test_prune_with_other_active_input(graph_from_fixture):
+    graph = graph_from_fixture('variants.json')
+    names = graph.names(graph.get_task_children(graph.get_id('Task'), {'Variants': 0}))
+
+    assert names == ['Set Variants', 'Material A', 'Variants', 'Camera', 'Merge', 'Task']
+
+
+def test_unlinked_and_unknown_inputs(node_graph):
+    graph = node_graph.RSN_Graph.from_dict({'nodes': [
+        {'name': 'Task', 'bl_idname': 'RSNodeTaskNode', 'inputs': [None, 'Missing', 'Camera']},
+        {'name': 'Camera', 'bl_idname': 'RSNodeCamInputNode'}]})
+
+    assert graph.nodes[0].inputs == (node_graph.UNLINKED, node_graph.UNLINKED, 1)
+    assert graph.names(graph.get_children(0)) == ['Camera', 'Task']
+
+
+def test_json_round_trip(graph_from_fixture, node_graph):
+    graph = graph_from_fixture('variants.json')
+    copy = node_graph.RSN_Graph.from_json(graph.to_json())
+
+    assert copy.to_dict() == graph.to_dict()
+    assert copy.names(copy.get_task_children(copy.get_id('Task'))) == \
+           graph.names(graph.get_task_children(graph.get_id('Task')))
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import load_module
+
+update_check = load_module('update_check')
+
+README = '''<html><body>
+<h1><a id="user-content-rendersstack-node" href="#">RenderStack Node</a></h1>
+<h2><a id="user-content-v125" href="#">v1.2.5</a></h2>
+<h2><a id="user-content-v124" href="#">v1.2.4</a></h2>
+</body></html>'''
+
+
+class ReadmeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path != '/README.md':
+            self.send_error(404)
+            return
+        body = README.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ReadmeHandler)
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path='/README.md'):
+    return f'http://127.0.0.1:{server.server_address[1]}{path}'
+
+
+def test_parse_version():
+    assert update_check.parse_version(README) == 125
+
+
+def test_fetch_and_cache(http_server, tmp_path):
+    cache = str(tmp_path / 'cache.json')
+
+    assert update_check.fetch_version(url(http_server), cache, timeout=5) == 125
+    assert http_server.requests == 1
+    assert update_check.read_cache(cache, ttl=60) == 125
+
+
+def test_cache_expire(tmp_path):
+    cache = tmp_path / 'cache.json'
+    cache.write_text(json.dumps({'time': time.time() - 120, 'latest_version': 124}))
+
+    assert update_check.read_cache(str(cache), ttl=60) is None
+    assert update_check.read_cache(str(cache), ttl=300) == 124
+
+
+def test_fetch_again_replace_cache(http_server, tmp_path):
+    """a manual check fetch again even if the cache is fresh"""
+    cache = tmp_path / 'cache.json'
+    cache.write_text(json.dumps({'time': time.time(), 'latest_version': 124}))
+
+    assert update_check.fetch_version(url(http_server), str(cache), timeout=5) == 125
+    assert update_check.read_cache(str(cache), ttl=60) == 125
+
+
+def test_fetch_error_keep_cache(http_server, tmp_path):
+    cache = tmp_path / 'cache.json'
+
+    with pytest.raises(urllib.error.HTTPError):
+        update_check.fetch_version(url(http_server, '/missing'), str(cache), timeout=5)
+    assert update_check.read_cache(str(cache), ttl=60) is None
+
+
+def test_bad_cache_file(tmp_path):
+    cache = tmp_path / 'cache.json'
+    cache.write_text('not json')
+
+    assert update_check.read_cache(str(cache), ttl=60) is None
@@ -0,0 +1,69 @@
+import os
+
+from conftest import load_module
+
+task_table = load_module('task_table')
+task_matrix = load_module('task_matrix')
+
+
+def write_csv(path, rows):
+    path.write_text('name,label,samples\n' + ''.join(f'{i},{i},{i * 16}\n' for i in range(rows)))
+    return str(path)
+
+
+def test_table_rows_are_streamed(tmp_path):
+    path = write_csv(tmp_path / 'table.csv', 1000)
+    tasks = task_table.iter_table_tasks('Task', {'label': 'Task', 'task_table': {'file': path}})
+
+    name, data = next(tasks)
+    assert name == 'Task[0]'
+    assert data['label'] == '0'
+    assert data['samples'] == 0
+    # the file stays open for the next rows, nothing else is read
+    assert next(tasks)[0] == 'Task[1]'
+    tasks.close()
+
+
+def test_table_count(tmp_path):
+    path = write_csv(tmp_path / 'table.csv', 10)
+    task_data = {'task_table': {'file': path, 'row_start': 2, 'row_end': 0}}
+
+    assert task_table.count_table_tasks(task_data) == 8
+    task_data['task_table']['row_end'] = 5
+    assert task_table.count_table_tasks(task_data) == 3
+    task_data['task_table']['row_end'] = 50
+    assert task_table.count_table_tasks(task_data) == 8
+
+
+def test_table_count_cache(tmp_path):
+    path = write_csv(tmp_path / 'table.csv', 10)
+    assert task_table.count_rows(path) == 10
+
+    # the count is kept while the file is the same
+    cached = task_table._cache[(path, 'AUTO')]
+    assert cached[3] == 10 and len(cached) == 4
+
+    write_csv(tmp_path / 'table.csv', 20)
+    os.utime(path, ns=(cached[0] + 10 ** 9, cached[0] + 10 ** 9))
+    assert task_table.count_rows(path) == 20
+
+
+def test_matrix_count_without_tasks():
+    axes = [{'type': 'SWEEP', 'key': 'samples', 'values': list(range(50))},
+            {'type': 'SWEEP', 'key': 'label', 'values': ['a', 'b']},
+            {'type': 'SWEEP', 'key': 'ev', 'values': []}]
+
+    assert task_matrix.count_matrix_tasks({'task_matrix': {'axes': axes}}) == 100
+    assert task_matrix.count_matrix_tasks({'task_matrix': {'axes': []}}) == 0
+
+
+def test_matrix_tasks_are_made_one_at_a_time():
+    task_data = {'label': 'T', 'engine': 'CYCLES', 'samples': 1,
+                 'task_matrix': {'axes': [{'type': 'SWEEP', 'key': 'samples', 'values': list(range(500))}]}}
+    tasks = task_matrix.iter_matrix_tasks('T', task_data)
+
+    first = next(tasks)[1]
+    second = next(tasks)[1]
+    assert (first['samples'], second['samples']) == (0, 1)
+    assert second['matrix_prev'] == 'T[samples0]'
+    assert 'task_matrix' not in first
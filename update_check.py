@@ -0,0 +1,63 @@
+"""Latest version of the add-on, read from the readme page
+
+Nothing in this module imports bpy.
+"""
+
+import json
+import time
+import logging
+from html.parser import HTMLParser
+
+logger = logging.getLogger('mylogger')
+
+
+class MyHTMLParser(HTMLParser):
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        # print('<%s>' % tag)
+        if tag == "a" and len(attrs) != 0:
+            for (variable, value) in attrs:
+                if variable == "id" and value.startswith("user-content"):
+                    self.links.append(value)
+
+
+def parse_version(html_code):
+    parser = MyHTMLParser()
+    parser.feed(html_code)
+    parser.close()
+    return int(parser.links[1][-3:])
+
+
+def read_cache(path, ttl):
+    """return the cached version if it is not older than ttl (seconds)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if time.time() - cache['time'] < ttl:
+            return cache['latest_version']
+    except (OSError, ValueError, KeyError):
+        pass
+
+
+def write_cache(path, version):
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'time': time.time(), 'latest_version': version}, f)
+    except OSError as e:
+        logger.debug(f'RSN update cache not saved: {e}')
+
+
+def fetch_version(url, cache_path, timeout):
+    """read the latest version from the readme page and cache it
+    :raise: the errors of urlopen, and of the parser if the page change
+    """
+    # only import when checking
+    import urllib.request
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        html_code = response.read().decode('utf-8', errors='replace')
+    version = parse_version(html_code)
+    write_cache(cache_path, version)
+    return version
@@ -1,11 +1,18 @@
 import bpy
+import os
+import re
 import json
+import time
+import logging
 from itertools import groupby
 from collections import deque
 from mathutils import Color, Vector
 from functools import lru_cache
 
-import numpy as np
+from .node_graph import RSN_Graph
+from .task_table import iter_table_tasks, count_table_tasks
+from .task_matrix import iter_matrix_tasks, count_matrix_tasks
+from .param_curves import bake_task_curves
 
 
 def source_attr(src_obj, scr_data_path):
@@ -21,6 +28,62 @@ def source_attr(src_obj, scr_data_path):
     return get_obj_and_attr(src_obj, scr_data_path)
 
 
+def get_window():
+    """context window is None in timers, use the first window instead"""
+    if bpy.context.window:
+        return bpy.context.window
+    windows = bpy.context.window_manager.windows
+    return windows[0] if len(windows) != 0 else None
+
+
+class RSN_Debouncer:
+    """Coalesce updates with bpy.app.timers
+    Each key keeps only its latest job, all jobs run once no new job is pushed for the delay time
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.deadline = 0
+        self._fire = self.fire  # timers compare the function object
+
+    def push(self, key, job, delay):
+        """
+        :parm key: jobs with the same key replace each other (latest wins)
+        :parm job: function without arguments
+        :parm delay: seconds to wait after the last push, run at once if 0
+        """
+        if delay <= 0:
+            job()
+            return
+
+        self.jobs.pop(key, None)
+        self.jobs[key] = job
+        self.deadline = time.monotonic() + delay
+
+        if not bpy.app.timers.is_registered(self._fire):
+            bpy.app.timers.register(self._fire, first_interval=delay)
+
+    def fire(self):
+        remain = self.deadline - time.monotonic()
+        if remain > 0:
+            return remain
+
+        jobs, self.jobs = self.jobs, {}
+        for key, job in jobs.items():
+            try:
+                job()
+            except Exception as e:
+                logging.getLogger('mylogger').warning(f'RSN update "{key}" error', exc_info=e)
+
+    def cancel(self):
+        self.jobs.clear()
+        if bpy.app.timers.is_registered(self._fire):
+            bpy.app.timers.unregister(self._fire)
+
+
+rsn_debouncer = RSN_Debouncer()
+
+
 class RSN_NodeTree:
     """To store context node tree for getting data in renderstack"""
 
@@ -47,51 +110,22 @@ class RSN_NodeTree:
             self.set_wm_node_tree(tree_name)
 
 
-# class RSN_Gpaph:
-#     def __init__(self, node_tree, root_node_name):
-#         self.nt = node_tree
-#         self.root_node = self.get_node_from_name(root_node_name)
-#
-#     def get_children_from_node(self, root_node, pass_mute=True) -> list:
-#         """Depth first search
-#         :parm root_node: a blender node
-#         nodes append from left to right, from top to bottom
-#         """
-#         node_list = []
-#
-#         # @lru_cache(maxsize=None)
-#         def get_sub_node(node, pass_mute_node=True):
-#             """Recursion
-#             :parm node: a blender node
-#
-#             """
-#             for i, input in enumerate(node.inputs):
-#                 if input.is_linked:
-#                     try:
-#                         sub_node = input.links[0].from_node
-#                         if sub_node.mute and pass_mute_node: continue
-#
-#                         get_sub_node(sub_node)
-#                     # This error shows when the dragging the link off viewer node(Works well with knife tool)
-#                     # this seems to be a blender error
-#                     except IndexError:
-#                         pass
-#                 else:
-#                     continue
-#             # Skip the reroute node
-#             if node.bl_idname != 'NodeReroute':
-#                 if len(node_list) == 0 or (len(node_list) != 0 and node.name != node_list[-1]):
-#                     node_list.append(node.name)
-#
-#         get_sub_node(root_node, pass_mute)
-
-
 class RSN_Nodes:
-    """Tree method"""
+    """Tree method
+    The node tree is read once into a RSN_Graph, traversal run on the graph
+    """
 
     def __init__(self, node_tree, root_node_name):
         self.nt = node_tree
         self.root_node = self.get_node_from_name(root_node_name)
+        self._graph = None
+
+    @property
+    def graph(self):
+        """snapshot of the node tree, build on first use"""
+        if self._graph is None:
+            self._graph = RSN_Graph.from_node_tree(self.nt)
+        return self._graph
 
     def get_node_from_name(self, name):
         try:
@@ -108,41 +142,8 @@ class RSN_Nodes:
         :parm root_node: a blender node
 
         """
-        node_list = []
-
-        def append_node_to_list(node):
-            """Skip the reroute node"""
-            if node.bl_idname != 'NodeReroute':
-                if len(node_list) == 0 or (len(node_list) != 0 and node.name != node_list[-1]):
-                    node_list.append(node.name)
-
-        # @lru_cache(maxsize=None)
-        def get_sub_node(node, pass_mute_node=True):
-            """Recursion
-            :parm node: a blender node
-
-            """
-
-            for i, input in enumerate(node.inputs):
-                if input.is_linked:
-                    try:
-                        sub_node = input.links[0].from_node
-                        if sub_node.mute and pass_mute_node:
-                            continue
-                        else:
-                            get_sub_node(sub_node)
-                    # This error shows when the dragging the link off viewer node(Works well with knife tool)
-                    # this seems to be a blender error
-                    except IndexError:
-                        pass
-                else:
-                    continue
-            # nodes append from left to right, from top to bottom
-            append_node_to_list(node)
-
-        get_sub_node(root_node, pass_mute)
-
-        return node_list
+        graph = self.graph
+        return graph.names(graph.get_children(graph.get_id(root_node.name), pass_mute))
 
     def get_sub_node_dict_from_node_list(self, node_list, parent_node_type, black_list=None):
         """Use Task node as separator to get sub nodes in this task
@@ -151,26 +152,12 @@ class RSN_Nodes:
         :parm black_list: list node.bl_idname that you want to skip
 
         """
-
-        node_list_dict = {}
         if not black_list: black_list = ['RSNodeTaskListNode', 'RSNodeRenderListNode']
 
-        node_list[:] = [node for node in node_list if
-                        self.nt.nodes[node].bl_idname not in black_list]
-        # separate nodes with the node type input
-        children_node_list = [list(g) for k, g in
-                              groupby(node_list, lambda name: self.nt.nodes[name].bl_idname == parent_node_type) if
-                              not k]
-        # get the node type input
-        parent_node_list = [node for node in node_list if self.nt.nodes[node].bl_idname == parent_node_type]
-        # make a dict {parent name:[children list]}
-        for i in range(len(parent_node_list)):
-            try:
-                node_list_dict[parent_node_list[i]] = children_node_list[i]
-            # release the node behind the parent
-            except IndexError:
-                pass
-        return node_list_dict
+        graph = self.graph
+        return graph.group_by_type([graph.get_id(name) for name in node_list],
+                                   parent_node_type=parent_node_type,
+                                   black_list=black_list)
 
     def get_children_from_var_node(self, var_node, active, pass_mute=True):
         """Depth first search for the Variants children
@@ -178,42 +165,8 @@ class RSN_Nodes:
         :parm active:the active input of the Variants node
 
         """
-
-        black_list = []  # list of nodes to remove from the origin node list
-
-        def append_node_to_list(node):
-            """Skip the reroute node"""
-            if node.bl_idname != 'NodeReroute':
-                if len(black_list) == 0 or (len(black_list) != 0 and node.name != black_list[-1]):
-                    if node.bl_idname != 'RSNodeVariantsNode': black_list.append(node.name)
-
-        # @lru_cache(maxsize=None)
-        def get_sub_node(node, pass_mute_node=True):
-            """Recursion
-            :parm node: a blender node
-
-            """
-
-            for i, input in enumerate(node.inputs):
-                if input.is_linked and True in (i != active, node.bl_idname != 'RSNodeVariantsNode'):
-                    try:
-                        sub_node = input.links[0].from_node
-                        if sub_node.mute and pass_mute_node:
-                            continue
-                        else:
-                            get_sub_node(sub_node)
-                    # This error shows when the dragging the link off viewer node(Works well with knife tool)
-                    # this seems to be a blender error
-                    except IndexError:
-                        pass
-                else:
-                    continue
-            # nodes append from left to right, from top to bottom
-            append_node_to_list(node)
-
-        get_sub_node(var_node, pass_mute)
-
-        return black_list
+        graph = self.graph
+        return graph.names(graph.get_var_black_list(graph.get_id(var_node.name), active, pass_mute))
 
     def get_children_from_task(self, task_name, return_dict=False, type='RSNodeTaskNode'):
         """pack method for task node
@@ -226,53 +179,30 @@ class RSN_Nodes:
         :parm type: the bl_idname of the node (key for the dict)
 
         """
+        graph = self.graph
+        if task_name not in graph.index:
+            return None
+        # only one set VariantsNodeProperty node will be active
+        node_list = graph.get_task_children(graph.get_id(task_name))
 
-        task = self.get_node_from_name(task_name)
-        try:
-            node_list = self.get_children_from_node(task)
-            # VariantsNodeProperty node in each task
-            # only one set VariantsNodeProperty node will be active
-            var_collect = {}
-            for node_name in node_list:
-                set_var_node = self.nt.nodes[node_name]
-                if set_var_node.bl_idname == 'RSNodeSetVariantsNode':
-                    for item in set_var_node.node_collect:
-                        if item.use:
-                            var_collect[item.name] = item.active
-                    break
-
-            for node_name, active in var_collect.items():
-                var_node = self.nt.nodes[node_name]
-                black_list = self.get_children_from_var_node(var_node, active)
-
-                node_list = [i for i in node_list if i not in black_list]
-
-            # return clean node list
-            if not return_dict:
-                return node_list
-            else:
-                return self.get_sub_node_dict_from_node_list(node_list=node_list,
-                                                             parent_node_type=type)
-        except AttributeError:
-            pass
+        # return clean node list
+        if not return_dict:
+            return graph.names(node_list)
+        else:
+            return graph.group_by_type(node_list, parent_node_type=type)
 
     def get_children_from_render_list(self, return_dict=False, type='RSNodeTaskNode'):
         """pack method for render list node(get all task)
 
         """
-
-        render_list = self.get_node_from_name(self.root_node.name)
-        node_list = self.get_children_from_node(render_list)
+        graph = self.graph
+        node_list = graph.get_children(graph.get_id(self.root_node.name))
         if not return_dict:
-            return node_list
+            return graph.names(node_list)
         else:
-            return self.get_sub_node_dict_from_node_list(node_list=node_list,
-                                                         parent_node_type=type)
+            return graph.group_by_type(node_list, parent_node_type=type)
 
-    def graph(self):
-        node_list = self.get_children_from_node(self.root_node)
-
-    def get_task_data(self, task_name, task_dict):
+    def get_task_data(self, task_name, task_dict, data_cache=None):
         """transfer nodes to data
         :parm task_name: name of the task node
         :parm task_dict: parse dict
@@ -280,78 +210,198 @@ class RSN_Nodes:
                                 children node name1,
                                 children node name2]
             }
+        :parm data_cache: dict {node name: data}, each node is read once for all the calls that share it
 
         """
 
         task_data = {}
+        # task node
+        task_node = self.nt.nodes[task_name]
+
+        def get_data(node):
+            if data_cache is None:
+                return node.get_data()
+            if node.name not in data_cache:
+                data_cache[node.name] = node.get_data()
+            return data_cache[node.name]
 
         for node_name in task_dict[task_name]:
             node = self.nt.nodes[node_name]
             node.debug()
-            # task node
-            task_node = self.nt.nodes[task_name]
             task_data['name'] = task_name
             task_data['label'] = task_node.label
             # Object select Nodes
             if node.bl_idname == 'RSNodePropertyInputNode':
                 if 'property' not in task_data:
                     task_data['property'] = {}
-                task_data['property'].update(node.get_data())
+                task_data['property'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeObjectDataNode':
                 if 'object_data' not in task_data:
                     task_data['object_data'] = {}
-                task_data['object_data'].update(node.get_data())
+                task_data['object_data'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeObjectModifierNode':
                 if 'object_modifier' not in task_data:
                     task_data['object_modifier'] = {}
-                task_data['object_modifier'].update(node.get_data())
+                task_data['object_modifier'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeObjectDisplayNode':
                 if 'object_display' not in task_data:
                     task_data['object_display'] = {}
-                task_data['object_display'].update(node.get_data())
+                task_data['object_display'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeObjectMaterialNode':
                 if 'object_material' not in task_data:
                     task_data['object_material'] = {}
-                task_data['object_material'].update(node.get_data())
+                task_data['object_material'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeObjectPSRNode':
                 if 'object_psr' not in task_data:
                     task_data['object_psr'] = {}
-                task_data['object_psr'].update(node.get_data())
+                task_data['object_psr'].update(get_data(node))
+
+            elif node.bl_idname == 'RSNodeValueCurveNode':
+                if 'curves' not in task_data:
+                    task_data['curves'] = {}
+                task_data['curves'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeViewLayerPassesNode':
                 if 'view_layer_passes' not in task_data:
                     task_data['view_layer_passes'] = {}
-                task_data['view_layer_passes'].update(node.get_data())
+                task_data['view_layer_passes'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeSmtpEmailNode':
                 if 'email' not in task_data:
                     task_data['email'] = {}
-                task_data['email'].update(node.get_data())
+                task_data['email'].update(get_data(node))
 
             elif node.bl_idname == 'RSNodeScriptsNode':
                 if node.type == 'SINGLE':
                     if 'scripts' not in task_data:
                         task_data['scripts'] = {}
-                    task_data['scripts'].update(node.get_data())
+                    task_data['scripts'].update(get_data(node))
                 else:
                     if 'scripts_file' not in task_data:
                         task_data['scripts_file'] = {}
-                    task_data['scripts_file'].update(node.get_data())
+                    task_data['scripts_file'].update(get_data(node))
             # Single node
             else:
                 try:
-                    task_data.update(node.get_data())
+                    task_data.update(get_data(node))
                 except TypeError:
                     pass
 
         return task_data
 
 
+def expand_task(task_name, task_data, rsn=None):
+    """virtual tasks of a task, the task itself if it has nothing to expand
+    :parm rsn: RSN_Nodes, to resolve the Variants of a Task Matrix
+    :return: generator of (task name, task data)
+    """
+    if 'task_table' in task_data:
+        try:
+            yield from iter_table_tasks(task_name, task_data)
+        except (OSError, ValueError) as e:
+            logging.getLogger('mylogger').warning(f'RSN Task Table of "{task_name}" can not be read: {e}')
+        return
+
+    if 'task_matrix' in task_data:
+        try:
+            yield from iter_matrix_tasks(task_name, task_data, get_variants_resolver(rsn, task_name))
+        except ValueError as e:
+            logging.getLogger('mylogger').warning(f'RSN Task Matrix of "{task_name}" can not be expanded: {e}')
+        return
+
+    yield task_name, task_data
+
+
+def is_virtual_source(task_data):
+    """the task expands into virtual tasks"""
+    return 'task_table' in task_data or 'task_matrix' in task_data
+
+
+def count_virtual_tasks(task_name, task_data):
+    """number of virtual tasks of a task, without making them"""
+    try:
+        if 'task_table' in task_data:
+            return count_table_tasks(task_data)
+        return count_matrix_tasks(task_data)
+    except (OSError, ValueError) as e:
+        logging.getLogger('mylogger').warning(f'RSN Virtual tasks of "{task_name}" can not be counted: {e}')
+        return 0
+
+
+class RSN_TaskSource:
+    """Virtual tasks of a Task Table or Task Matrix in the queue, made one at a time when the queue reach them
+    :parm task_data: data of the task node, the base of the virtual tasks
+    :parm count: number of virtual tasks
+    :parm prepare: function(task data) -> task data, fill the frames and bake the curves of a virtual task
+    """
+
+    def __init__(self, task_name, task_data, count, rsn, prepare):
+        self.task_name = task_name
+        self.task_data = task_data
+        self.count = count
+        self.rsn = rsn
+        self.prepare = prepare
+        self.iterator = None
+        self.pulled = 0
+
+    def expand(self):
+        """new generator of the virtual tasks, the source is not changed"""
+        for name, data in expand_task(self.task_name, self.task_data, self.rsn):
+            yield name, self.prepare(data)
+
+    def first(self):
+        """first virtual task, None if there is none"""
+        iterator = self.expand()
+        try:
+            return next(iterator, None)
+        finally:
+            iterator.close()
+
+    def pull(self):
+        """next virtual task, None when all are made"""
+        if self.iterator is None:
+            self.iterator = self.expand()
+        item = next(self.iterator, None)
+        if item is not None:
+            self.pulled += 1
+        return item
+
+    def remaining(self):
+        return max(self.count - self.pulled, 0)
+
+    def close(self):
+        """close the table file"""
+        if self.iterator is not None:
+            self.iterator.close()
+            self.iterator = None
+
+
+def get_variants_resolver(rsn, task_name):
+    """function({variants node name: active input}) -> task data
+    the Variants of the matrix override the ones of the Set Variants node
+    the data of each node is read only once for all the combinations
+    """
+    if rsn is None: return None
+
+    graph = rsn.graph
+    children = graph.get_children(graph.get_id(task_name))
+    # not pruned yet, the matrix choose the active inputs
+    node_list = [graph.get_id(name) for name in graph.group_by_type(children).get(task_name, [])]
+    var_collect = graph.get_var_collect(children)
+    data_cache = {}
+
+    def resolve(var_active):
+        pruned = graph.prune_variants(node_list, dict(var_collect, **var_active))
+        return rsn.get_task_data(task_name, {task_name: graph.names(pruned)}, data_cache)
+
+    return resolve
+
+
 class RSN_Queue():
     def __init__(self, nodetree, render_list_node: str):
         """init a rsn queue
@@ -375,24 +425,76 @@ class RSN_Queue():
     def init_queue(self):
         """get all the task_data
         fill the key 'frame' for the latter render
+        the tasks with a Task Table or Task Matrix are kept as a RSN_TaskSource, expanded when they are rendered
         """
 
         for task in self.task_list_dict:
+            # the children of the task with the Set Variants applied, like update_parms read them
+            task_dict = self.rsn.get_children_from_task(task_name=task, return_dict=True)
+            if task_dict and task in task_dict:
+                self.task_list_dict[task] = task_dict[task]
             task_data = self.rsn.get_task_data(task_name=task, task_dict=self.task_list_dict)
 
-            if "frame_start" not in task_data:
-                task_data["frame_start"] = bpy.context.scene.frame_current
-                task_data["frame_end"] = bpy.context.scene.frame_current
-                task_data["frame_step"] = bpy.context.scene.frame_step
+            if is_virtual_source(task_data):
+                self.fill_frames(task_data)
+                self.task_queue.append(task)
+                self.task_data_queue.append(RSN_TaskSource(task, task_data, count_virtual_tasks(task, task_data),
+                                                           self.rsn, self.prepare_task))
+            else:
+                self.task_queue.append(task)
+                self.task_data_queue.append(self.prepare_task(task_data))
+
+    def fill_frames(self, task_data):
+        if "frame_start" not in task_data:
+            task_data["frame_start"] = bpy.context.scene.frame_current
+            task_data["frame_end"] = bpy.context.scene.frame_current
+            task_data["frame_step"] = bpy.context.scene.frame_step
+
+    def prepare_task(self, task_data):
+        self.fill_frames(task_data)
+        # value curves are evaluated once for all the frames
+        self.sample_fcurves(task_data)
+        for node_name, msg in bake_task_curves(task_data):
+            logging.getLogger('mylogger').warning(f'RSN Value Curve "{node_name}": {msg}')
+        return task_data
 
-            self.task_queue.append(task)
-            self.task_data_queue.append(task_data)
+    def sample_fcurves(self, task_data):
+        """sample the fcurves of the Value Curve nodes on the frames of the task
+        the fcurves with modifiers or bezier keys can only be evaluated by blender
+        """
+        frames = range(task_data['frame_start'], task_data['frame_end'] + 1, task_data['frame_step'])
+        for node_name, curve in task_data.get('curves', {}).items():
+            node = self.nt.nodes.get(node_name)
+            if curve.get('sampled') and node is not None:
+                curve.update(node.get_keyframes(frames))
+
+    def expand_head(self):
+        """make the next virtual task when a task source is at the head of the queue"""
+        while self.task_data_queue and isinstance(self.task_data_queue[0], RSN_TaskSource):
+            item = self.task_data_queue[0].pull()
+            if item is None:
+                self.task_queue.popleft()
+                self.task_data_queue.popleft()
+            else:
+                self.task_queue.appendleft(item[0])
+                self.task_data_queue.appendleft(item[1])
+
+    def iter_tasks(self, expand=True):
+        """(task name, task data) of the queue, the queue is not changed
+        :parm expand: make the virtual tasks one by one, else yield the RSN_TaskSource as its data
+        """
+        for task, task_data in zip(self.task_queue, self.task_data_queue):
+            if expand and isinstance(task_data, RSN_TaskSource):
+                yield from task_data.expand()
+            else:
+                yield task, task_data
 
     def is_empty(self):
+        self.expand_head()
         return len(self.task_queue) == 0
 
     def get_length(self):
-        return len(self.task_queue)
+        return sum(d.remaining() if isinstance(d, RSN_TaskSource) else 1 for d in self.task_data_queue)
 
     def update_task_data(self):
         if not self.is_empty():
@@ -403,16 +505,45 @@ class RSN_Queue():
             self.frame_step = self.task_data_queue[0]["frame_step"]
 
     def get_frame_length(self):
+        """the virtual tasks count the frames of their task node"""
         length = 0
         for task_data in self.task_data_queue:
-            length += (task_data['frame_end'] + 1 - task_data['frame_start']) // task_data['frame_step']
+            count = 1
+            if isinstance(task_data, RSN_TaskSource):
+                count, task_data = task_data.remaining(), task_data.task_data
+            length += count * ((task_data['frame_end'] + 1 - task_data['frame_start']) // task_data['frame_step'])
         return length
 
     def pop(self):
         if not self.is_empty():
             return self.task_queue.popleft(), self.task_data_queue.popleft()
 
+    def reorder(self, order):
+        """:parm order: list of index of the current queue"""
+        tasks, data = list(self.task_queue), list(self.task_data_queue)
+        self.task_queue = deque(tasks[i] for i in order)
+        self.task_data_queue = deque(data[i] for i in order)
+
+    def schedule_for_persistent_data(self):
+        """reorder the tasks so that the invalidating changes happen as few times as possible
+        :return: (invalidating transitions before, after)
+        """
+        # a task source move as a whole with its virtual task already made, its combinations are already in order
+        units = list(self.task_data_queue)
+        if len(units) > 1 and isinstance(units[1], RSN_TaskSource) and \
+                units[0].get('virtual_of') == units[1].task_name:
+            units[0] = units[1]
+        signatures = [get_task_signature(d.task_data if isinstance(d, RSN_TaskSource) else d) for d in units]
+        order = schedule_by_signature(signatures)
+        before = count_transitions(signatures)
+        after = count_transitions([signatures[i] for i in order])
+        self.reorder(order)
+        return before, after
+
     def clear_queue(self):
+        for task_data in self.task_data_queue:
+            if isinstance(task_data, RSN_TaskSource):
+                task_data.close()
         self.task_queue.clear()
         self.task_data_queue.clear()
 
@@ -421,3 +552,277 @@ class RSN_Queue():
         self.frame_start = None
         self.frame_end = None
         self.frame_step = None
+
+
+class RSN_PathFormat:
+    """Compiled path expression of the File Path node
+    The format is parsed once into literal and token segments, formatting is a single join
+
+    $camera $engine $res $label $vl $V $blend
+    $F4 : frame with 4 digits
+    $T{%m-%d} : time.strftime format
+    """
+    TOKEN = re.compile(r'\$(camera|engine|res|label|vl|V|blend|F(\d)|T\{(.*?)\})')
+
+    def __init__(self, path_format):
+        self.path_format = path_format
+        # str for literal, (token, arg) for token
+        self.segments = []
+        self.use_frame = False
+
+        pos = 0
+        for match in self.TOKEN.finditer(path_format):
+            if match.start() > pos:
+                self.segments.append(path_format[pos:match.start()])
+            token = match.group(1)
+            if match.group(2) is not None:
+                self.segments.append(('F', f'0{match.group(2)}d'))
+                self.use_frame = True
+            elif match.group(3) is not None:
+                self.segments.append(('T', match.group(3)))
+            else:
+                self.segments.append((token, None))
+            pos = match.end()
+        if pos < len(path_format):
+            self.segments.append(path_format[pos:])
+
+    def format(self, values, frame=0):
+        """
+        :parm values: dict {token: str}, from get_path_values(), token not in it is kept as it is
+        :parm frame: frame for the $F token, None to keep it as '#' for blender to fill (animation)
+        """
+        parts = []
+        for seg in self.segments:
+            if isinstance(seg, str):
+                parts.append(seg)
+                continue
+            token, arg = seg
+            if token == 'F':
+                parts.append('#' * int(arg[1:-1]) if frame is None else f'{frame:{arg}}')
+            elif token == 'T':
+                parts.append(time.strftime(arg, time.localtime()))
+            elif values.get(token) is not None:
+                parts.append(values[token])
+            else:
+                parts.append(f'${token}')
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=256)
+def get_path_format(path_format):
+    return RSN_PathFormat(path_format)
+
+
+def get_path_values(task_data, scene=None, applied=False):
+    """values of the path tokens for a task
+    :parm applied: the task is applied to the scene, read the scene only.
+        Otherwise read from the task data first, so the output can be resolved before rendering
+    """
+    scn = scene if scene else bpy.context.scene
+    rn = scn.render
+    view_layer = bpy.context.view_layer.name
+    camera = scn.camera
+    d = {} if applied else task_data
+
+    if d.get('camera'):
+        try:
+            camera = eval(d['camera'])
+        except Exception:
+            pass
+
+    return {
+        'camera': camera.name if camera else None,
+        'engine': d.get('engine', rn.engine),
+        'res'   : f"{d.get('res_x', rn.resolution_x)}x{d.get('res_y', rn.resolution_y)}",
+        'label' : task_data.get('label', ''),
+        'vl'    : d.get('view_layer') or view_layer,
+        'V'     : task_data.get('version', ''),
+        'blend' : bpy.path.basename(bpy.data.filepath)[:-6],
+    }
+
+
+def get_output_path(task_data, frame, values=None):
+    """resolved output path of a task at this frame, '' if the task has no File Path node"""
+    if 'path' not in task_data: return ''
+    if values is None: values = get_path_values(task_data)
+    postfix = get_path_format(task_data['path_format']).format(values, frame)
+    return os.path.join(os.path.dirname(task_data['path']), postfix)
+
+
+## FRAME TIME
+#########################################
+
+def record_frame_time(task_name, seconds, scene=None, weight=0.3):
+    """keep a moving average of the render time of each task in the scene, for the estimated time"""
+    scn = scene if scene else bpy.context.scene
+    times = scn.get('rsn_frame_times')
+    times = times.to_dict() if times else {}
+    last = times.get(task_name)
+    times[task_name] = seconds if last is None else last * (1 - weight) + seconds * weight
+    scn['rsn_frame_times'] = times
+
+
+def get_frame_time(task_name, scene=None):
+    """average seconds of one frame, the average of all tasks if this task is never rendered
+    :return: None if nothing is recorded
+    """
+    scn = scene if scene else bpy.context.scene
+    times = scn.get('rsn_frame_times')
+    if not times: return None
+    if task_name in times: return times[task_name]
+    return sum(times.values()) / len(times)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    h, m, s = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f'{h}:{m:02d}:{s:02d}' if h else f'{m:02d}:{s:02d}'
+
+
+## PERSISTENT DATA
+#########################################
+
+# task data keys that do not touch the scene data kept by persistent data
+CHEAP_KEYS = {'name', 'label', 'path', 'path_format', 'version',
+              'frame_start', 'frame_end', 'frame_step', 'render_animation',
+              'render_slot', 'email', 'virtual_of', 'table_row',
+              'matrix_index', 'matrix_prev', 'matrix_changed'}
+
+
+def get_task_signature(task_data):
+    """json of the invalidating part of a task, tasks with the same signature can share the persistent data"""
+    return json.dumps({k: v for k, v in task_data.items() if k not in CHEAP_KEYS},
+                      sort_keys=True, default=str)
+
+
+def count_transitions(signatures):
+    return sum(1 for a, b in zip(signatures, signatures[1:]) if a != b)
+
+
+def schedule_by_signature(signatures):
+    """Group the tasks with the same signature, the groups keep the order of first appearance
+    then each next group is the one that change the fewest keys (greedy)
+    :return: list of index
+    """
+    groups = {}
+    for i, sig in enumerate(signatures):
+        groups.setdefault(sig, []).append(i)
+    if len(groups) <= 1:
+        return list(range(len(signatures)))
+
+    parsed = {sig: json.loads(sig) for sig in groups}
+
+    def distance(a, b):
+        da, db = parsed[a], parsed[b]
+        return sum(1 for k in da.keys() | db.keys() if da.get(k) != db.get(k))
+
+    remaining = list(groups)
+    current = remaining.pop(0)
+    order = list(groups[current])
+    while remaining:
+        current = min(remaining, key=lambda sig: distance(current, sig))
+        remaining.remove(current)
+        order.extend(groups[current])
+    return order
+
+
+## TILES
+#########################################
+# numpy is only imported when stitching, it is slow to import at startup
+
+def tile_regions(width, height, tiles_x, tiles_y, overlap=0):
+    """split a frame into tiles
+    :parm overlap: pixels each tile extends into its neighbours, for blending the seams
+    :return: list of (x0, y0, x1, y1) pixel rect, y from the bottom like blender
+    """
+    xs = [round(width * i / tiles_x) for i in range(tiles_x + 1)]
+    ys = [round(height * i / tiles_y) for i in range(tiles_y + 1)]
+    regions = []
+    for j in range(tiles_y):
+        for i in range(tiles_x):
+            regions.append((max(xs[i] - overlap, 0), max(ys[j] - overlap, 0),
+                            min(xs[i + 1] + overlap, width), min(ys[j + 1] + overlap, height)))
+    return regions
+
+
+def region_to_border(rect, width, height, crop=True):
+    """pixel rect to the render border, the small offset keeps blender's truncation on the same pixel"""
+    x0, y0, x1, y1 = rect
+    return {'min_x': min((x0 + 0.01) / width, 1), 'max_x': min((x1 + 0.01) / width, 1),
+            'min_y': min((y0 + 0.01) / height, 1), 'max_y': min((y1 + 0.01) / height, 1),
+            'crop' : crop}
+
+
+def feather_mask(w, h, left=0, right=0, bottom=0, top=0):
+    """weight of each pixel, ramp from 0 to 1 over the given width at each side
+    :return: numpy array (h, w)
+    """
+    import numpy as np
+
+    def ramp(n, start, end):
+        r = np.ones(n, dtype=np.float32)
+        if start > 0:
+            k = min(start, n)
+            r[:k] = np.minimum(r[:k], (np.arange(k, dtype=np.float32) + 0.5) / start)
+        if end > 0:
+            k = min(end, n)
+            r[n - k:] = np.minimum(r[n - k:], ((np.arange(k, dtype=np.float32) + 0.5) / end)[::-1])
+        return r
+
+    return np.outer(ramp(h, bottom, top), ramp(w, left, right))
+
+
+def stitch_tiles(width, height, tiles, overlap=0):
+    """blend tiles into one image
+    :parm tiles: list of (rect, pixels), pixels is a numpy array (h, w, channels), rect from tile_regions()
+    :parm overlap: overlap used in tile_regions(), the seams are blended over twice this width
+    :return: numpy array (height, width, channels)
+    """
+    import numpy as np
+
+    channels = tiles[0][1].shape[2]
+    result = np.zeros((height, width, channels), dtype=np.float32)
+    weight = np.zeros((height, width), dtype=np.float32)
+
+    for (x0, y0, x1, y1), pixels in tiles:
+        # blender may round the border by one pixel
+        h = min(y1 - y0, pixels.shape[0])
+        w = min(x1 - x0, pixels.shape[1])
+        edge = overlap * 2
+        mask = feather_mask(w, h,
+                            left=edge if x0 > 0 else 0, right=edge if x0 + w < width else 0,
+                            bottom=edge if y0 > 0 else 0, top=edge if y0 + h < height else 0)
+        result[y0:y0 + h, x0:x0 + w] += pixels[:h, :w] * mask[..., None]
+        weight[y0:y0 + h, x0:x0 + w] += mask
+
+    np.divide(result, weight[..., None], out=result, where=weight[..., None] > 0)
+    return result
+
+
+def image_to_array(image):
+    """pixels of a blender image as numpy array (h, w, channels)"""
+    import numpy as np
+
+    w, h = image.size
+    pixels = np.empty(w * h * image.channels, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(h, w, image.channels)
+
+
+def composite_patch(base, patch, x0, y0, feather=0):
+    """paste a patch into an image, the edges of the patch are feathered into the base
+    :parm base: numpy array (h, w, channels), changed in place
+    :parm patch: numpy array (ph, pw, channels)
+    :parm x0, y0: pixel position of the patch in the base, from the bottom left
+    :parm feather: pixels of the blending at the patch edges, edges on the image border are not feathered
+    """
+    h = min(patch.shape[0], base.shape[0] - y0)
+    w = min(patch.shape[1], base.shape[1] - x0)
+    if h <= 0 or w <= 0: return base
+
+    mask = feather_mask(w, h,
+                        left=feather if x0 > 0 else 0, right=feather if x0 + w < base.shape[1] else 0,
+                        bottom=feather if y0 > 0 else 0, top=feather if y0 + h < base.shape[0] else 0)[..., None]
+    area = base[y0:y0 + h, x0:x0 + w]
+    area[...] = area * (1 - mask) + patch[:h, :w, :base.shape[2]] * mask
+    return base
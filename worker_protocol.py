@@ -0,0 +1,124 @@
+"""Protocol of the warm render worker
+
+A worker is a background blender that keep a blend file loaded and render the plans it is sent,
+start it with the Start Render Worker operator, or the command of operators.render_worker.worker_command().
+
+One request for each connection, one json object on each line, on 127.0.0.1 only.
+Plans can run scripts, so each request must carry the token of the worker. The worker writes
+it to a file only the user can read (token_path), the client read it from there.
+
+request:
+    {"cmd": "render", "token": "...", "blend": "/path/scene.blend", "plan": "/path/x.rsnplan", "start": 0}
+        "plan_data" (the plan as a dict) can be sent instead of "plan"
+        "reload": true load the blend file again after the job, the settings the tasks change are
+        put back without it, but not what the scripts do
+    {"cmd": "ping"}
+    {"cmd": "quit"}
+
+events sent back:
+    {"event": "load", "blend": ..., "seconds": ...}           the blend file is (re)loaded
+    {"event": "frame", "index": 0, "task": "Task", "frame": 1}  before each frame
+    {"event": "done", "frames": 10, "seconds": ...}
+    {"event": "error", "msg": ...}
+    {"event": "pong", "blend": ..., "plans": ...}
+
+Nothing in this module imports bpy, the client can run in any python.
+"""
+
+import os
+import json
+import socket
+import secrets
+import tempfile
+
+HOST = '127.0.0.1'
+DEFAULT_PORT = 7878
+
+
+def token_path(port=DEFAULT_PORT):
+    return os.path.join(tempfile.gettempdir(), f'rsn_worker_{port}.token')
+
+
+def new_token():
+    return secrets.token_hex(16)
+
+
+def write_token(token, port=DEFAULT_PORT):
+    """write the token readable by the user only"""
+    path = token_path(port)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    return path
+
+
+def read_token(port=DEFAULT_PORT):
+    try:
+        with open(token_path(port)) as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def send_message(file, message):
+    file.write(json.dumps(message, default=list) + '\n')
+    file.flush()
+
+
+def read_messages(file):
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def request(message, port=DEFAULT_PORT, timeout=None, token=None):
+    """send a request to a worker
+    :parm timeout: seconds to wait for the next event, None to wait for ever (a frame can be long)
+    :parm token: token of the worker, read from its token file if None
+    :return: generator of the events, until the worker close the connection
+    """
+    message = dict(message, token=read_token(port) if token is None else token)
+    with socket.create_connection((HOST, port), timeout=timeout) as conn:
+        with conn.makefile('rw', encoding='utf-8', newline='\n') as file:
+            send_message(file, message)
+            yield from read_messages(file)
+
+
+def render(blend, plan, port=DEFAULT_PORT, start=0, token=None):
+    """render a plan file (path) or a plan dict in a worker
+    :return: generator of the events
+    """
+    message = {'cmd': 'render', 'blend': blend, 'start': start}
+    if isinstance(plan, dict):
+        message['plan_data'] = plan
+    else:
+        message['plan'] = plan
+    return request(message, port, token=token)
+
+
+def ping(port=DEFAULT_PORT, timeout=2, token=None):
+    """:return: the pong event, None if no worker is listening"""
+    try:
+        for event in request({'cmd': 'ping'}, port, timeout, token):
+            return event
+    except OSError:
+        return None
+
+
+def quit(port=DEFAULT_PORT, timeout=2, token=None):
+    try:
+        for event in request({'cmd': 'quit'}, port, timeout, token):
+            return event
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    # python worker_protocol.py scene.blend x.rsnplan [port]
+    import sys
+
+    for event in render(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_PORT):
+        print(json.dumps(event))